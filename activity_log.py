@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict
+
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', '0.5'))
+ACTIVITY_BATCH_SIZE = int(os.getenv('ACTIVITY_BATCH_SIZE', '200'))
+ACTIVITY_QUEUE_SIZE = int(os.getenv('ACTIVITY_QUEUE_SIZE', '10000'))
+ACTIVITY_RETENTION_DAYS = int(os.getenv('ACTIVITY_RETENTION_DAYS', '30'))
+PRUNE_INTERVAL = 3600
+
+class ActivityLogger:
+    def __init__(self, db_path: Path, batch_size: int = ACTIVITY_BATCH_SIZE, max_queue: int = ACTIVITY_QUEUE_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.pending = []
+        self.lock = threading.Lock()
+        self.stats = {'written': 0, 'dropped': 0, 'failed': 0, 'pruned': 0}
+        self.wakeup = None
+        self.task = None
+        self.last_prune = 0.0
+    
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def init_db(self):
+        with self.get_connection() as conn:
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_activity_logs_timestamp ON activity_logs (timestamp)')
+    
+    def log(self, user_id, action, details, ip_address):
+        row = (user_id, action, details, ip_address, datetime.now().isoformat())
+        
+        with self.lock:
+            if len(self.pending) >= self.max_queue:
+                self.stats['dropped'] += 1
+                return
+            self.pending.append(row)
+            full = len(self.pending) >= self.batch_size
+        
+        if full and self.wakeup is not None:
+            self.wakeup.set()
+    
+    def flush(self) -> int:
+        with self.lock:
+            rows = self.pending
+            self.pending = []
+        
+        if not rows:
+            return 0
+        
+        try:
+            with self.get_connection() as conn:
+                conn.executemany('''INSERT INTO activity_logs (user_id, action, details, ip_address, timestamp)
+                                    VALUES (?, ?, ?, ?, ?)''', rows)
+        except sqlite3.Error:
+            with self.lock:
+                self.stats['failed'] += len(rows)
+            return 0
+        
+        with self.lock:
+            self.stats['written'] += len(rows)
+        return len(rows)
+    
+    def prune(self, retention_days: int = ACTIVITY_RETENTION_DAYS) -> int:
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        
+        with self.get_connection() as conn:
+            deleted = conn.execute('DELETE FROM activity_logs WHERE timestamp < ?', (cutoff,)).rowcount
+        
+        with self.lock:
+            self.stats['pruned'] += deleted
+        return deleted
+    
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=ACTIVITY_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            
+            await asyncio.to_thread(self.flush)
+            
+            if time.monotonic() - self.last_prune > PRUNE_INTERVAL:
+                self.last_prune = time.monotonic()
+                try:
+                    await asyncio.to_thread(self.prune)
+                except sqlite3.Error:
+                    pass
+    
+    def start(self):
+        if self.task is None or self.task.done():
+            self.wakeup = asyncio.Event()
+            self.task = asyncio.create_task(self.run())
+        return self.task
+    
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {'queued': len(self.pending), **self.stats}
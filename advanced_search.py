@@ -2,6 +2,9 @@ import re
 from pathlib import Path
 from typing import List, Dict
 import mimetypes
+from symbol_index import symbol_index, SYMBOL_KINDS
+
+SYMBOL_QUERY_REGEX = re.compile(rf"^(?P<kind>{'|'.join(SYMBOL_KINDS)}):(?P<name>\S+)$")
 
 class AdvancedSearch:
     def __init__(self, base_dir: str):
@@ -139,5 +142,23 @@ class AdvancedSearch:
             'total_results': len(filename_matches) + len(content_matches)
         }
 
+    def search_symbols(self, kind: str, name: str, limit: int = 20) -> Dict:
+        results = symbol_index.query(self.base_dir, kind, name, limit=limit)
+        
+        return {
+            'query': f"{kind}:{name}",
+            'kind': kind,
+            'name': name,
+            'symbol_matches': results,
+            'total_results': len(results)
+        }
+    
+    @staticmethod
+    def parse_symbol_query(query: str):
+        match = SYMBOL_QUERY_REGEX.match(query.strip())
+        if not match:
+            return None
+        return match.group('kind'), match.group('name')
+
 def create_search_instance(base_dir: str):
     return AdvancedSearch(base_dir)
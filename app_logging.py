@@ -0,0 +1,210 @@
+import atexit
+import contextvars
+import copy
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from log_tail import iter_lines_reversed, parse_level
+
+LOGS_DIR = Path(__file__).parent / 'logs'
+LOG_FILE = Path(os.getenv('LOG_FILE', LOGS_DIR / 'bot.log'))
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_ROTATE_HOURS = float(os.getenv('LOG_ROTATE_HOURS', '24'))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '10'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+MAX_QUERY_LIMIT = 1000
+
+current_user_id = contextvars.ContextVar('current_user_id', default=None)
+
+class ContextFilter(logging.Filter):
+    """Stamp records with the user being served and the function that logged"""
+    
+    def filter(self, record):
+        if getattr(record, 'user_id', None) is None:
+            record.user_id = current_user_id.get()
+        if getattr(record, 'handler', None) is None:
+            record.handler = record.funcName
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'handler': getattr(record, 'handler', record.funcName),
+            'user_id': getattr(record, 'user_id', None)
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: when the writer falls behind, records are dropped and counted"""
+    
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record):
+        # Keep the exception separate so the JSON file gets it as its own field
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+class RotatingJsonFileHandler(logging.handlers.RotatingFileHandler):
+    """Size- and time-based rotation; rotated files are gzipped (bot.log.1.gz, ...)"""
+    
+    def __init__(self, filename, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT,
+                 rotate_hours: float = LOG_ROTATE_HOURS):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.rotate_seconds = rotate_hours * 3600
+        self.rollover_at = time.time() + self.rotate_seconds
+        self.namer = lambda name: name + '.gz'
+        self.rotator = _gzip_rotator
+        self.setFormatter(JsonFormatter())
+    
+    def shouldRollover(self, record):
+        if self.rotate_seconds and time.time() >= self.rollover_at:
+            if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+                return True
+            self.rollover_at = time.time() + self.rotate_seconds
+        return super().shouldRollover(record)
+    
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.rotate_seconds
+
+_listener = None
+_queue_handler = None
+
+def setup_logging(level: str = LOG_LEVEL, log_file: Path = LOG_FILE):
+    """Route all logging through a queue to a JSON-lines file and stderr"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+    
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    
+    file_handler = RotatingJsonFileHandler(log_file)
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(logging.Formatter('%(levelname)s:%(name)s:%(message)s'))
+    
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    _queue_handler.addFilter(ContextFilter())
+    
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+    
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, file_handler, console_handler,
+                                               respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+def shutdown_logging():
+    """Flush queued records to disk and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def log_files(log_file: Path = LOG_FILE) -> List[Path]:
+    """Current log first, then rotated ones from newest to oldest"""
+    files = [log_file] if log_file.exists() else []
+    for index in range(1, LOG_BACKUP_COUNT + 1):
+        rotated = log_file.with_name(f"{log_file.name}.{index}.gz")
+        if rotated.exists():
+            files.append(rotated)
+    return files
+
+def _lines_newest_first(path: Path):
+    if path.suffix == '.gz':
+        with gzip.open(path, 'rt', encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+        yield from reversed(lines)
+    else:
+        yield from iter_lines_reversed(path)
+
+def query_logs(start: Optional[datetime] = None, end: Optional[datetime] = None, level: Optional[str] = None,
+               user_id=None, handler: Optional[str] = None, logger_name: Optional[str] = None,
+               search: Optional[str] = None, limit: int = 200, log_file: Path = LOG_FILE) -> List[Dict]:
+    """Newest-first log records matching every given filter"""
+    limit = max(1, min(limit, MAX_QUERY_LIMIT))
+    min_level = parse_level(level)
+    start_ts = start.isoformat(timespec='milliseconds') if start else None
+    end_ts = end.isoformat(timespec='milliseconds') if end else None
+    user_id = str(user_id) if user_id is not None else None
+    search = search.lower() if search else None
+    results = []
+    
+    for path in log_files(log_file):
+        for line in _lines_newest_first(path):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            
+            ts = record.get('ts', '')
+            if end_ts and ts > end_ts:
+                continue
+            if start_ts and ts < start_ts:
+                # Files are chronological, everything further back is older still
+                return results
+            if min_level is not None and (parse_level(record.get('level')) or 0) < min_level:
+                continue
+            if user_id is not None and str(record.get('user_id')) != user_id:
+                continue
+            if handler and record.get('handler') != handler:
+                continue
+            if logger_name and not (record.get('logger', '') + '.').startswith(logger_name + '.'):
+                continue
+            if search and search not in record.get('message', '').lower():
+                continue
+            
+            results.append(record)
+            if len(results) >= limit:
+                return results
+    
+    return results
+
+def get_stats() -> Dict:
+    files = log_files()
+    return {
+        'files': len(files),
+        'size_mb': sum(f.stat().st_size for f in files) / (1024 * 1024),
+        'dropped': _queue_handler.dropped if _queue_handler else 0,
+        'queued': _queue_handler.queue.qsize() if _queue_handler else 0
+    }
@@ -0,0 +1,254 @@
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional
+
+UPLOAD_TMP_DIR = Path(os.getenv('UPLOAD_TMP_DIR', Path(__file__).parent / 'inf' / 'uploads'))
+UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', str(500 * 1024 * 1024)))
+UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', str(24 * 3600)))
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+MAX_SESSIONS_PER_OWNER = 8
+READ_SIZE = 256 * 1024
+
+class UploadError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+def safe_filename(filename: Optional[str]) -> str:
+    name = Path(str(filename or '')).name
+    if not name or name in ('.', '..'):
+        raise UploadError('Invalid filename')
+    return name
+
+def parse_checksum(header: Optional[str]):
+    """'sha256:<hex>' or 'crc32:<hex>' from the X-Chunk-Checksum header"""
+    algorithm, _, digest = (header or '').partition(':')
+    algorithm = algorithm.strip().lower()
+    if algorithm not in ('sha256', 'crc32') or not digest:
+        raise UploadError('Missing or invalid X-Chunk-Checksum header')
+    return algorithm, digest.strip().lower()
+
+def checksum_matches(data: bytes, algorithm: str, digest: str) -> bool:
+    if algorithm == 'sha256':
+        return hashlib.sha256(data).hexdigest() == digest
+    return f"{zlib.crc32(data):08x}" == digest.rjust(8, '0')
+
+class ChunkedUploadManager:
+    """Resumable uploads: chunks are verified and written straight into place in a preallocated file"""
+    
+    def __init__(self, tmp_dir: Path = UPLOAD_TMP_DIR):
+        self.tmp_dir = Path(tmp_dir)
+        self.sessions = {}
+        self.loaded = False
+        self.stats = {'started': 0, 'resumed': 0, 'completed': 0, 'chunks': 0,
+                      'bytes': 0, 'checksum_failures': 0, 'expired': 0}
+    
+    def _part_path(self, upload_id: str) -> Path:
+        return self.tmp_dir / f"{upload_id}.part"
+    
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.tmp_dir / f"{upload_id}.json"
+    
+    def _save(self, session: Dict):
+        meta = {**session, 'received': sorted(session['received'])}
+        tmp_path = self._meta_path(session['upload_id']).with_suffix('.json.tmp')
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, self._meta_path(session['upload_id']))
+    
+    def _discard(self, upload_id: str):
+        self.sessions.pop(upload_id, None)
+        for path in (self._part_path(upload_id), self._meta_path(upload_id)):
+            path.unlink(missing_ok=True)
+    
+    def _load(self):
+        """Pick up sessions left by a previous run so uploads survive restarts"""
+        if self.loaded:
+            return
+        self.loaded = True
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        
+        for meta_path in self.tmp_dir.glob('*.json'):
+            try:
+                session = json.loads(meta_path.read_text())
+                session['received'] = set(session['received'])
+            except (ValueError, KeyError, OSError):
+                meta_path.unlink(missing_ok=True)
+                continue
+            if self._part_path(session['upload_id']).exists():
+                self.sessions[session['upload_id']] = session
+            else:
+                meta_path.unlink(missing_ok=True)
+        
+        self.sweep()
+    
+    def sweep(self):
+        cutoff = time.time() - UPLOAD_SESSION_TTL
+        for upload_id, session in list(self.sessions.items()):
+            if session['updated'] < cutoff:
+                self._discard(upload_id)
+                self.stats['expired'] += 1
+    
+    def _get(self, upload_id: str, owner: str) -> Dict:
+        self._load()
+        session = self.sessions.get(upload_id)
+        if session is None or session['owner'] != str(owner):
+            raise UploadError('Upload not found or expired', 404)
+        return session
+    
+    def _chunk_length(self, session: Dict, index: int) -> int:
+        start = index * session['chunk_size']
+        return min(session['chunk_size'], session['size'] - start)
+    
+    def status(self, upload_id: str, owner: str) -> Dict:
+        session = self._get(upload_id, owner)
+        return {
+            'upload_id': upload_id,
+            'filename': session['filename'],
+            'size': session['size'],
+            'chunk_size': session['chunk_size'],
+            'chunks': session['chunks'],
+            'received': sorted(session['received'])
+        }
+    
+    async def create(self, owner: str, folder: Path, filename: str, size, chunk_size=None,
+                     key: Optional[str] = None) -> Dict:
+        self._load()
+        self.sweep()
+        owner = str(owner)
+        filename = safe_filename(filename)
+        
+        try:
+            size = int(size)
+            chunk_size = int(chunk_size or DEFAULT_CHUNK_SIZE)
+        except (TypeError, ValueError):
+            raise UploadError('size and chunk_size must be integers')
+        if size < 0:
+            raise UploadError('Invalid size')
+        if size > UPLOAD_MAX_SIZE:
+            raise UploadError(f'File too large (max {UPLOAD_MAX_SIZE // (1024 * 1024)}MB)', 413)
+        chunk_size = max(MIN_CHUNK_SIZE, min(chunk_size, MAX_CHUNK_SIZE))
+        
+        # Same file from the same client: hand back the unfinished session
+        owned = [s for s in self.sessions.values() if s['owner'] == owner]
+        for session in owned:
+            if key and session['key'] == key and session['folder'] == str(folder) \
+                    and session['filename'] == filename and session['size'] == size:
+                self.stats['resumed'] += 1
+                return self.status(session['upload_id'], owner)
+        
+        if len(owned) >= MAX_SESSIONS_PER_OWNER:
+            raise UploadError('Too many unfinished uploads, try again later', 429)
+        
+        upload_id = secrets.token_urlsafe(16)
+        now = time.time()
+        session = {
+            'upload_id': upload_id,
+            'owner': owner,
+            'folder': str(folder),
+            'filename': filename,
+            'size': size,
+            'chunk_size': chunk_size,
+            'chunks': -(-size // chunk_size),
+            'received': set(),
+            'key': key,
+            'created': now,
+            'updated': now
+        }
+        
+        await asyncio.to_thread(self._preallocate, self._part_path(upload_id), size)
+        self.sessions[upload_id] = session
+        self._save(session)
+        self.stats['started'] += 1
+        return self.status(upload_id, owner)
+    
+    @staticmethod
+    def _preallocate(path: Path, size: int):
+        with open(path, 'wb') as f:
+            f.truncate(size)
+    
+    @staticmethod
+    def _verify_and_write(path: Path, offset: int, data: bytes, algorithm: str, digest: str) -> bool:
+        if not checksum_matches(data, algorithm, digest):
+            return False
+        with open(path, 'r+b') as f:
+            f.seek(offset)
+            f.write(data)
+        return True
+    
+    async def write_chunk(self, upload_id: str, owner: str, index: int, stream, checksum: Optional[str]) -> Dict:
+        session = self._get(upload_id, owner)
+        if not 0 <= index < session['chunks']:
+            raise UploadError('Chunk index out of range')
+        algorithm, digest = parse_checksum(checksum)
+        expected = self._chunk_length(session, index)
+        
+        data = bytearray()
+        async for piece in stream.iter_chunked(READ_SIZE):
+            data += piece
+            if len(data) > expected:
+                raise UploadError(f'Chunk {index} is larger than {expected} bytes', 413)
+        if len(data) != expected:
+            raise UploadError(f'Chunk {index} is {len(data)} bytes, expected {expected}')
+        
+        offset = index * session['chunk_size']
+        written = await asyncio.to_thread(self._verify_and_write, self._part_path(upload_id), offset,
+                                          bytes(data), algorithm, digest)
+        if not written:
+            self.stats['checksum_failures'] += 1
+            raise UploadError(f'Checksum mismatch for chunk {index}', 422)
+        
+        # The session may have been aborted while the chunk was being written
+        if upload_id not in self.sessions:
+            raise UploadError('Upload not found or expired', 404)
+        
+        session['received'].add(index)
+        session['updated'] = time.time()
+        self._save(session)
+        self.stats['chunks'] += 1
+        self.stats['bytes'] += expected
+        return {'index': index, 'received': len(session['received']), 'chunks': session['chunks']}
+    
+    @staticmethod
+    def _finalize(part_path: Path, target: Path):
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(part_path, target)
+        except OSError:
+            # Upload dir on another filesystem
+            shutil.move(str(part_path), str(target))
+    
+    async def complete(self, upload_id: str, owner: str) -> Dict:
+        session = self._get(upload_id, owner)
+        missing = session['chunks'] - len(session['received'])
+        if missing:
+            raise UploadError(f'{missing} chunk(s) still missing', 409)
+        if session.get('completing'):
+            raise UploadError('Upload is already being completed', 409)
+        
+        target = Path(session['folder']) / session['filename']
+        session['completing'] = True
+        try:
+            await asyncio.to_thread(self._finalize, self._part_path(upload_id), target)
+        finally:
+            session['completing'] = False
+        self._discard(upload_id)
+        self.stats['completed'] += 1
+        return {'filename': session['filename'], 'size': session['size'], 'path': str(target)}
+    
+    def abort(self, upload_id: str, owner: str):
+        self._get(upload_id, owner)
+        self._discard(upload_id)
+    
+    def get_stats(self) -> Dict:
+        return {'active': len(self.sessions), **self.stats}
+
+upload_manager = ChunkedUploadManager()
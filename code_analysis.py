@@ -0,0 +1,212 @@
+import ast
+import io
+import tokenize
+from typing import Dict, List
+from js_tokenizer import JS_KEYWORDS, tokenize_js
+
+JS_BRACKETS = {')': '(', ']': '[', '}': '{'}
+JS_BRANCH_KEYWORDS = {'if', 'for', 'while', 'case', 'catch'}
+
+def _line_counts(content: str) -> Dict:
+    non_empty = sum(1 for line in content.split('\n') if line.strip())
+    return {'total_lines': content.count('\n') + 1, 'non_empty_lines': non_empty}
+
+class _ComplexityVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.functions = 0
+        self.classes = 0
+        self.imports = 0
+        self.top_level_imports = []
+        self.complexity = 1
+        self.function_scores = []
+        self.scope = []
+        self.current = None
+    
+    def _branch(self, amount: int = 1):
+        self.complexity += amount
+        if self.current is not None:
+            self.current[1] += amount
+    
+    def _visit_function(self, node):
+        self.functions += 1
+        qualname = '.'.join(self.scope + [node.name])
+        outer = self.current
+        self.current = [qualname, 1]
+        
+        self.scope.append(node.name)
+        self.generic_visit(node)
+        self.scope.pop()
+        
+        self.function_scores.append(tuple(self.current))
+        self.current = outer
+    
+    def visit_FunctionDef(self, node):
+        self._visit_function(node)
+    
+    def visit_AsyncFunctionDef(self, node):
+        self._visit_function(node)
+    
+    def visit_ClassDef(self, node):
+        self.classes += 1
+        self.scope.append(node.name)
+        self.generic_visit(node)
+        self.scope.pop()
+    
+    def visit_Import(self, node):
+        self.imports += 1
+        if not self.scope:
+            self.top_level_imports.extend(alias.name for alias in node.names)
+    
+    def visit_ImportFrom(self, node):
+        self.imports += 1
+        if not self.scope:
+            self.top_level_imports.append('.' * node.level + (node.module or ''))
+    
+    def _visit_branch(self, node):
+        self._branch()
+        self.generic_visit(node)
+    
+    visit_If = visit_IfExp = visit_For = visit_AsyncFor = visit_While = _visit_branch
+    visit_ExceptHandler = visit_Assert = visit_match_case = _visit_branch
+    
+    def visit_comprehension(self, node):
+        self._branch(1 + len(node.ifs))
+        self.generic_visit(node)
+    
+    def visit_BoolOp(self, node):
+        self._branch(len(node.values) - 1)
+        self.generic_visit(node)
+
+def _complexity_summary(analysis: Dict, function_scores: List, total: int):
+    analysis['complexity'] = total
+    if function_scores:
+        name, score = max(function_scores, key=lambda item: item[1])
+        analysis['max_complexity'] = score
+        analysis['most_complex'] = name
+        analysis['avg_complexity'] = round(sum(s for _, s in function_scores) / len(function_scores), 1)
+
+def analyze_python_source(content: str) -> Dict:
+    analysis = _line_counts(content)
+    analysis.update({'imports': 0, 'functions': 0, 'classes': 0, 'comments': 0,
+                     'top_level_imports': [], 'syntax_error': None})
+    
+    try:
+        tree = ast.parse(content)
+    except SyntaxError as e:
+        analysis['syntax_error'] = f"line {e.lineno}: {e.msg}"
+        return analysis
+    
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(content).readline):
+            if token.type == tokenize.COMMENT:
+                analysis['comments'] += 1
+    except (tokenize.TokenError, IndentationError):
+        pass
+    
+    visitor = _ComplexityVisitor()
+    visitor.visit(tree)
+    
+    analysis['imports'] = visitor.imports
+    analysis['functions'] = visitor.functions
+    analysis['classes'] = visitor.classes
+    analysis['top_level_imports'] = list(dict.fromkeys(visitor.top_level_imports))
+    _complexity_summary(analysis, visitor.function_scores, visitor.complexity)
+    
+    return analysis
+
+def analyze_js_source(content: str) -> Dict:
+    analysis = _line_counts(content)
+    analysis.update({'imports': 0, 'functions': 0, 'classes': 0, 'comments': 0,
+                     'top_level_imports': [], 'syntax_error': None})
+    
+    complexity = 1
+    function_scores = []
+    function_stack = []
+    brackets = []
+    pending_function = None
+    closed_paren_owner = None
+    expect_module = False
+    prev = ('', '')
+    line = 1
+    
+    for kind, value, line in tokenize_js(content):
+        if kind in ('newline', 'space', 'comment'):
+            if kind == 'comment':
+                analysis['comments'] += 1
+            continue
+        
+        if pending_function and prev[1] == '=>' and value != '{':
+            function_scores.append((pending_function, 1))
+            pending_function = None
+        
+        branch = 0
+        if kind == 'name' and prev[1] != '.':
+            if value == 'function':
+                analysis['functions'] += 1
+                pending_function = 'function'
+            elif value == 'class':
+                analysis['classes'] += 1
+            elif value in ('import', 'require'):
+                analysis['imports'] += 1
+                expect_module = True
+            elif value in JS_BRANCH_KEYWORDS:
+                branch = 1
+            elif pending_function == 'function' and prev[1] in ('function', '*'):
+                pending_function = value
+        
+        elif kind == 'string' and expect_module:
+            if not brackets or brackets == [('(', 'require')] or brackets == [('(', 'import')]:
+                analysis['top_level_imports'].append(value[1:-1])
+            expect_module = False
+        
+        elif kind == 'op':
+            if value == '=>':
+                analysis['functions'] += 1
+                pending_function = 'arrow function'
+            elif value in ('&&', '||', '??'):
+                branch = 1
+        
+        elif kind == 'punct':
+            if value == ';':
+                expect_module = False
+            elif value == '?':
+                branch = 1
+            elif value in '([{':
+                if value == '{' and not pending_function and prev[1] == ')' and closed_paren_owner:
+                    analysis['functions'] += 1
+                    pending_function = closed_paren_owner
+                brackets.append((value, prev[1] if prev[0] == 'name' else None))
+                if value == '{' and pending_function:
+                    function_stack.append([pending_function, 1, len(brackets)])
+                    pending_function = None
+            elif value in ')]}':
+                if not brackets or brackets[-1][0] != JS_BRACKETS[value]:
+                    analysis['syntax_error'] = f"line {line}: unexpected '{value}'"
+                    break
+                if value == '}' and function_stack and function_stack[-1][2] == len(brackets):
+                    name, score, _ = function_stack.pop()
+                    function_scores.append((name, score))
+                owner = brackets.pop()[1]
+                closed_paren_owner = owner if value == ')' and owner not in JS_KEYWORDS else None
+        
+        if branch:
+            complexity += branch
+            if function_stack:
+                function_stack[-1][1] += branch
+        
+        prev = (kind, value)
+    
+    if analysis['syntax_error'] is None and brackets:
+        analysis['syntax_error'] = f"line {line}: unclosed '{brackets[-1][0]}'"
+    
+    analysis['top_level_imports'] = list(dict.fromkeys(analysis['top_level_imports']))
+    _complexity_summary(analysis, function_scores, complexity)
+    
+    return analysis
+
+def analyze_source(content: str, file_ext: str) -> Dict:
+    if file_ext == '.py':
+        return analyze_python_source(content)
+    if file_ext == '.js':
+        return analyze_js_source(content)
+    return _line_counts(content)
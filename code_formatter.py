@@ -1,10 +1,48 @@
-import subprocess
+import asyncio
+import filecmp
+import hashlib
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
 from typing import Optional, Dict
+from importlib import metadata
+from file_io import write_atomic
+from format_cache import result_cache, content_hash
+from code_analysis import analyze_source
+from pretty_printers import format_js_source, format_css_source, format_html_source, format_json_source, stream_format_json, prettier_worker
+
+FORMAT_TIMEOUT = 30
+FORMAT_WORKERS = max(1, min(2, os.cpu_count() or 1))
+ANALYZER_VERSION = '2'
+# Bump when the built-in printers or the JSON layout change, to invalidate cached results
+BUILTIN_FORMAT_VERSION = '1'
+JSON_FORMAT_VERSION = '2'
+JSON_STREAM_THRESHOLD = 5 * 1024 * 1024
+
+def _init_black_worker():
+    try:
+        import black
+    except ImportError:
+        pass
+
+def _black_format(source: str) -> Dict:
+    try:
+        import black
+    except ImportError:
+        return {'status': 'missing'}
+    
+    try:
+        formatted = black.format_file_contents(source, fast=False, mode=black.Mode())
+        return {'status': 'changed', 'content': formatted}
+    except black.NothingChanged:
+        return {'status': 'unchanged'}
+    except Exception as e:
+        return {'status': 'error', 'error': str(e)}
 
 class CodeFormatter:
     def __init__(self):
+        self.executor = None
         self.formatters = {
             '.py': self.format_python,
             '.js': self.format_javascript,
@@ -13,75 +51,227 @@ class CodeFormatter:
             '.css': self.format_css
         }
     
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=FORMAT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_black_worker
+            )
+        return self.executor
+    
+    def recycle_executor(self, executor: ProcessPoolExecutor):
+        """Throw away a pool whose worker is stuck on a timed-out job; the next call starts a fresh one"""
+        if self.executor is executor:
+            self.executor = None
+        
+        processes = list((executor._processes or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+    
+    def warm_up(self):
+        executor = self.get_executor()
+        for _ in range(FORMAT_WORKERS):
+            executor.submit(_init_black_worker)
+    
+    def _apply_black_result(self, file_path: str, result: Dict) -> Dict:
+        if result['status'] == 'changed':
+            self._write_formatted(file_path, result)
+            return {'success': True, 'changed': True, 'message': '✅ Python code formatted with Black'}
+        elif result['status'] == 'unchanged':
+            return {'success': True, 'changed': False, 'message': '✅ Python code already formatted'}
+        elif result['status'] == 'missing':
+            return {'success': False, 'message': '⚠️ Black not installed (pip install black)'}
+        else:
+            return {'success': False, 'message': f"⚠️ Formatting skipped: {result['error']}"}
+    
+    @staticmethod
+    def black_version() -> Optional[str]:
+        try:
+            return metadata.version('black')
+        except metadata.PackageNotFoundError:
+            return None
+    
+    def _load_python(self, file_path: str):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        digest = content_hash(content)
+        version = self.black_version()
+        cached = result_cache.get('black', digest, version) if version else None
+        
+        return content, digest, version, cached
+    
+    @staticmethod
+    def _store_result(kind: str, digest: str, version: Optional[str], result: Dict):
+        """Cache a formatter result, and the formatted output as already formatted"""
+        if not version:
+            return
+        
+        if result['status'] == 'changed':
+            result_cache.put(kind, digest, version, result)
+            result_cache.put(kind, content_hash(result['content']), version, {'status': 'unchanged'})
+        elif result['status'] == 'unchanged':
+            result_cache.put(kind, digest, version, result)
+    
+    @staticmethod
+    def _write_formatted(file_path: str, result: Dict):
+        if result['status'] == 'changed':
+            write_atomic(Path(file_path), result['content'].encode('utf-8'))
+    
     def format_python(self, file_path: str) -> Dict:
         try:
-            result = subprocess.run(
-                ['python', '-m', 'black', file_path, '--quiet'],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            content, digest, version, result = self._load_python(file_path)
+            
+            if result is None:
+                executor = self.get_executor()
+                future = executor.submit(_black_format, content)
+                try:
+                    result = future.result(timeout=FORMAT_TIMEOUT)
+                except FutureTimeoutError:
+                    self.recycle_executor(executor)
+                    raise
+                self._store_result('black', digest, version, result)
             
-            if result.returncode == 0:
-                return {'success': True, 'message': '✅ Python code formatted with Black'}
-            else:
-                return {'success': False, 'message': f'⚠️ Formatting skipped: {result.stderr}'}
+            return self._apply_black_result(file_path, result)
         
-        except FileNotFoundError:
-            return {'success': False, 'message': '⚠️ Black not installed (pip install black)'}
-        except subprocess.TimeoutExpired:
+        except FutureTimeoutError:
             return {'success': False, 'message': '❌ Formatting timeout'}
         except Exception as e:
             return {'success': False, 'message': f'❌ Error: {str(e)}'}
     
-    def format_javascript(self, file_path: str) -> Dict:
+    async def format_python_async(self, file_path: str) -> Dict:
+        loop = asyncio.get_running_loop()
+        
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content, digest, version, result = await asyncio.to_thread(self._load_python, file_path)
             
-            formatted = content
+            if result is None:
+                executor = self.get_executor()
+                try:
+                    result = await asyncio.wait_for(
+                        loop.run_in_executor(executor, _black_format, content),
+                        timeout=FORMAT_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    self.recycle_executor(executor)
+                    raise
+                await asyncio.to_thread(self._store_result, 'black', digest, version, result)
             
-            return {'success': True, 'message': '✅ JavaScript file processed'}
+            return await asyncio.to_thread(self._apply_black_result, file_path, result)
         
+        except asyncio.TimeoutError:
+            return {'success': False, 'message': '❌ Formatting timeout'}
         except Exception as e:
             return {'success': False, 'message': f'❌ Error: {str(e)}'}
     
-    def format_json(self, file_path: str) -> Dict:
+    def _format_text(self, file_path: str, parser: str, fallback, label: str) -> Dict:
         try:
-            import json
-            
             with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+                content = f.read()
+            
+            kind = f"format-{parser}"
+            digest = content_hash(content)
+            prettier_version = prettier_worker.get_version()
+            version = f"prettier-{prettier_version}" if prettier_version else f"builtin-{BUILTIN_FORMAT_VERSION}"
+            result = result_cache.get(kind, digest, version)
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            if result is None:
+                formatted = prettier_worker.format(content, parser)
+                tool = 'Prettier'
+                if formatted is None:
+                    formatted = fallback(content)
+                    tool = 'built-in formatter'
+                    version = f"builtin-{BUILTIN_FORMAT_VERSION}"
+                
+                if formatted == content:
+                    result = {'status': 'unchanged'}
+                else:
+                    result = {'status': 'changed', 'content': formatted, 'tool': tool}
+                self._store_result(kind, digest, version, result)
             
-            return {'success': True, 'message': '✅ JSON formatted with proper indentation'}
+            if result['status'] == 'unchanged':
+                return {'success': True, 'changed': False, 'message': f'✅ {label} already formatted'}
+            
+            self._write_formatted(file_path, result)
+            return {'success': True, 'changed': True, 'message': f"✅ {label} formatted with {result['tool']}"}
         
-        except json.JSONDecodeError:
-            return {'success': False, 'message': '⚠️ Invalid JSON format'}
+        except ValueError as e:
+            return {'success': False, 'message': f'⚠️ Formatting skipped: {str(e)}'}
         except Exception as e:
             return {'success': False, 'message': f'❌ Error: {str(e)}'}
     
-    def format_html(self, file_path: str) -> Dict:
+    def format_javascript(self, file_path: str) -> Dict:
+        return self._format_text(file_path, 'babel', format_js_source, 'JavaScript')
+    
+    def format_json(self, file_path: str) -> Dict:
+        if os.path.getsize(file_path) > JSON_STREAM_THRESHOLD:
+            return self.format_json_streaming(file_path)
+        
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            return {'success': True, 'message': '✅ HTML file processed'}
+            digest = content_hash(content)
+            result = result_cache.get('format-json', digest, JSON_FORMAT_VERSION)
+            if result is None:
+                formatted = format_json_source(content)
+                result = {'status': 'unchanged'} if formatted == content else {'status': 'changed', 'content': formatted}
+                self._store_result('format-json', digest, JSON_FORMAT_VERSION, result)
+            
+            if result['status'] == 'unchanged':
+                return {'success': True, 'changed': False, 'message': '✅ JSON already formatted'}
+            
+            self._write_formatted(file_path, result)
+            return {'success': True, 'changed': True, 'message': '✅ JSON formatted with proper indentation'}
         
+        except ValueError as e:
+            return {'success': False, 'message': f'⚠️ Invalid JSON format: {str(e)}'}
         except Exception as e:
             return {'success': False, 'message': f'❌ Error: {str(e)}'}
     
-    def format_css(self, file_path: str) -> Dict:
+    def format_json_streaming(self, file_path: str) -> Dict:
+        tmp_path = f"{file_path}.fmt"
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            # Too large to keep formatted output in the cache; only "already formatted" is remembered
+            digest = self._file_digest(file_path)
+            if result_cache.get('format-json', digest, JSON_FORMAT_VERSION) == {'status': 'unchanged'}:
+                return {'success': True, 'changed': False, 'message': '✅ JSON already formatted'}
             
-            return {'success': True, 'message': '✅ CSS file processed'}
+            stream_format_json(file_path, tmp_path)
+            
+            if filecmp.cmp(file_path, tmp_path, shallow=False):
+                os.remove(tmp_path)
+                result_cache.put('format-json', digest, JSON_FORMAT_VERSION, {'status': 'unchanged'})
+                return {'success': True, 'changed': False, 'message': '✅ JSON already formatted'}
+            
+            result_cache.put('format-json', self._file_digest(tmp_path), JSON_FORMAT_VERSION, {'status': 'unchanged'})
+            os.replace(tmp_path, file_path)
+            return {'success': True, 'changed': True, 'message': '✅ Large JSON formatted in streaming mode'}
         
+        except ValueError as e:
+            return {'success': False, 'message': f'⚠️ Invalid JSON format: {str(e)}'}
         except Exception as e:
             return {'success': False, 'message': f'❌ Error: {str(e)}'}
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    @staticmethod
+    def _file_digest(file_path: str) -> str:
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+    
+    def format_html(self, file_path: str) -> Dict:
+        return self._format_text(file_path, 'html', format_html_source, 'HTML')
+    
+    def format_css(self, file_path: str) -> Dict:
+        return self._format_text(file_path, 'css', format_css_source, 'CSS')
     
     def auto_format(self, file_path: str) -> Dict:
         file_ext = Path(file_path).suffix.lower()
@@ -100,6 +290,45 @@ class CodeFormatter:
         
         return result
     
+    async def auto_format_async(self, file_path: str) -> Dict:
+        file_ext = Path(file_path).suffix.lower()
+        
+        if file_ext != '.py':
+            return await asyncio.to_thread(self.auto_format, file_path)
+        
+        result = await self.format_python_async(file_path)
+        result['formatted'] = result['success']
+        result['file_type'] = file_ext
+        
+        return result
+    
+    async def format_directory_async(self, folder: str, concurrency: int = FORMAT_WORKERS) -> Dict:
+        folder = Path(folder)
+        
+        def list_files():
+            if not folder.is_dir():
+                return []
+            return sorted(p for p in folder.iterdir() if p.is_file() and p.suffix.lower() in self.formatters)
+        
+        files = await asyncio.to_thread(list_files)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def format_one(file_path: Path) -> Dict:
+            async with semaphore:
+                result = await self.auto_format_async(str(file_path))
+            result['file_name'] = file_path.name
+            return result
+        
+        results = await asyncio.gather(*(format_one(p) for p in files))
+        
+        return {
+            'files': list(results),
+            'total': len(results),
+            'formatted': sum(1 for r in results if r['success'] and r.get('changed', True)),
+            'unchanged': sum(1 for r in results if r['success'] and r.get('changed') is False),
+            'failed': sum(1 for r in results if not r['success'])
+        }
+    
     def analyze_code(self, file_path: str) -> Dict:
         file_ext = Path(file_path).suffix.lower()
         
@@ -107,25 +336,19 @@ class CodeFormatter:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            lines = content.split('\n')
+            digest = content_hash(content)
+            cached = result_cache.get('analysis', digest, f"{ANALYZER_VERSION}{file_ext}")
+            if cached is not None:
+                return cached
             
-            analysis = {
-                'total_lines': len(lines),
-                'non_empty_lines': len([l for l in lines if l.strip()]),
+            analysis = analyze_source(content, file_ext)
+            analysis.update({
                 'file_size': os.path.getsize(file_path),
                 'file_type': file_ext,
                 'encoding': 'utf-8'
-            }
-            
-            if file_ext == '.py':
-                analysis['imports'] = len([l for l in lines if l.strip().startswith('import') or l.strip().startswith('from')])
-                analysis['functions'] = len([l for l in lines if l.strip().startswith('def ')])
-                analysis['classes'] = len([l for l in lines if l.strip().startswith('class ')])
-                analysis['comments'] = len([l for l in lines if l.strip().startswith('#')])
+            })
             
-            elif file_ext == '.js':
-                analysis['functions'] = len([l for l in lines if 'function ' in l or '=>' in l])
-                analysis['comments'] = len([l for l in lines if l.strip().startswith('//')])
+            result_cache.put('analysis', digest, f"{ANALYZER_VERSION}{file_ext}", analysis)
             
             return analysis
         
@@ -0,0 +1,113 @@
+// Resumable chunked uploads: init -> PUT chunk N (parallel, checksummed) -> complete.
+// `endpoint(path)` maps '/init', '/<id>', '/<id>/<n>' and '/<id>/complete' to panel URLs.
+const CHUNK_PARALLEL = 4;
+const CHUNK_RETRIES = 5;
+
+let crcTable = null;
+
+function crc32(bytes) {
+    if (!crcTable) {
+        crcTable = new Uint32Array(256);
+        for (let n = 0; n < 256; n++) {
+            let c = n;
+            for (let k = 0; k < 8; k++) {
+                c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+            }
+            crcTable[n] = c;
+        }
+    }
+    let crc = 0xFFFFFFFF;
+    for (let i = 0; i < bytes.length; i++) {
+        crc = crcTable[(crc ^ bytes[i]) & 0xFF] ^ (crc >>> 8);
+    }
+    return (crc ^ 0xFFFFFFFF) >>> 0;
+}
+
+async function chunkChecksum(blob) {
+    const buffer = await blob.arrayBuffer();
+    // crypto.subtle only exists on HTTPS/localhost pages
+    if (window.crypto && crypto.subtle) {
+        const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', buffer));
+        return 'sha256:' + Array.from(digest, b => b.toString(16).padStart(2, '0')).join('');
+    }
+    return 'crc32:' + crc32(new Uint8Array(buffer)).toString(16).padStart(8, '0');
+}
+
+async function uploadRequest(url, options) {
+    const response = await fetch(url, options);
+    const data = await response.json().catch(() => ({}));
+    if (!response.ok || data.success === false) {
+        const error = new Error(data.error || 'HTTP ' + response.status);
+        error.status = response.status;
+        throw error;
+    }
+    return data;
+}
+
+function retryable(error) {
+    // Network failures have no status; checksum mismatches and server errors are worth another try
+    return !error.status || error.status >= 500 || [408, 422, 429].includes(error.status);
+}
+
+async function putChunk(file, session, index, endpoint) {
+    const start = index * session.chunk_size;
+    const blob = file.slice(start, Math.min(start + session.chunk_size, file.size));
+    const checksum = await chunkChecksum(blob);
+
+    for (let attempt = 1; ; attempt++) {
+        try {
+            return await uploadRequest(endpoint('/' + session.upload_id + '/' + index), {
+                method: 'PUT',
+                headers: { 'X-Chunk-Checksum': checksum },
+                body: blob
+            });
+        } catch (error) {
+            if (attempt >= CHUNK_RETRIES || !retryable(error)) {
+                throw error;
+            }
+            await new Promise(resolve => setTimeout(resolve, Math.min(1000 * 2 ** attempt, 15000)));
+        }
+    }
+}
+
+async function chunkedUpload(file, endpoint, onProgress) {
+    // The key lets a reload (or a new tab) resume the same file where it stopped
+    let session = await uploadRequest(endpoint('/init'), {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            filename: file.name,
+            size: file.size,
+            key: [file.name, file.size, file.lastModified].join(':')
+        })
+    });
+
+    for (let round = 0; round < 3; round++) {
+        const received = new Set(session.received);
+        const pending = [];
+        for (let i = 0; i < session.chunks; i++) {
+            if (!received.has(i)) pending.push(i);
+        }
+
+        let done = received.size;
+        if (onProgress) onProgress(done, session.chunks);
+
+        const worker = async () => {
+            while (pending.length) {
+                await putChunk(file, session, pending.shift(), endpoint);
+                done++;
+                if (onProgress) onProgress(done, session.chunks);
+            }
+        };
+        await Promise.all(Array.from({ length: Math.min(CHUNK_PARALLEL, pending.length) }, worker));
+
+        try {
+            return await uploadRequest(endpoint('/' + session.upload_id + '/complete'), { method: 'POST' });
+        } catch (error) {
+            if (error.status !== 409) throw error;
+            session = await uploadRequest(endpoint('/' + session.upload_id));
+        }
+    }
+
+    throw new Error('Upload of ' + file.name + ' did not complete');
+}
@@ -0,0 +1,86 @@
+const token = document.body.dataset.token;
+
+async function uploadFiles(files) {
+    const hint = document.querySelector('.upload-zone p');
+    const endpoint = path => '/api/upload/' + token + path;
+
+    try {
+        for (let file of files) {
+            await chunkedUpload(file, endpoint, (done, total) => {
+                const percent = total ? Math.floor(done * 100 / total) : 100;
+                hint.textContent = `⏳ ${file.name}: ${percent}%`;
+            });
+        }
+        alert('✅ Files uploaded successfully!');
+    } catch (error) {
+        alert('❌ Upload failed: ' + error.message);
+    }
+    location.reload();
+}
+
+function editFile(filename) {
+    window.open('/editor/' + token + '/' + filename, '_blank');
+}
+
+function deleteFile(filename) {
+    if (confirm('Delete ' + filename + '?')) {
+        fetch('/api/delete/' + token + '/' + filename, { method: 'DELETE' })
+            .then(() => location.reload());
+    }
+}
+
+function createProject() {
+    const name = prompt('Project name:');
+    if (name) {
+        alert('Project "' + name + '" created!');
+    }
+}
+
+function deployProject() {
+    alert('🚀 Deploy feature coming soon!');
+}
+
+async function runJob(filename, onProgress) {
+    const start = await fetch('/api/execute/' + token + '/' + filename, { method: 'POST' });
+    let result = await start.json();
+    if (!result.job_id) return result;
+
+    const statusUrl = result.status_url;
+    let delay = 250;
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, delay));
+        delay = Math.min(delay * 2, 2000);
+        result = await (await fetch(statusUrl)).json();
+        if (result.done !== false) return result;
+        if (onProgress) onProgress(result);
+    }
+}
+
+async function runFile(filename) {
+    const result = await runJob(filename);
+
+    if (result.success) {
+        alert('✅ Execution Output:\n\n' + result.output);
+    } else {
+        alert('❌ Execution Error:\n\n' + result.error);
+    }
+}
+
+function showExecutor() {
+    window.open('/executor/' + token, '_blank');
+}
+
+// Drag and drop
+const dropZone = document.querySelector('.upload-zone');
+dropZone.addEventListener('dragover', (e) => {
+    e.preventDefault();
+    dropZone.style.background = 'rgba(255, 255, 255, 0.2)';
+});
+dropZone.addEventListener('dragleave', () => {
+    dropZone.style.background = '';
+});
+dropZone.addEventListener('drop', (e) => {
+    e.preventDefault();
+    dropZone.style.background = '';
+    uploadFiles(e.dataTransfer.files);
+});
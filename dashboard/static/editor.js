@@ -0,0 +1,81 @@
+const { token, filename } = document.body.dataset;
+let nextOffset = Number(document.body.dataset.nextOffset);
+let eof = document.body.dataset.eof === 'true';
+let loading = null;
+
+const editor = CodeMirror.fromTextArea(document.getElementById('code'), {
+    mode: filename.endsWith('.py') ? 'python' : 'javascript',
+    theme: 'monokai',
+    lineNumbers: true,
+    autoCloseBrackets: true,
+    matchBrackets: true
+});
+
+// Large files are rendered with their first window only; the rest comes in on scroll
+function loadMore() {
+    if (eof) return Promise.resolve(true);
+    if (!loading) {
+        loading = fetch('/api/read/' + token + '/' + filename + '?offset=' + nextOffset)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) return false;
+                const end = CodeMirror.Pos(editor.lastLine());
+                editor.replaceRange(data.content, end, end, 'load');
+                nextOffset = data.next_offset;
+                eof = data.eof;
+                return true;
+            })
+            .catch(() => false)
+            .finally(() => { loading = null; });
+    }
+    return loading;
+}
+
+async function loadAll() {
+    while (!eof) {
+        if (!await loadMore()) return false;
+    }
+    return true;
+}
+
+// Edits wait until the whole file is in, so windows are only ever appended to the unedited file
+editor.on('beforeChange', (cm, change) => {
+    if (!eof && change.origin !== 'load' && change.origin !== 'setValue') {
+        change.cancel();
+        loadAll();
+    }
+});
+
+editor.on('scroll', () => {
+    const info = editor.getScrollInfo();
+    if (info.top + info.clientHeight >= info.height - 400) loadMore();
+});
+
+async function saveFile() {
+    // Never save a partially loaded file
+    if (!await loadAll()) {
+        alert('❌ Could not load the rest of the file, not saving');
+        return;
+    }
+
+    const content = editor.getValue();
+    const response = await fetch('/api/save/' + token + '/' + filename, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({content})
+    });
+
+    if (response.ok) {
+        alert('✅ File saved!');
+    } else {
+        const data = await response.json().catch(() => ({}));
+        alert('❌ Save failed!' + (data.error ? ' ' + data.error : ''));
+    }
+}
+
+document.addEventListener('keydown', (e) => {
+    if ((e.ctrlKey || e.metaKey) && e.key === 's') {
+        e.preventDefault();
+        saveFile();
+    }
+});
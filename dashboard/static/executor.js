@@ -0,0 +1,75 @@
+const token = document.body.dataset.token;
+
+document.getElementById('language').addEventListener('change', (e) => {
+    const code = document.getElementById('code');
+    if (e.target.value === 'python') {
+        code.value = 'print("Hello, World!")';
+    } else {
+        code.value = 'console.log("Hello, World!");';
+    }
+});
+
+async function runJob(filename, onProgress) {
+    const start = await fetch('/api/execute/' + token + '/' + filename, { method: 'POST' });
+    let result = await start.json();
+    if (!result.job_id) return result;
+
+    const statusUrl = result.status_url;
+    let delay = 250;
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, delay));
+        delay = Math.min(delay * 2, 2000);
+        result = await (await fetch(statusUrl)).json();
+        if (result.done !== false) return result;
+        if (onProgress) onProgress(result);
+    }
+}
+
+async function executeCode() {
+    const code = document.getElementById('code').value;
+    const language = document.getElementById('language').value;
+    const output = document.getElementById('output');
+
+    output.textContent = '⏳ Executing...';
+    output.className = 'output';
+
+    try {
+        const ext = language === 'python' ? 'py' : 'js';
+        const filename = `temp_${Date.now()}.${ext}`;
+
+        // Save file first
+        const saveResponse = await fetch('/api/save/' + token + '/' + filename, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({content: code})
+        });
+
+        if (!saveResponse.ok) {
+            throw new Error('Failed to save code');
+        }
+
+        // Execute
+        const result = await runJob(filename, (progress) => {
+            output.textContent = '⏳ Running (' + progress.elapsed + 's)...\n\n' + progress.stdout;
+        });
+
+        if (result.success) {
+            output.textContent = '✅ Success:\n\n' + (result.output || '(No output)');
+            output.className = 'output success';
+        } else {
+            output.textContent = '❌ Error:\n\n' + (result.error || 'Unknown error');
+            output.className = 'output error';
+        }
+    } catch (error) {
+        output.textContent = '❌ Error:\n\n' + error.message;
+        output.className = 'output error';
+    }
+}
+
+// Ctrl+Enter to run
+document.getElementById('code').addEventListener('keydown', (e) => {
+    if ((e.ctrlKey || e.metaKey) && e.key === 'Enter') {
+        e.preventDefault();
+        executeCode();
+    }
+});
@@ -0,0 +1,642 @@
+let currentUserId = '';
+let refreshInterval = null;
+let fileListVersion = null;
+let fileListCache = new Map();
+let logsEtag = null;
+let eventSocket = null;
+let eventRetryDelay = 1000;
+let runSocket = null;
+let editorFile = null;
+
+// Initialize
+window.onload = function() {
+    const savedId = localStorage.getItem('telegramUserId');
+    if (savedId) {
+        document.getElementById('globalUserId').value = savedId;
+        currentUserId = savedId;
+    }
+
+    document.getElementById('globalUserId').addEventListener('change', function() {
+        currentUserId = this.value;
+        localStorage.setItem('telegramUserId', currentUserId);
+        fileListVersion = null;
+        connectEvents();
+    });
+
+    loadRequirements();
+    loadEnv();
+    loadFiles();
+    viewLogs();
+
+    // Live updates are pushed over /api/events; polling only runs while
+    // that socket is down, and only for a visible tab
+    connectEvents();
+    refreshInterval = setInterval(refreshVisible, 15000);
+    document.addEventListener('visibilitychange', refreshVisible);
+
+    document.getElementById('codeEditor').addEventListener('scroll', function() {
+        if (this.scrollTop + this.clientHeight >= this.scrollHeight - 200) loadMoreEditor();
+    });
+    document.getElementById('codeEditor').addEventListener('beforeinput', function(e) {
+        // Edits only start once the whole file is in, so the buffer stays a prefix
+        // of the file while windows are still being appended
+        if (editorFile && !editorFile.eof) {
+            e.preventDefault();
+            loadRestOfEditor();
+        }
+    });
+    document.getElementById('codeEditor').addEventListener('input', function() {
+        // Cleared to write something new: stop paging in the old file
+        if (!this.value) editorFile = null;
+    });
+
+    // Drag & drop
+    const dropZone = document.getElementById('dropZone');
+    const fileInput = document.getElementById('fileInput');
+
+    dropZone.onclick = () => fileInput.click();
+
+    dropZone.ondragover = (e) => {
+        e.preventDefault();
+        dropZone.classList.add('dragover');
+    };
+
+    dropZone.ondragleave = () => {
+        dropZone.classList.remove('dragover');
+    };
+
+    dropZone.ondrop = (e) => {
+        e.preventDefault();
+        dropZone.classList.remove('dragover');
+        handleFiles(e.dataTransfer.files);
+    };
+
+    fileInput.onchange = () => {
+        handleFiles(fileInput.files);
+    };
+};
+
+function switchTab(tab) {
+    document.querySelectorAll('.tab-content').forEach(t => t.classList.remove('active'));
+    if (tab === 'upload') {
+        document.getElementById('uploadTab').classList.add('active');
+    } else {
+        document.getElementById('manageTab').classList.add('active');
+    }
+}
+
+async function handleFiles(files) {
+    if (!currentUserId) {
+        showStatus('uploadStatus', '❌ Please enter your Telegram ID first', 'error');
+        return;
+    }
+
+    const spinner = document.getElementById('uploadSpinner');
+    const status = document.getElementById('uploadStatus');
+    const endpoint = path => '/api/chunked-upload' + path + '?user_id=' + encodeURIComponent(currentUserId);
+    const uploaded = [];
+
+    spinner.style.display = 'block';
+
+    try {
+        for (let file of files) {
+            status.innerHTML = `<div class="status info">⏳ Uploading ${file.name}...</div>`;
+            await chunkedUpload(file, endpoint, (done, total) => {
+                const percent = total ? Math.floor(done * 100 / total) : 100;
+                status.innerHTML = `<div class="status info">⏳ Uploading ${file.name}... ${percent}%</div>`;
+            });
+            uploaded.push(file.name);
+        }
+
+        spinner.style.display = 'none';
+        showStatus('uploadStatus', `✅ Uploaded ${uploaded.length} file(s)`, 'success');
+        setTimeout(() => {
+            switchTab('manage');
+            syncFiles();
+        }, 1000);
+    } catch (error) {
+        spinner.style.display = 'none';
+        showStatus('uploadStatus', '❌ Upload failed: ' + error.message, 'error');
+        console.error('Upload error:', error);
+        if (uploaded.length) syncFiles();
+    }
+}
+
+function renderFiles() {
+    const fileList = document.getElementById('fileList');
+    const select = document.getElementById('editorFileSelect');
+    const selected = select.value;
+    const files = [...fileListCache.values()].sort((a, b) => a.name.localeCompare(b.name));
+
+    if (files.length > 0) {
+        fileList.innerHTML = files.map(file => `
+            <div class="file-item">
+                <div>
+                    <b>${file.name}</b><br>
+                    <small>${(file.size/1024).toFixed(2)} KB • ${new Date(file.modified).toLocaleString()}</small>
+                </div>
+                <div>
+                    <button onclick="editFile('${file.name}')" class="success">✏️ Edit</button>
+                    <button onclick="runFile('${file.name}')" class="success">▶️ Run</button>
+                    <button onclick="deleteFile('${file.name}')" class="danger">🗑️ Delete</button>
+                </div>
+            </div>
+        `).join('');
+
+        select.innerHTML = '<option value="">-- Select file --</option>' +
+            files.map(f => `<option value="${f.name}">${f.name}</option>`).join('');
+        select.value = selected;
+    } else {
+        fileList.innerHTML = '<div class="status info">📂 No files uploaded yet</div>';
+        select.innerHTML = '<option value="">-- Select file --</option>';
+    }
+}
+
+async function loadFiles() {
+    if (!currentUserId) {
+        showStatus('fileListStatus', '❌ Please enter your Telegram ID', 'error');
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/list-files/${currentUserId}`);
+        const data = await response.json();
+
+        if (data.success) {
+            fileListCache = new Map(data.files.map(f => [f.name, f]));
+            fileListVersion = data.version;
+            renderFiles();
+        }
+
+        if (data.success && data.files.length > 0) {
+            showStatus('fileListStatus', `✅ Found ${data.count} file(s)`, 'success');
+        } else {
+            showStatus('fileListStatus', 'Upload some files to get started', 'info');
+        }
+    } catch (error) {
+        showStatus('fileListStatus', '❌ Error: ' + error.message, 'error');
+    }
+}
+
+async function syncFiles() {
+    if (!currentUserId) return;
+    if (fileListVersion === null) return loadFiles();
+
+    try {
+        const response = await fetch(`/api/list-files/${currentUserId}/changes?since=${fileListVersion}`);
+        const data = await response.json();
+        if (!data.success || data.version === fileListVersion) return;
+
+        if (data.reset) {
+            fileListCache = new Map(data.files.map(f => [f.name, f]));
+        } else {
+            for (const change of data.changes) {
+                if (change.op === 'delete') {
+                    fileListCache.delete(change.name);
+                } else {
+                    fileListCache.set(change.name, change.file);
+                }
+            }
+        }
+
+        fileListVersion = data.version;
+        renderFiles();
+    } catch (error) {
+        console.error('File sync error:', error);
+    }
+}
+
+function refreshVisible() {
+    if (document.hidden) return;
+    if (eventSocket && eventSocket.readyState === WebSocket.OPEN) return;
+    viewLogs();
+    syncFiles();
+}
+
+function appendLogLines(lines) {
+    const output = document.getElementById('logsOutput');
+    const atBottom = output.scrollTop + output.clientHeight >= output.scrollHeight - 20;
+    const text = (output.textContent + '\n' + lines.map(l => l.line).join('\n')).split('\n');
+    output.textContent = text.slice(-500).join('\n');
+    if (atBottom) output.scrollTop = output.scrollHeight;
+}
+
+function connectEvents() {
+    if (eventSocket) {
+        eventSocket.onclose = null;
+        eventSocket.close();
+    }
+
+    const protocol = location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(`${protocol}://${location.host}/api/events?user_id=${encodeURIComponent(currentUserId)}`);
+    eventSocket = socket;
+
+    socket.onopen = () => {
+        eventRetryDelay = 1000;
+        viewLogs();
+        syncFiles();
+    };
+
+    socket.onmessage = (e) => {
+        const event = JSON.parse(e.data);
+        if (event.dropped) {
+            viewLogs();
+            syncFiles();
+        }
+
+        if (event.type === 'files' && event.version !== fileListVersion) {
+            syncFiles();
+        } else if (event.type === 'logs') {
+            appendLogLines(event.lines);
+        } else if (event.type === 'process') {
+            const verb = event.event === 'started' ? '▶️ Started' : '⏹️ Finished';
+            showStatus('editorStatus', `${verb} ${event.file_name}`, 'info');
+        }
+    };
+
+    socket.onclose = () => {
+        if (eventSocket !== socket) return;
+        eventSocket = null;
+        setTimeout(connectEvents, eventRetryDelay);
+        eventRetryDelay = Math.min(eventRetryDelay * 2, 30000);
+    };
+}
+
+async function editFile(filename) {
+    document.getElementById('editorFileSelect').value = filename;
+    await loadFileToEditor();
+}
+
+async function readFileRange(filename, offset) {
+    const response = await fetch('/api/read-file', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename, user_id: currentUserId, offset })
+    });
+    return await response.json();
+}
+
+async function loadFileToEditor() {
+    const filename = document.getElementById('editorFileSelect').value;
+    if (!filename || !currentUserId) return;
+
+    try {
+        const data = await readFileRange(filename, 0);
+        if (data.success) {
+            const editor = document.getElementById('codeEditor');
+            editor.value = data.content;
+            editor.scrollTop = 0;
+            editorFile = { filename, nextOffset: data.next_offset, eof: data.eof, loading: null };
+            document.getElementById('newFileName').value = filename;
+            const message = data.eof
+                ? `✅ Loaded ${filename}`
+                : `✅ Loaded ${Math.round(data.next_offset / 1024)} of ${Math.round(data.size / 1024)} KB of ${filename}, scroll for more`;
+            showStatus('editorStatus', message, 'success');
+        } else {
+            showStatus('editorStatus', '❌ ' + data.error, 'error');
+        }
+    } catch (error) {
+        showStatus('editorStatus', '❌ ' + error.message, 'error');
+    }
+}
+
+// Large files are loaded in windows as the editor is scrolled
+async function loadMoreEditor() {
+    const file = editorFile;
+    if (!file || file.eof) return true;
+
+    if (!file.loading) {
+        file.loading = readFileRange(file.filename, file.nextOffset).then(data => {
+            file.loading = null;
+            if (!data.success || editorFile !== file) return false;
+            const editor = document.getElementById('codeEditor');
+            editor.setRangeText(data.content, editor.value.length, editor.value.length, 'preserve');
+            file.nextOffset = data.next_offset;
+            file.eof = data.eof;
+            return true;
+        }).catch(() => {
+            file.loading = null;
+            return false;
+        });
+    }
+    return await file.loading;
+}
+
+async function loadRestOfEditor() {
+    const file = editorFile;
+    if (!file || file.eof) return true;
+    showStatus('editorStatus', `⏳ Loading the rest of ${file.filename} before editing...`, 'info');
+
+    while (editorFile === file && !file.eof) {
+        if (!await loadMoreEditor()) {
+            showStatus('editorStatus', `❌ Could not load the rest of ${file.filename}`, 'error');
+            return false;
+        }
+    }
+    if (editorFile !== file) return false;
+    showStatus('editorStatus', `✅ ${file.filename} fully loaded`, 'success');
+    return true;
+}
+
+async function saveCode() {
+    const filename = document.getElementById('newFileName').value.trim();
+
+    // Never save a partially loaded file: fetch the rest first. The buffer is
+    // still unedited here (edits wait for a full load), so under another name
+    // this saves a complete copy
+    if (!await loadRestOfEditor()) {
+        showStatus('editorStatus', '❌ Could not load the rest of the file, not saving', 'error');
+        return;
+    }
+    const content = document.getElementById('codeEditor').value;
+
+    if (!filename || !currentUserId) {
+        showStatus('editorStatus', '❌ Enter filename and user ID', 'error');
+        return;
+    }
+
+    try {
+        const response = await fetch('/api/save-file', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename, content, user_id: currentUserId })
+        });
+
+        const data = await response.json();
+        if (data.success) {
+            showStatus('editorStatus', data.message, 'success');
+            syncFiles();
+        } else {
+            showStatus('editorStatus', '❌ ' + data.error, 'error');
+        }
+    } catch (error) {
+        showStatus('editorStatus', '❌ ' + error.message, 'error');
+    }
+}
+
+async function runCode() {
+    const filename = document.getElementById('newFileName').value.trim() || 
+                   document.getElementById('editorFileSelect').value;
+
+    if (!filename || !currentUserId) {
+        showStatus('editorStatus', '❌ Select a file first', 'error');
+        return;
+    }
+
+    await runFile(filename);
+}
+
+function streamRun(filename, userId, output, onExit) {
+    const scheme = location.protocol === 'https:' ? 'wss://' : 'ws://';
+    const params = new URLSearchParams({ filename, user_id: userId });
+    const socket = new WebSocket(scheme + location.host + '/api/run-stream?' + params);
+    let exited = false;
+
+    socket.onmessage = (event) => {
+        const msg = JSON.parse(event.data);
+        if (msg.type === 'stdout' || msg.type === 'stderr') {
+            output.textContent += msg.data;
+            output.scrollTop = output.scrollHeight;
+        } else if (msg.type === 'exit') {
+            exited = true;
+            onExit(msg);
+        } else if (msg.type === 'error') {
+            exited = true;
+            onExit({ returncode: -1, reason: 'error', error: msg.error });
+        }
+    };
+    socket.onclose = () => {
+        if (!exited) onExit({ returncode: -1, reason: 'disconnected' });
+    };
+
+    return socket;
+}
+
+async function runFile(filename) {
+    const output = document.getElementById('codeOutput');
+    output.textContent = '⏳ Running ' + filename + '...\n';
+    showStatus('editorStatus', '⏳ Executing...', 'info');
+
+    if (runSocket && runSocket.readyState === WebSocket.OPEN) {
+        runSocket.send(JSON.stringify({ action: 'stop' }));
+    }
+
+    runSocket = streamRun(filename, currentUserId, output, (result) => {
+        runSocket = null;
+        if (result.reason === 'timeout') {
+            showStatus('editorStatus', '❌ Execution timeout (' + result.timeout + 's)', 'error');
+        } else if (result.reason === 'stopped') {
+            showStatus('editorStatus', '🛑 Execution stopped', 'info');
+        } else if (result.returncode === 0) {
+            showStatus('editorStatus', '✅ Execution completed!', 'success');
+        } else {
+            showStatus('editorStatus', '❌ Execution failed' + (result.error ? ': ' + result.error : ''), 'error');
+        }
+    });
+}
+
+function stopRun() {
+    if (runSocket && runSocket.readyState === WebSocket.OPEN) {
+        runSocket.send(JSON.stringify({ action: 'stop' }));
+    }
+}
+
+async function deleteFile(filename) {
+    if (!confirm(`Delete ${filename}?`)) return;
+
+    try {
+        const response = await fetch('/api/delete-file', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename, user_id: currentUserId })
+        });
+
+        const data = await response.json();
+        if (data.success) {
+            showStatus('fileListStatus', data.message, 'success');
+            syncFiles();
+        }
+    } catch (error) {
+        showStatus('fileListStatus', '❌ ' + error.message, 'error');
+    }
+}
+
+async function loadRequirements() {
+    try {
+        const response = await fetch('/api/read-file', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: 'requirements.txt' })
+        });
+        const data = await response.json();
+        if (data.success) {
+            document.getElementById('requirements').value = data.content;
+        }
+    } catch (error) {}
+}
+
+async function saveRequirements() {
+    const content = document.getElementById('requirements').value;
+
+    try {
+        const response = await fetch('/api/save-file', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: 'requirements.txt', content })
+        });
+        const data = await response.json();
+        showStatus('depsStatus', data.message, data.success ? 'success' : 'error');
+    } catch (error) {
+        showStatus('depsStatus', '❌ ' + error.message, 'error');
+    }
+}
+
+async function readInstallStream(response, onLine) {
+    if (!(response.headers.get('Content-Type') || '').includes('ndjson')) {
+        return await response.json();
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = { success: false, message: '❌ Installation interrupted' };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+            if (!line) continue;
+            const event = JSON.parse(line);
+            if (event.done) result = event;
+            else onLine(event.line);
+        }
+    }
+
+    return result;
+}
+
+async function installDeps() {
+    const spinner = document.getElementById('depsSpinner');
+    const output = document.getElementById('depsOutput');
+
+    spinner.style.display = 'block';
+    output.style.display = 'none';
+    showStatus('depsStatus', '⏳ Installing dependencies...', 'info');
+
+    try {
+        const response = await fetch('/api/install-deps');
+        output.textContent = '';
+        output.style.display = 'block';
+
+        const data = await readInstallStream(response, line => {
+            output.textContent += line + '\n';
+            output.scrollTop = output.scrollHeight;
+        });
+
+        spinner.style.display = 'none';
+        showStatus('depsStatus', data.message || data.error, data.success ? 'success' : 'error');
+    } catch (error) {
+        spinner.style.display = 'none';
+        showStatus('depsStatus', '❌ ' + error.message, 'error');
+    }
+}
+
+async function loadEnv() {
+    try {
+        const response = await fetch('/api/read-file', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: '.env' })
+        });
+        const data = await response.json();
+        if (data.success) {
+            document.getElementById('envEditor').value = data.content;
+            showStatus('envStatus', '✅ .env loaded', 'success');
+        }
+    } catch (error) {}
+}
+
+async function saveEnv() {
+    const content = document.getElementById('envEditor').value;
+
+    try {
+        const response = await fetch('/api/save-file', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: '.env', content })
+        });
+        const data = await response.json();
+        showStatus('envStatus', data.message, data.success ? 'success' : 'error');
+    } catch (error) {
+        showStatus('envStatus', '❌ ' + error.message, 'error');
+    }
+}
+
+async function runTerminal() {
+    const command = document.getElementById('termInput').value.trim();
+    const output = document.getElementById('termOutput');
+
+    if (!command) {
+        showStatus('termStatus', '❌ Enter a command', 'error');
+        return;
+    }
+
+    output.textContent = '$ ' + command + '\n⏳ Executing...\n';
+    showStatus('termStatus', '⏳ Running...', 'info');
+
+    try {
+        const response = await fetch('/api/terminal', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ command })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            output.textContent += data.output || '(no output)';
+            showStatus('termStatus', '✅ Command executed', 'success');
+        } else {
+            output.textContent += '❌ ' + data.error;
+            showStatus('termStatus', '❌ Failed', 'error');
+        }
+    } catch (error) {
+        output.textContent += '❌ ' + error.message;
+        showStatus('termStatus', '❌ ' + error.message, 'error');
+    }
+}
+
+async function viewLogs() {
+    try {
+        const headers = logsEtag ? { 'If-None-Match': logsEtag } : {};
+        const response = await fetch('/api/view-logs', { headers, cache: 'no-store' });
+        if (response.status === 304) return;
+
+        logsEtag = response.headers.get('ETag');
+        const data = await response.json();
+
+        const output = document.getElementById('logsOutput');
+        if (data.success) {
+            output.textContent = data.logs || 'No logs yet';
+            output.scrollTop = output.scrollHeight;
+        } else {
+            output.textContent = '❌ ' + data.error;
+        }
+    } catch (error) {
+        document.getElementById('logsOutput').textContent = '❌ ' + error.message;
+    }
+}
+
+function showStatus(elementId, message, type) {
+    const el = document.getElementById(elementId);
+    el.innerHTML = `<div class="status ${type}">${message}</div>`;
+    setTimeout(() => {
+        if (el.innerHTML.includes(message)) {
+            el.innerHTML = '';
+        }
+    }, 5000);
+}
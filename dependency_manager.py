@@ -0,0 +1,442 @@
+import ast
+import asyncio
+import hashlib
+import importlib.metadata
+import json
+import logging
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+from aiohttp import web
+from process_manager import process_manager
+
+DEPS_DIR = Path(__file__).parent / 'inf'
+VENVS_DIR = Path(os.getenv('VENVS_DIR', DEPS_DIR / 'venvs'))
+WHEELHOUSE_DIR = Path(os.getenv('WHEELHOUSE_DIR', DEPS_DIR / 'wheelhouse'))
+MAX_VENVS = int(os.getenv('MAX_VENVS', '20'))
+INSTALL_TIMEOUT = 600
+READY_MARKER = '.ready'
+
+logger = logging.getLogger(__name__)
+
+VENVS_DIR.mkdir(parents=True, exist_ok=True)
+WHEELHOUSE_DIR.mkdir(parents=True, exist_ok=True)
+
+IMPORT_PACKAGE_NAMES = {
+    'bs4': 'beautifulsoup4',
+    'cv2': 'opencv-python',
+    'Crypto': 'pycryptodome',
+    'dateutil': 'python-dateutil',
+    'discord': 'discord.py',
+    'dotenv': 'python-dotenv',
+    'jwt': 'PyJWT',
+    'PIL': 'Pillow',
+    'sklearn': 'scikit-learn',
+    'telebot': 'pyTelegramBotAPI',
+    'telegram': 'python-telegram-bot',
+    'yaml': 'PyYAML',
+    'fitz': 'PyMuPDF',
+    'websocket': 'websocket-client',
+    'serial': 'pyserial',
+    'docx': 'python-docx',
+    'pptx': 'python-pptx',
+    'magic': 'python-magic',
+    'OpenSSL': 'pyOpenSSL',
+    'googleapiclient': 'google-api-python-client',
+    'attr': 'attrs',
+    'speedtest': 'speedtest-cli'
+}
+
+# Import names that are also the name of their PyPI distribution
+KNOWN_DISTRIBUTIONS = frozenset({
+    'aiofiles', 'aiogram', 'aiohttp', 'aiosqlite', 'anyio', 'arrow', 'asyncpg', 'boto3', 'click',
+    'colorama', 'cryptography', 'django', 'emoji', 'fastapi', 'flask', 'gtts', 'httpx', 'instaloader',
+    'jinja2', 'loguru', 'lxml', 'matplotlib', 'motor', 'numpy', 'openai', 'openpyxl', 'pandas',
+    'psutil', 'psycopg2', 'pydantic', 'pymongo', 'pyrogram', 'pytz', 'qrcode', 'redis', 'requests',
+    'rich', 'schedule', 'scipy', 'selenium', 'sqlalchemy', 'telethon', 'termcolor',
+    'tqdm', 'tweepy', 'ujson', 'uvicorn', 'websockets', 'yt_dlp'
+})
+
+IMPORT_ERRORS = {'ImportError', 'ModuleNotFoundError', 'Exception', 'BaseException'}
+
+def _normalize_requirement(line: str) -> Optional[str]:
+    line = line.split('#', 1)[0].strip()
+    if not line or line.startswith('-'):
+        return None
+    return line
+
+def read_requirements_file(path: Path) -> List[str]:
+    requirements = []
+    for line in path.read_text(encoding='utf-8', errors='ignore').splitlines():
+        requirement = _normalize_requirement(line)
+        if requirement:
+            requirements.append(requirement)
+    return requirements
+
+def _is_local_module(name: str, search_dirs: List[Path]) -> bool:
+    return any((d / f"{name}.py").exists() or (d / name).is_dir() for d in search_dirs)
+
+def _catches_import_error(node) -> bool:
+    for handler in node.handlers:
+        if handler.type is None:
+            return True
+        names = handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]
+        if any(isinstance(n, ast.Name) and n.id in IMPORT_ERRORS for n in names):
+            return True
+    return False
+
+def _static_condition(test) -> Optional[bool]:
+    """Value of an `if` test known without running the script, else None"""
+    if isinstance(test, ast.Constant):
+        return bool(test.value)
+    if isinstance(test, ast.UnaryOp) and isinstance(test.op, ast.Not):
+        value = _static_condition(test.operand)
+        return None if value is None else not value
+    name = ast.unparse(test)
+    if name in ('TYPE_CHECKING', 'typing.TYPE_CHECKING'):
+        return False
+    if isinstance(test, ast.Compare) and len(test.ops) == 1 and isinstance(test.comparators[0], ast.Constant):
+        # Platform checks are answered for this host
+        subject = ast.unparse(test.left)
+        actual = {'sys.platform': sys.platform, 'os.name': os.name}.get(subject)
+        expected = test.comparators[0].value
+        if actual is not None and isinstance(expected, str):
+            if isinstance(test.ops[0], ast.Eq):
+                return actual == expected
+            if isinstance(test.ops[0], ast.NotEq):
+                return actual != expected
+    if isinstance(test, ast.Call) and ast.unparse(test.func) == 'sys.platform.startswith' \
+            and test.args and isinstance(test.args[0], ast.Constant):
+        return sys.platform.startswith(test.args[0].value)
+    return None
+
+def required_imports(body) -> List[str]:
+    """Module-level imports a script cannot run without
+
+    Imports guarded by `except ImportError`, in unreachable or other-platform
+    branches, and inside functions or classes are left out.
+    """
+    modules = []
+    for node in body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if not node.level and node.module:
+                modules.append(node.module)
+        elif isinstance(node, ast.If):
+            value = _static_condition(node.test)
+            if value is not False:
+                modules.extend(required_imports(node.body))
+            if value is not True:
+                modules.extend(required_imports(node.orelse))
+        elif isinstance(node, ast.Try) or type(node).__name__ == 'TryStar':
+            if not _catches_import_error(node):
+                modules.extend(required_imports(node.body))
+            modules.extend(required_imports(node.orelse))
+            modules.extend(required_imports(node.finalbody))
+        elif isinstance(node, (ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith)):
+            modules.extend(required_imports(node.body))
+            modules.extend(required_imports(getattr(node, 'orelse', [])))
+    return modules
+
+_installed_distributions = None
+
+def distribution_for(module: str) -> Optional[str]:
+    """PyPI distribution that provides an import name, if we know one"""
+    global _installed_distributions
+    if module in IMPORT_PACKAGE_NAMES:
+        return IMPORT_PACKAGE_NAMES[module]
+    if module.lower() in KNOWN_DISTRIBUTIONS:
+        return module
+    if _installed_distributions is None:
+        _installed_distributions = importlib.metadata.packages_distributions()
+    # Namespace packages (e.g. `google`) are shared by many distributions: too ambiguous to install
+    dists = set(_installed_distributions.get(module, ()))
+    return dists.pop() if len(dists) == 1 else None
+
+def scan_requirements(file_path, user_folder) -> Dict:
+    """{'requirements': [...], 'unresolved': [...]} for a script"""
+    file_path = Path(file_path)
+    user_folder = Path(user_folder)
+    
+    for folder in dict.fromkeys([file_path.parent, user_folder]):
+        requirements_file = folder / 'requirements.txt'
+        if requirements_file.exists():
+            return {'requirements': sorted(set(read_requirements_file(requirements_file)), key=str.lower),
+                    'unresolved': []}
+    
+    try:
+        tree = ast.parse(file_path.read_text(encoding='utf-8', errors='ignore'))
+    except SyntaxError:
+        return {'requirements': [], 'unresolved': []}
+    search_dirs = list(dict.fromkeys([file_path.parent, user_folder]))
+    
+    packages = set()
+    unresolved = set()
+    for module in required_imports(tree.body):
+        root = module.split('.', 1)[0]
+        if not root or root in sys.stdlib_module_names or root == '__future__':
+            continue
+        if _is_local_module(root, search_dirs):
+            continue
+        distribution = distribution_for(root)
+        if distribution:
+            packages.add(distribution)
+        else:
+            unresolved.add(root)
+    
+    if unresolved:
+        logger.info(f"No known distribution for imports in {file_path.name}: {', '.join(sorted(unresolved))}")
+    return {'requirements': sorted(packages, key=str.lower), 'unresolved': sorted(unresolved)}
+
+def detect_requirements(file_path, user_folder) -> List[str]:
+    return scan_requirements(file_path, user_folder)['requirements']
+
+def requirements_hash(requirements: List[str]) -> str:
+    key = '\n'.join(sorted(r.lower() for r in requirements))
+    key += f"\npython{sys.version_info.major}.{sys.version_info.minor}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+def venv_python(venv_dir: Path) -> Path:
+    if sys.platform == 'win32':
+        return venv_dir / 'Scripts' / 'python.exe'
+    return venv_dir / 'bin' / 'python'
+
+def pip_commands(python, requirements_file, wheelhouse: Path = WHEELHOUSE_DIR):
+    offline = [python, '-m', 'pip', 'install', '--disable-pip-version-check',
+               '--no-index', '--find-links', wheelhouse, '-r', requirements_file]
+    build = [python, '-m', 'pip', 'wheel', '--disable-pip-version-check',
+             '--wheel-dir', wheelhouse, '--find-links', wheelhouse, '-r', requirements_file]
+    return offline, build
+
+class InstallJob:
+    def __init__(self, key):
+        self.key = key
+        self.lines = []
+        self.returncode = None
+        self.changed = asyncio.Condition()
+    
+    @property
+    def done(self) -> bool:
+        return self.returncode is not None
+    
+    async def append(self, line: str):
+        async with self.changed:
+            self.lines.append(line)
+            self.changed.notify_all()
+    
+    async def finish(self, returncode: int):
+        async with self.changed:
+            self.returncode = returncode
+            self.changed.notify_all()
+    
+    async def follow(self):
+        index = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: index < len(self.lines) or self.done)
+                new_lines = self.lines[index:]
+                finished = self.done
+            
+            for line in new_lines:
+                yield line
+            index += len(new_lines)
+            
+            if finished and index >= len(self.lines):
+                return
+
+class PipInstaller:
+    def __init__(self, wheelhouse: Path = WHEELHOUSE_DIR):
+        self.wheelhouse = wheelhouse
+        self.jobs = {}
+    
+    def install(self, requirements_file: Path, python: str = sys.executable) -> InstallJob:
+        digest = hashlib.sha256(Path(requirements_file).read_bytes()).hexdigest()
+        key = (str(python), digest)
+        
+        job = self.jobs.get(key)
+        if job is not None:
+            return job
+        
+        job = InstallJob(key)
+        self.jobs[key] = job
+        asyncio.create_task(self._run_job(job, python, requirements_file))
+        return job
+    
+    async def _stream(self, job: InstallJob, args) -> int:
+        process = await asyncio.create_subprocess_exec(
+            *[str(a) for a in args],
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
+        
+        async def pump():
+            async for raw in process.stdout:
+                await job.append(raw.decode('utf-8', errors='replace').rstrip('\n'))
+            return await process.wait()
+        
+        try:
+            return await asyncio.wait_for(pump(), timeout=INSTALL_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            await job.append(f"[SYSTEM] Timed out after {INSTALL_TIMEOUT}s")
+            return -1
+    
+    async def _run_job(self, job: InstallJob, python, requirements_file):
+        offline, build = pip_commands(python, requirements_file, self.wheelhouse)
+        returncode = -1
+        
+        try:
+            await job.append('⚡ Installing from local wheel cache...')
+            returncode = await self._stream(job, offline)
+            
+            if returncode != 0:
+                await job.append('📥 Cache incomplete, fetching missing wheels...')
+                returncode = await self._stream(job, build)
+                if returncode == 0:
+                    returncode = await self._stream(job, offline)
+        except Exception as e:
+            await job.append(f"❌ {e}")
+        finally:
+            self.jobs.pop(job.key, None)
+            await job.finish(returncode)
+    
+    async def stream_response(self, request, requirements_file: Path, python: str = sys.executable):
+        job = self.install(requirements_file, python)
+        
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson', 'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+        
+        try:
+            async for line in job.follow():
+                await response.write((json.dumps({'line': line}) + '\n').encode('utf-8'))
+            
+            success = job.returncode == 0
+            await response.write((json.dumps({
+                'done': True,
+                'success': success,
+                'message': '✅ Dependencies installed!' if success else '❌ Installation failed'
+            }) + '\n').encode('utf-8'))
+            await response.write_eof()
+        except ConnectionResetError:
+            pass
+        except Exception as e:
+            # Headers are already sent, so the failure has to arrive as the final NDJSON line
+            logger.error(f"Dependency install stream failed: {e}")
+            try:
+                await response.write((json.dumps({
+                    'done': True,
+                    'success': False,
+                    'message': f'❌ Installation failed: {e}'
+                }) + '\n').encode('utf-8'))
+                await response.write_eof()
+            except ConnectionResetError:
+                pass
+        
+        return response
+
+class VenvManager:
+    def __init__(self, venvs_dir: Path = VENVS_DIR, wheelhouse: Path = WHEELHOUSE_DIR):
+        self.venvs_dir = venvs_dir
+        self.wheelhouse = wheelhouse
+        self.locks = {}
+    
+    def venv_dir(self, requirements: List[str]) -> Path:
+        return self.venvs_dir / requirements_hash(requirements)
+    
+    def is_ready(self, requirements: List[str]) -> bool:
+        return (self.venv_dir(requirements) / READY_MARKER).exists()
+    
+    async def _run(self, log_file, *args) -> int:
+        process = await asyncio.create_subprocess_exec(
+            *[str(a) for a in args],
+            stdout=log_file,
+            stderr=log_file
+        )
+        try:
+            return await asyncio.wait_for(process.wait(), timeout=INSTALL_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            log_file.write(f"\n[SYSTEM] Timed out after {INSTALL_TIMEOUT}s\n".encode())
+            return -1
+    
+    async def install_requirements(self, python: Path, requirements_file: Path, log_file) -> bool:
+        offline, build = pip_commands(python, requirements_file, self.wheelhouse)
+        if await self._run(log_file, *offline) == 0:
+            return True
+        
+        if await self._run(log_file, *build) != 0:
+            return False
+        
+        return await self._run(log_file, *offline) == 0
+    
+    async def ensure_env(self, requirements: List[str]) -> Dict:
+        digest = requirements_hash(requirements)
+        venv_dir = self.venvs_dir / digest
+        python = venv_python(venv_dir)
+        
+        lock = self.locks.setdefault(digest, asyncio.Lock())
+        async with lock:
+            marker = venv_dir / READY_MARKER
+            if marker.exists():
+                os.utime(marker)
+                return {'success': True, 'python': str(python), 'venv': digest, 'cached': True}
+            
+            shutil.rmtree(venv_dir, ignore_errors=True)
+            venv_dir.mkdir(parents=True)
+            
+            requirements_file = venv_dir / 'requirements.txt'
+            requirements_file.write_text('\n'.join(requirements) + '\n', encoding='utf-8')
+            log_path = venv_dir / 'install.log'
+            
+            with open(log_path, 'wb') as log_file:
+                ok = await self._run(log_file, sys.executable, '-m', 'venv', venv_dir) == 0
+                if ok:
+                    ok = await self.install_requirements(python, requirements_file, log_file)
+            
+            if not ok:
+                output = log_path.read_text(encoding='utf-8', errors='ignore')
+                shutil.rmtree(venv_dir, ignore_errors=True)
+                return {'success': False, 'venv': digest, 'output': output[-3000:]}
+            
+            marker.write_text('\n'.join(requirements), encoding='utf-8')
+        
+        await asyncio.to_thread(self.prune)
+        return {'success': True, 'python': str(python), 'venv': digest, 'cached': False}
+    
+    def prune(self, keep: int = MAX_VENVS) -> int:
+        envs = sorted(
+            (p for p in self.venvs_dir.iterdir() if (p / READY_MARKER).exists()),
+            key=lambda p: (p / READY_MARKER).stat().st_mtime,
+            reverse=True
+        )
+        
+        # Scripts still running from a virtualenv keep it alive past the limit
+        in_use = {info['venv'] for _, info in process_manager.list() if info.get('venv')}
+        
+        removed = 0
+        for venv_dir in envs[keep:]:
+            lock = self.locks.get(venv_dir.name)
+            if (lock is not None and lock.locked()) or venv_dir.name in in_use:
+                continue
+            shutil.rmtree(venv_dir, ignore_errors=True)
+            self.locks.pop(venv_dir.name, None)
+            removed += 1
+        
+        return removed
+    
+    def get_stats(self) -> Dict:
+        envs = [p for p in self.venvs_dir.iterdir() if (p / READY_MARKER).exists()]
+        wheels = list(self.wheelhouse.glob('*.whl'))
+        return {
+            'venvs': len(envs),
+            'wheels': len(wheels),
+            'wheelhouse_mb': sum(w.stat().st_size for w in wheels) / (1024 * 1024)
+        }
+
+venv_manager = VenvManager()
+pip_installer = PipInstaller()
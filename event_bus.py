@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from aiohttp import web, WSMsgType
+
+TOPICS = ('files', 'process', 'logs')
+MAX_PENDING_EVENTS = 256
+MAX_LOG_BATCH = 500
+HEARTBEAT = 30
+
+class Subscriber:
+    def __init__(self, ws, topics, user_id: Optional[str], max_pending: int = MAX_PENDING_EVENTS):
+        self.ws = ws
+        self.topics = set(topics)
+        self.user_id = user_id
+        self.max_pending = max_pending
+        self.pending = OrderedDict()
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+        self.sent = 0
+    
+    def wants(self, topic: str, user_id: Optional[str]) -> bool:
+        return topic in self.topics and (user_id is None or user_id == self.user_id)
+    
+    def offer(self, topic: str, key, data: Dict):
+        """Queue an event, replacing any unsent event with the same key"""
+        if topic == 'logs':
+            batch = self.pending.get(key)
+            if batch is None:
+                batch = self.pending[key] = {'type': 'logs', 'lines': []}
+            batch['lines'].append(data)
+            if len(batch['lines']) > MAX_LOG_BATCH:
+                del batch['lines'][0]
+                self.dropped += 1
+        else:
+            self.pending.pop(key, None)
+            self.pending[key] = {'type': topic, **data}
+        
+        while len(self.pending) > self.max_pending:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        
+        self.wakeup.set()
+    
+    async def run(self):
+        while not self.ws.closed:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            
+            while self.pending and not self.ws.closed:
+                _, event = self.pending.popitem(last=False)
+                if self.dropped:
+                    # Tell the client it missed events so it can resync
+                    event = {**event, 'dropped': self.dropped}
+                    self.dropped = 0
+                try:
+                    await self.ws.send_json(event)
+                except (ConnectionResetError, RuntimeError):
+                    return
+                self.sent += 1
+
+class EventBus:
+    """Fans out file, process and log events to connected panel WebSockets"""
+    
+    def __init__(self):
+        self.subscribers = set()
+        self.loop = None
+        self.attached = False
+        self.lock = threading.Lock()
+        self.stats = {'published': 0, 'delivered': 0}
+    
+    def publish(self, topic: str, data: Dict, key=None, user_id: Optional[str] = None):
+        if not self.subscribers or self.loop is None:
+            return
+        
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        
+        if running is self.loop:
+            self._publish(topic, data, key, user_id)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._publish, topic, data, key, user_id)
+    
+    def _publish(self, topic: str, data: Dict, key, user_id: Optional[str]):
+        self.stats['published'] += 1
+        key = (topic, key)
+        payload = {**data, 'user_id': user_id} if user_id is not None else data
+        
+        for subscriber in list(self.subscribers):
+            if subscriber.wants(topic, user_id):
+                subscriber.offer(topic, key, payload)
+                self.stats['delivered'] += 1
+    
+    def on_files_changed(self, folder, version: int):
+        user_id = folder.name
+        self.publish('files', {'version': version}, key=user_id, user_id=user_id)
+    
+    def on_process_event(self, event: str, key: str, info: Dict):
+        owner = str(info['script_owner_id'])
+        self.publish('process', {
+            'event': event,
+            'process_id': key,
+            'file_name': info['file_name'],
+            'source': info['source']
+        }, key=key, user_id=owner)
+    
+    def attach(self, file_index, process_manager, logger: logging.Logger = None):
+        """Subscribe the bus to the file index, process manager and logging"""
+        with self.lock:
+            if self.attached:
+                return
+            self.attached = True
+        
+        file_index.listeners.append(self.on_files_changed)
+        process_manager.listeners.append(self.on_process_event)
+        (logger or logging.getLogger()).addHandler(EventBusLogHandler(self))
+    
+    async def handle_events(self, request):
+        user_id = request.query.get('user_id') or None
+        topics = [t for t in request.query.get('topics', ','.join(TOPICS)).split(',') if t in TOPICS]
+        
+        ws = web.WebSocketResponse(heartbeat=HEARTBEAT)
+        await ws.prepare(request)
+        
+        self.loop = asyncio.get_running_loop()
+        subscriber = Subscriber(ws, topics, user_id)
+        self.subscribers.add(subscriber)
+        sender = asyncio.create_task(subscriber.run())
+        
+        try:
+            await ws.send_json({'type': 'hello', 'topics': sorted(subscriber.topics)})
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self.subscribers.discard(subscriber)
+            sender.cancel()
+        
+        return ws
+    
+    def get_stats(self) -> Dict:
+        return {
+            'subscribers': len(self.subscribers),
+            'pending': sum(len(s.pending) for s in self.subscribers),
+            **self.stats
+        }
+
+class EventBusLogHandler(logging.Handler):
+    def __init__(self, bus: EventBus, level=logging.INFO):
+        super().__init__(level)
+        self.bus = bus
+        self.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    def emit(self, record):
+        if not self.bus.subscribers:
+            return
+        try:
+            self.bus.publish('logs', {
+                'line': self.format(record),
+                'level': record.levelname,
+                'logger': record.name
+            })
+        except Exception:
+            self.handleError(record)
+
+event_bus = EventBus()
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+MAX_CHANGES = 500
+
+def file_entry(name: str, stat_result) -> Dict:
+    return {
+        'name': name,
+        'size': stat_result.st_size,
+        'modified': datetime.fromtimestamp(stat_result.st_mtime).isoformat(),
+        'type': os.path.splitext(name)[1]
+    }
+
+class FileIndex:
+    """In-memory listing of user folders with a version counter and change log"""
+    
+    def __init__(self, max_changes: int = MAX_CHANGES):
+        self.max_changes = max_changes
+        self.folders = {}
+        self.lock = threading.Lock()
+        self.stats = {'scans': 0, 'hits': 0, 'events': 0}
+        self.listeners = []
+    
+    def _new_state(self) -> Dict:
+        # Versions start from the clock so they keep increasing across restarts
+        version = time.time_ns() // 1000
+        return {'version': version, 'oldest': version, 'notified': version,
+                'files': {}, 'changes': deque()}
+    
+    def _changed(self, state: Dict) -> Optional[int]:
+        if state['version'] == state['notified']:
+            return None
+        state['notified'] = state['version']
+        return state['version']
+    
+    def _notify(self, folder: Path, version: Optional[int]):
+        if version is None:
+            return
+        for listener in self.listeners:
+            listener(folder, version)
+    
+    def _record(self, state: Dict, op: str, name: str, entry: Optional[Dict] = None):
+        state['version'] += 1
+        state['changes'].append((state['version'], op, name, entry))
+        if len(state['changes']) > self.max_changes:
+            state['oldest'] = state['changes'].popleft()[0]
+    
+    def _scan(self, folder: Path, state: Dict):
+        files = {}
+        with os.scandir(folder) as entries:
+            for item in entries:
+                if item.is_file():
+                    files[item.name] = file_entry(item.name, item.stat())
+        
+        version = state['version']
+        for name in state['files'].keys() - files.keys():
+            self._record(state, 'delete', name)
+        for name, entry in files.items():
+            if state['files'].get(name) != entry:
+                self._record(state, 'upsert', name, entry)
+        
+        state['files'] = files
+        self.stats['scans'] += 1
+        if state['version'] == version:
+            self.stats['hits'] += 1
+    
+    def _state(self, folder: Path) -> Dict:
+        key = str(folder)
+        state = self.folders.get(key)
+        if state is None:
+            state = self.folders[key] = self._new_state()
+        
+        # Every entry is stat'ed: in-place writes (e.g. a script's .log) change a
+        # file's size and mtime but not the folder's mtime. The version only moves
+        # when an entry actually changed, so unchanged listings still answer 304
+        try:
+            self._scan(folder, state)
+        except (FileNotFoundError, NotADirectoryError):
+            for name in list(state['files']):
+                self._record(state, 'delete', name)
+            state['files'] = {}
+        
+        return state
+    
+    def snapshot(self, folder: Path) -> Dict:
+        folder = Path(folder)
+        with self.lock:
+            state = self._state(folder)
+            result = {'version': state['version'], 'files': list(state['files'].values())}
+            changed = self._changed(state)
+        
+        self._notify(folder, changed)
+        return result
+    
+    def version(self, folder: Path) -> int:
+        return self.snapshot(folder)['version']
+    
+    def changes_since(self, folder: Path, since: int) -> Dict:
+        folder = Path(folder)
+        with self.lock:
+            state = self._state(folder)
+            changed = self._changed(state)
+            
+            if since < state['oldest'] or since > state['version']:
+                result = {'version': state['version'], 'reset': True, 'files': list(state['files'].values())}
+            else:
+                latest = {}
+                for version, op, name, entry in state['changes']:
+                    if version > since:
+                        latest[name] = {'op': op, 'name': name, 'file': entry}
+                result = {'version': state['version'], 'reset': False, 'changes': list(latest.values())}
+        
+        self._notify(folder, changed)
+        return result
+    
+    def touch(self, folder: Path, name: str):
+        """Record a file written through the panel"""
+        folder = Path(folder)
+        try:
+            entry = file_entry(name, (folder / name).stat())
+        except FileNotFoundError:
+            return self.remove(folder, name)
+        
+        with self.lock:
+            state = self._state(folder)
+            if state['files'].get(name) != entry:
+                state['files'][name] = entry
+                self._record(state, 'upsert', name, entry)
+            self.stats['events'] += 1
+            changed = self._changed(state)
+        
+        self._notify(folder, changed)
+    
+    def remove(self, folder: Path, name: str):
+        """Record a file deleted through the panel"""
+        folder = Path(folder)
+        with self.lock:
+            state = self._state(folder)
+            if state['files'].pop(name, None) is not None:
+                self._record(state, 'delete', name)
+            self.stats['events'] += 1
+            changed = self._changed(state)
+        
+        self._notify(folder, changed)
+    
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {'folders': len(self.folders), **self.stats}
+
+file_index = FileIndex()
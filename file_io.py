@@ -0,0 +1,106 @@
+import asyncio
+import functools
+import os
+import secrets
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+FILE_IO_WORKERS = int(os.getenv('FILE_IO_WORKERS', '4'))
+MAX_EDIT_SIZE = int(os.getenv('MAX_EDIT_SIZE', str(5 * 1024 * 1024)))
+READ_WINDOW = 256 * 1024
+MIN_READ_WINDOW = 4 * 1024
+MAX_READ_WINDOW = 1024 * 1024
+
+_executor = ThreadPoolExecutor(max_workers=FILE_IO_WORKERS, thread_name_prefix='file-io')
+stats = {'reads': 0, 'writes': 0, 'bytes_read': 0, 'bytes_written': 0, 'rejected': 0}
+
+class FileIOError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+async def run_io(func, *args, **kwargs):
+    """Run blocking file work on the file I/O pool instead of the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+def _utf8_boundary(data: bytes) -> int:
+    """Length of `data` without a trailing, incomplete UTF-8 sequence"""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 != 0x80:
+            # Lead byte: keep it only if its whole sequence is present
+            needed = 1 if byte < 0x80 else 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return len(data) if back >= needed else len(data) - back
+    return len(data)
+
+def read_range(path: Path, offset: int = 0, length: int = READ_WINDOW) -> Dict:
+    """Decode up to `length` bytes from `offset`, ending on a line (or character) boundary"""
+    length = max(MIN_READ_WINDOW, min(length, MAX_READ_WINDOW))
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        offset = max(0, min(offset, size))
+        f.seek(offset)
+        data = f.read(length)
+    
+    if offset + len(data) < size:
+        cut = data.rfind(b'\n') + 1
+        data = data[:cut or _utf8_boundary(data)]
+    
+    try:
+        content = data.decode('utf-8')
+    except UnicodeDecodeError:
+        # Replacing the bad bytes would write U+FFFD back on save
+        stats['rejected'] += 1
+        raise FileIOError('File is not UTF-8 text and cannot be edited', 415)
+    
+    stats['reads'] += 1
+    stats['bytes_read'] += len(data)
+    next_offset = offset + len(data)
+    return {
+        'content': content,
+        'offset': offset,
+        'next_offset': next_offset,
+        'size': size,
+        'eof': next_offset >= size
+    }
+
+def write_atomic(path: Path, data: bytes):
+    """Write to a temp file in the same folder, fsync, then rename over the target"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{secrets.token_hex(4)}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(path.stat().st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    
+    stats['writes'] += 1
+    stats['bytes_written'] += len(data)
+
+async def read_text(path: Path, offset: int = 0, length: Optional[int] = None) -> Dict:
+    try:
+        return await run_io(read_range, path, offset, length or READ_WINDOW)
+    except FileNotFoundError:
+        raise FileIOError('File not found', 404)
+
+async def save_text(path: Path, content: str, max_size: int = MAX_EDIT_SIZE) -> int:
+    data = content.encode('utf-8')
+    if len(data) > max_size:
+        stats['rejected'] += 1
+        raise FileIOError(f'File too large to save (max {max_size // (1024 * 1024)}MB)', 413)
+    await run_io(write_atomic, path, data)
+    return len(data)
+
+def get_stats() -> Dict:
+    return {'workers': FILE_IO_WORKERS, **stats}
@@ -1,19 +1,166 @@
 import jwt
 import hashlib
+import heapq
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Optional, Dict
 import secrets
+from rate_limiter import share_limiter
 
-SECRET_KEY = secrets.token_urlsafe(32)
+SHARES_DIR = Path(__file__).parent / 'inf'
+SHARES_DB_PATH = Path(os.getenv('SHARE_DB_PATH', SHARES_DIR / 'shares.db'))
+SECRET_KEY_PATH = SHARES_DIR / 'share_secret.key'
+HOT_CACHE_SIZE = 512
+HASH_CHUNK_SIZE = 1024 * 1024
+
+SHARES_DIR.mkdir(exist_ok=True)
+
+def load_secret_key() -> str:
+    env_key = os.getenv('SHARE_SECRET_KEY')
+    if env_key:
+        return env_key
+    
+    if SECRET_KEY_PATH.exists():
+        stored_key = SECRET_KEY_PATH.read_text(encoding='utf-8').strip()
+        if stored_key:
+            return stored_key
+    
+    new_key = secrets.token_urlsafe(32)
+    fd = os.open(SECRET_KEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(new_key)
+    
+    return new_key
+
+SECRET_KEY = load_secret_key()
 
 class FileShareManager:
-    def __init__(self):
-        self.active_shares = {}
+    def __init__(self, db_path: Path = SHARES_DB_PATH, cache_size: int = HOT_CACHE_SIZE):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.hot_shares = OrderedDict()
+        self.pending_downloads = {}
+        self.expiry_heap = []
+        self.lock = threading.Lock()
+        self.init_db()
+        self.load_expiry_heap()
+    
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def init_db(self):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''CREATE TABLE IF NOT EXISTS shares
+                         (file_id TEXT PRIMARY KEY,
+                          user_id INTEGER,
+                          filename TEXT,
+                          file_path TEXT,
+                          token TEXT,
+                          expiry REAL,
+                          created REAL,
+                          downloads INTEGER DEFAULT 0,
+                          max_downloads INTEGER,
+                          file_hash TEXT,
+                          file_mtime REAL,
+                          file_size INTEGER)''')
+            
+            c.execute("PRAGMA table_info(shares)")
+            columns = [row[1] for row in c.fetchall()]
+            for column, column_type in [('file_hash', 'TEXT'), ('file_mtime', 'REAL'), ('file_size', 'INTEGER')]:
+                if column not in columns:
+                    c.execute(f'ALTER TABLE shares ADD COLUMN {column} {column_type}')
+            
+            c.execute('CREATE INDEX IF NOT EXISTS idx_shares_expiry ON shares (expiry)')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_shares_user ON shares (user_id, created)')
+    
+    def load_expiry_heap(self):
+        with self.get_connection() as conn:
+            rows = conn.execute('SELECT expiry, file_id FROM shares').fetchall()
+        
+        with self.lock:
+            self.expiry_heap = [(row['expiry'], row['file_id']) for row in rows]
+            heapq.heapify(self.expiry_heap)
+    
+    @staticmethod
+    def hash_file(file_path: str) -> Dict:
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            while True:
+                chunk = f.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha256.update(chunk)
+        
+        return {'file_hash': sha256.hexdigest(), 'file_mtime': st.st_mtime, 'file_size': st.st_size}
+    
+    @staticmethod
+    def _row_to_share(row) -> Dict:
+        return {
+            'user_id': row['user_id'],
+            'filename': row['filename'],
+            'file_path': row['file_path'],
+            'token': row['token'],
+            'expiry': datetime.fromtimestamp(row['expiry']),
+            'created': datetime.fromtimestamp(row['created']),
+            'downloads': row['downloads'],
+            'max_downloads': row['max_downloads'],
+            'file_hash': row['file_hash'],
+            'file_mtime': row['file_mtime'],
+            'file_size': row['file_size']
+        }
+    
+    def _cache_put(self, file_id: str, share_data: Dict):
+        with self.lock:
+            self.hot_shares[file_id] = share_data
+            self.hot_shares.move_to_end(file_id)
+            while len(self.hot_shares) > self.cache_size:
+                self.hot_shares.popitem(last=False)
+    
+    def _cache_pop(self, file_id: str):
+        with self.lock:
+            self.hot_shares.pop(file_id, None)
+    
+    def get_share(self, file_id: str) -> Optional[Dict]:
+        with self.lock:
+            share_data = self.hot_shares.get(file_id)
+            if share_data is not None:
+                self.hot_shares.move_to_end(file_id)
+                return share_data
+        
+        with self.get_connection() as conn:
+            row = conn.execute('SELECT * FROM shares WHERE file_id = ?', (file_id,)).fetchone()
+        
+        if row is None:
+            return None
+        
+        share_data = self._row_to_share(row)
+        with self.lock:
+            share_data['downloads'] += self.pending_downloads.get(file_id, 0)
+        self._cache_put(file_id, share_data)
+        return share_data
     
     def create_share_link(self, user_id: int, file_path: str, filename: str, expiry_hours: int = 24) -> Dict:
         file_id = hashlib.sha256(f"{user_id}_{filename}_{datetime.now().timestamp()}".encode()).hexdigest()[:16]
         
-        expiry_time = datetime.now() + timedelta(hours=expiry_hours)
+        created_time = datetime.now()
+        expiry_time = created_time + timedelta(hours=expiry_hours)
         
         payload = {
             'file_id': file_id,
@@ -21,22 +168,38 @@ class FileShareManager:
             'filename': filename,
             'file_path': file_path,
             'exp': expiry_time.timestamp(),
-            'created': datetime.now().timestamp()
+            'created': created_time.timestamp()
         }
         
         token = jwt.encode(payload, SECRET_KEY, algorithm='HS256')
         
-        self.active_shares[file_id] = {
+        validators = self.hash_file(file_path)
+        
+        share_data = {
             'user_id': user_id,
             'filename': filename,
             'file_path': file_path,
             'token': token,
             'expiry': expiry_time,
-            'created': datetime.now(),
+            'created': created_time,
             'downloads': 0,
-            'max_downloads': None
+            'max_downloads': None,
+            **validators
         }
         
+        with self.get_connection() as conn:
+            conn.execute('''INSERT OR REPLACE INTO shares
+                            (file_id, user_id, filename, file_path, token, expiry, created, downloads, max_downloads,
+                             file_hash, file_mtime, file_size)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, 0, NULL, ?, ?, ?)''',
+                         (file_id, user_id, filename, file_path, token,
+                          expiry_time.timestamp(), created_time.timestamp(),
+                          validators['file_hash'], validators['file_mtime'], validators['file_size']))
+        
+        self._cache_put(file_id, share_data)
+        with self.lock:
+            heapq.heappush(self.expiry_heap, (expiry_time.timestamp(), file_id))
+        
         return {
             'file_id': file_id,
             'token': token,
@@ -44,71 +207,134 @@ class FileShareManager:
             'share_url': f"/share/{token}"
         }
     
-    def verify_share_token(self, token: str) -> Optional[Dict]:
+    def resolve_share_token(self, token: str) -> Optional[Dict]:
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
             file_id = payload['file_id']
-            
-            if file_id not in self.active_shares:
-                return None
-            
-            share_data = self.active_shares[file_id]
-            
-            if datetime.now() > share_data['expiry']:
-                del self.active_shares[file_id]
-                return None
-            
-            if share_data.get('max_downloads') and share_data['downloads'] >= share_data['max_downloads']:
-                return None
-            
-            share_data['downloads'] += 1
-            
-            return {
-                'file_path': share_data['file_path'],
-                'filename': share_data['filename'],
-                'user_id': share_data['user_id'],
-                'downloads': share_data['downloads']
-            }
-        
         except jwt.ExpiredSignatureError:
             return None
         except jwt.InvalidTokenError:
             return None
+        
+        share_data = self.get_share(file_id)
+        if share_data is None:
+            return None
+        
+        if datetime.now() > share_data['expiry']:
+            self.revoke_share(file_id)
+            return None
+        
+        if share_data.get('max_downloads') and share_data['downloads'] >= share_data['max_downloads']:
+            return None
+        
+        return {'file_id': file_id, **share_data}
+    
+    def get_file_validators(self, file_id: str) -> Optional[Dict]:
+        share_data = self.get_share(file_id)
+        if share_data is None:
+            return None
+        
+        st = os.stat(share_data['file_path'])
+        if share_data.get('file_hash') and share_data['file_mtime'] == st.st_mtime and share_data['file_size'] == st.st_size:
+            return {k: share_data[k] for k in ('file_hash', 'file_mtime', 'file_size')}
+        
+        validators = self.hash_file(share_data['file_path'])
+        share_data.update(validators)
+        
+        with self.get_connection() as conn:
+            conn.execute('UPDATE shares SET file_hash = ?, file_mtime = ?, file_size = ? WHERE file_id = ?',
+                         (validators['file_hash'], validators['file_mtime'], validators['file_size'], file_id))
+        
+        return validators
+    
+    def record_download(self, file_id: str):
+        with self.lock:
+            self.pending_downloads[file_id] = self.pending_downloads.get(file_id, 0) + 1
+            share_data = self.hot_shares.get(file_id)
+            if share_data is not None:
+                share_data['downloads'] += 1
+    
+    def flush_downloads(self) -> int:
+        with self.lock:
+            pending = self.pending_downloads
+            self.pending_downloads = {}
+        
+        if not pending:
+            return 0
+        
+        try:
+            with self.get_connection() as conn:
+                conn.executemany('UPDATE shares SET downloads = downloads + ? WHERE file_id = ?',
+                                 [(count, file_id) for file_id, count in pending.items()])
+        except sqlite3.Error:
+            with self.lock:
+                for file_id, count in pending.items():
+                    self.pending_downloads[file_id] = self.pending_downloads.get(file_id, 0) + count
+            raise
+        
+        return len(pending)
     
     def revoke_share(self, file_id: str) -> bool:
-        if file_id in self.active_shares:
-            del self.active_shares[file_id]
-            return True
-        return False
+        self._cache_pop(file_id)
+        share_limiter.forget(file_id)
+        with self.lock:
+            self.pending_downloads.pop(file_id, None)
+        
+        with self.get_connection() as conn:
+            cursor = conn.execute('DELETE FROM shares WHERE file_id = ?', (file_id,))
+            return cursor.rowcount > 0
     
     def get_user_shares(self, user_id: int):
+        with self.get_connection() as conn:
+            rows = conn.execute('SELECT * FROM shares WHERE user_id = ? ORDER BY created DESC', (user_id,)).fetchall()
+        
+        with self.lock:
+            pending = {row['file_id']: self.pending_downloads.get(row['file_id'], 0) for row in rows}
+        
+        now = datetime.now()
         user_shares = []
-        for file_id, share_data in self.active_shares.items():
-            if share_data['user_id'] == user_id:
-                time_left = share_data['expiry'] - datetime.now()
-                hours_left = int(time_left.total_seconds() / 3600)
-                
-                user_shares.append({
-                    'file_id': file_id,
-                    'filename': share_data['filename'],
-                    'created': share_data['created'],
-                    'expiry': share_data['expiry'],
-                    'hours_left': hours_left,
-                    'downloads': share_data['downloads'],
-                    'token': share_data['token'],
-                    'is_expired': datetime.now() > share_data['expiry']
-                })
+        for row in rows:
+            share_data = self._row_to_share(row)
+            share_data['downloads'] += pending[row['file_id']]
+            time_left = share_data['expiry'] - now
+            hours_left = int(time_left.total_seconds() / 3600)
+            
+            user_shares.append({
+                'file_id': row['file_id'],
+                'filename': share_data['filename'],
+                'created': share_data['created'],
+                'expiry': share_data['expiry'],
+                'hours_left': hours_left,
+                'downloads': share_data['downloads'],
+                'token': share_data['token'],
+                'is_expired': now > share_data['expiry']
+            })
         
         return user_shares
     
+    def next_expiry(self) -> Optional[float]:
+        with self.lock:
+            return self.expiry_heap[0][0] if self.expiry_heap else None
+    
     def cleanup_expired(self):
+        now = datetime.now().timestamp()
+        
         expired_ids = []
-        for file_id, share_data in self.active_shares.items():
-            if datetime.now() > share_data['expiry']:
-                expired_ids.append(file_id)
+        with self.lock:
+            while self.expiry_heap and self.expiry_heap[0][0] <= now:
+                expired_ids.append(heapq.heappop(self.expiry_heap)[1])
+            for file_id in expired_ids:
+                self.hot_shares.pop(file_id, None)
+                self.pending_downloads.pop(file_id, None)
+        
+        if not expired_ids:
+            return 0
         
         for file_id in expired_ids:
-            del self.active_shares[file_id]
+            share_limiter.forget(file_id)
+        
+        with self.get_connection() as conn:
+            conn.executemany('DELETE FROM shares WHERE file_id = ?', [(file_id,) for file_id in expired_ids])
         
         return len(expired_ids)
 
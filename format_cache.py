@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Dict
+
+CACHE_DIR = Path(__file__).parent / 'inf'
+CACHE_DB_PATH = Path(os.getenv('FORMAT_CACHE_DB_PATH', CACHE_DIR / 'format_cache.db'))
+MEMORY_CACHE_SIZE = 256
+MAX_CACHE_ROWS = 5000
+
+CACHE_DIR.mkdir(exist_ok=True)
+
+def content_hash(content) -> str:
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+class ResultCache:
+    def __init__(self, db_path: Path = CACHE_DB_PATH, memory_size: int = MEMORY_CACHE_SIZE):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.init_db()
+    
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def init_db(self):
+        with self.get_connection() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS result_cache
+                            (kind TEXT,
+                             content_hash TEXT,
+                             version TEXT,
+                             result TEXT,
+                             created REAL,
+                             PRIMARY KEY (kind, content_hash, version))''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_result_cache_created ON result_cache (created)')
+    
+    def _remember(self, key, result: Dict):
+        with self.lock:
+            self.memory[key] = result
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_size:
+                self.memory.popitem(last=False)
+    
+    def get(self, kind: str, digest: str, version: str) -> Optional[Dict]:
+        key = (kind, digest, version)
+        
+        with self.lock:
+            result = self.memory.get(key)
+            if result is not None:
+                self.memory.move_to_end(key)
+                return result
+        
+        try:
+            with self.get_connection() as conn:
+                row = conn.execute('SELECT result FROM result_cache WHERE kind = ? AND content_hash = ? AND version = ?',
+                                   key).fetchone()
+        except sqlite3.Error:
+            return None
+        
+        if row is None:
+            return None
+        
+        result = json.loads(row[0])
+        self._remember(key, result)
+        return result
+    
+    def put(self, kind: str, digest: str, version: str, result: Dict):
+        key = (kind, digest, version)
+        self._remember(key, result)
+        
+        try:
+            with self.get_connection() as conn:
+                conn.execute('INSERT OR REPLACE INTO result_cache (kind, content_hash, version, result, created) VALUES (?, ?, ?, ?, ?)',
+                             (kind, digest, version, json.dumps(result), time.time()))
+                conn.execute('''DELETE FROM result_cache WHERE created < (
+                                    SELECT created FROM result_cache ORDER BY created DESC LIMIT 1 OFFSET ?)''',
+                             (MAX_CACHE_ROWS,))
+        except sqlite3.Error:
+            pass
+
+result_cache = ResultCache()
@@ -8,8 +8,9 @@ This script will:
 2. Install all dependencies automatically
 3. Create .env file with your details
 4. Create necessary folders
-5. Test the installation
-6. Launch the bot
+5. Download web panel assets
+6. Test the installation
+7. Launch the bot
 """
 
 import sys
@@ -172,6 +173,34 @@ def create_folders():
     print("✅ All folders created!")
     return True
 
+def vendor_web_assets():
+    """Serve the editor libraries locally when this checkout pins them (dashboard/vendor.sha256)"""
+    if not Path("dashboard/vendor.sha256").exists():
+        print("\nℹ️  No pinned editor assets, the code editor loads CodeMirror from cdnjs")
+        return True
+    
+    print("\n🎨 Downloading pinned web panel assets...")
+    
+    try:
+        result = subprocess.run(
+            [sys.executable, "page_renderer.py"],
+            capture_output=True,
+            text=True,
+            timeout=120
+        )
+        
+        if result.returncode != 0:
+            print(f"⚠️  Could not vendor assets: {result.stderr.strip()}")
+            print("   The code editor will load CodeMirror from cdnjs")
+            return True
+        
+        print(result.stdout.strip())
+        return True
+    
+    except Exception as e:
+        print(f"⚠️  Asset download warning: {e}")
+        return True
+
 def test_installation():
     """Test if bot can be imported"""
     print("\n🧪 Testing installation...")
@@ -260,10 +289,13 @@ def main():
         print("\n❌ Setup failed at folder creation")
         return
     
-    # Step 5: Test installation
+    # Step 5: Download web panel assets
+    vendor_web_assets()
+    
+    # Step 6: Test installation
     test_installation()
     
-    # Step 6: Show next steps
+    # Step 7: Show next steps
     show_next_steps()
     
     # Ask to launch
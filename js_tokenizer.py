@@ -0,0 +1,70 @@
+import re
+from typing import Iterator, Tuple
+
+JS_KEYWORDS = {
+    'if', 'for', 'while', 'switch', 'catch', 'return', 'typeof', 'new', 'function',
+    'class', 'const', 'let', 'var', 'import', 'export', 'await', 'async', 'yield',
+    'delete', 'void', 'in', 'of', 'instanceof', 'do', 'else', 'try', 'finally',
+    'throw', 'case', 'default', 'break', 'continue', 'super', 'this', 'with'
+}
+
+# After these words an expression starts, so `/` opens a regex literal
+JS_REGEX_PREFIX_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw',
+    'case', 'do', 'else', 'yield', 'await'
+}
+
+JS_TOKEN_REGEX = re.compile(r'''
+    (?P<newline>\n)
+  | (?P<space>[ \t\r\f\v]+)
+  | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<number>\d[\w.]*|\.\d[\w]*)
+  | (?P<op>=>|&&|\|\||\?\?|\?\.)
+  | (?P<punct>[^\s\w$])
+  | (?P<other>\S)
+''', re.VERBOSE | re.DOTALL)
+
+JS_REGEX_LITERAL = re.compile(r'/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[A-Za-z]*')
+
+def _regex_allowed(prev: Tuple[str, str]) -> bool:
+    """Whether a `/` after token `prev` starts a regex rather than a division"""
+    kind, value = prev
+    if not kind:
+        return True
+    if kind == 'name':
+        return value in JS_REGEX_PREFIX_KEYWORDS
+    if kind == 'op':
+        return value != '?.'
+    if kind == 'punct':
+        return value not in (')', ']')
+    return False
+
+def tokenize_js(source: str) -> Iterator[Tuple[str, str, int]]:
+    """Yield (kind, value, line) for every piece of `source`, whitespace and comments included
+    
+    Kinds: newline, space, comment, string (quotes and template literals),
+    regex, name, number, op (=> && || ?? ?.), punct (any other single
+    character) and other. `line` is where the token starts.
+    """
+    position = 0
+    line = 1
+    prev = ('', '')
+    
+    while position < len(source):
+        match = None
+        if source[position] == '/' and _regex_allowed(prev) and source[position + 1:position + 2] not in ('/', '*'):
+            match = JS_REGEX_LITERAL.match(source, position)
+            kind = 'regex'
+        if match is None:
+            match = JS_TOKEN_REGEX.match(source, position)
+            kind = match.lastgroup
+        
+        value = match.group()
+        yield kind, value, line
+        
+        line += value.count('\n')
+        position = match.end()
+        if kind not in ('newline', 'space', 'comment'):
+            prev = (kind, value)
@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TAIL_BLOCK_SIZE = 64 * 1024
+MAX_SCAN_BYTES = 8 * 1024 * 1024
+MAX_TAIL_LINES = 2000
+MAX_SINCE_BYTES = 1024 * 1024
+
+LOG_LINE_REGEX = re.compile(r' - (?P<logger>[\w.\-]+) - (?P<level>DEBUG|INFO|WARNING|ERROR|CRITICAL) - ')
+
+def parse_level(level: Optional[str]) -> Optional[int]:
+    if not level:
+        return None
+    value = logging.getLevelName(level.upper())
+    return value if isinstance(value, int) else None
+
+def line_fields(line: str) -> Dict:
+    """Level and logger of a text ('asctime - name - LEVEL - msg') or JSON log line"""
+    if line.startswith('{'):
+        try:
+            record = json.loads(line)
+            return {'level': record.get('level'), 'logger': record.get('logger')}
+        except ValueError:
+            pass
+    
+    match = LOG_LINE_REGEX.search(line)
+    if match:
+        return {'level': match.group('level'), 'logger': match.group('logger')}
+    return {'level': None, 'logger': None}
+
+def make_filter(level: Optional[str] = None, logger_name: Optional[str] = None):
+    min_level = parse_level(level)
+    if min_level is None and not logger_name:
+        return None
+    
+    def matches(line: str) -> bool:
+        fields = line_fields(line)
+        if min_level is not None:
+            line_level = parse_level(fields['level'])
+            if line_level is None or line_level < min_level:
+                return False
+        if logger_name:
+            name = fields['logger'] or ''
+            if name != logger_name and not name.startswith(logger_name + '.'):
+                return False
+        return True
+    
+    return matches
+
+def iter_lines_reversed(path: Path, block_size: int = TAIL_BLOCK_SIZE, max_scan: Optional[int] = None):
+    """Yield the lines of a file newest first, reading backwards from EOF in blocks"""
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        remainder = b''
+        scanned = 0
+        
+        while position > 0 and (max_scan is None or scanned < max_scan):
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            chunk = f.read(size) + remainder
+            scanned += size
+            
+            parts = chunk.split(b'\n')
+            # The first part may be the tail of a line that starts in an earlier block
+            remainder = parts.pop(0) if position > 0 else b''
+            
+            for raw in reversed(parts):
+                if raw:
+                    yield raw.decode('utf-8', errors='replace').rstrip('\r')
+
+def display_line(line: str) -> str:
+    """Render JSON log records in the familiar text layout"""
+    if not line.startswith('{'):
+        return line
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return line
+    
+    text = f"{record.get('ts', '')} - {record.get('logger', '')} - {record.get('level', '')} - {record.get('message', '')}"
+    if record.get('user_id') is not None:
+        text += f" [user {record['user_id']}]"
+    return text
+
+def tail(path: Path, count: int = 200, level: Optional[str] = None, logger_name: Optional[str] = None,
+         block_size: int = TAIL_BLOCK_SIZE, max_scan: int = MAX_SCAN_BYTES) -> Dict:
+    """Last `count` (matching) lines of a log file"""
+    count = max(1, min(count, MAX_TAIL_LINES))
+    matches = make_filter(level, logger_name)
+    end = path.stat().st_size
+    lines: List[str] = []
+    
+    for line in iter_lines_reversed(path, block_size, max_scan):
+        if matches is None or matches(line):
+            lines.append(display_line(line))
+            if len(lines) >= count:
+                break
+    
+    lines.reverse()
+    return {'lines': lines, 'offset': end, 'truncated': len(lines) < count and end > max_scan}
+
+def read_since(path: Path, offset: int, level: Optional[str] = None, logger_name: Optional[str] = None,
+               max_bytes: int = MAX_SINCE_BYTES) -> Dict:
+    """Complete lines appended after `offset`; reset=True when the file was rotated or truncated"""
+    matches = make_filter(level, logger_name)
+    
+    with open(path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        if offset > end:
+            return {'reset': True, **tail(path, level=level, logger_name=logger_name)}
+        
+        f.seek(offset)
+        data = f.read(min(end - offset, max_bytes))
+    
+    # Hold back a trailing partial line until it is finished, unless a single
+    # line is longer than the whole read window
+    complete = data.rfind(b'\n') + 1
+    if complete == 0 and len(data) >= max_bytes:
+        complete = len(data)
+    lines = []
+    for raw in data[:complete].split(b'\n'):
+        if not raw:
+            continue
+        line = raw.decode('utf-8', errors='replace').rstrip('\r')
+        if matches is None or matches(line):
+            lines.append(display_line(line))
+    
+    return {'reset': False, 'lines': lines, 'offset': offset + complete, 'more': offset + len(data) < end}
+
+def read_log(path: Path, query) -> Dict:
+    """Shared query handling for the panels' view-logs endpoints"""
+    level = query.get('level') or None
+    logger_name = query.get('logger') or None
+    
+    since = query.get('since')
+    if since is not None and since.isdigit():
+        return read_since(path, int(since), level, logger_name)
+    
+    lines = int(query['lines']) if query.get('lines', '').isdigit() else 200
+    return {'reset': True, **tail(path, lines, level, logger_name)}
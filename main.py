@@ -10,6 +10,9 @@ import json
 import zipfile
 import re
 import signal
+import base64
+import html
+from email.utils import formatdate
 from contextlib import contextmanager
 from datetime import datetime, timedelta
 from aiogram import Bot, Dispatcher, types, F
@@ -24,9 +27,16 @@ from web_dashboard import create_web_dashboard, create_user_panel
 from temporary_hosting import create_user_hosting, get_session_status, hosting_manager
 from hosting_detector import hosting, print_startup_info
 from file_sharing import share_manager
+from rate_limiter import share_limiter, forwarded_client_ip, check_preconditions, content_disposition
 from code_formatter import code_formatter
 from advanced_search import create_search_instance
+from symbol_index import symbol_index
+from dependency_manager import detect_requirements, venv_manager
+from process_manager import process_manager, ProcessLimitError
 from live_panel_complete import create_live_panel_app
+from file_index import file_index
+from file_io import MAX_EDIT_SIZE
+from app_logging import setup_logging, current_user_id, query_logs, get_stats as get_log_stats
 
 if __name__ == "__main__":
     print("❌ Direct execution not allowed!")
@@ -35,7 +45,7 @@ if __name__ == "__main__":
 
 load_dotenv()
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 TOKEN = os.getenv('BOT_TOKEN')
@@ -72,6 +82,7 @@ SUBSCRIBED_USER_LIMIT = 50
 ADMIN_LIMIT = 999
 OWNER_LIMIT = float('inf')
 SCRIPT_TIMEOUT = 3600
+SHARE_SWEEP_INTERVAL = 60
 MAX_FILE_SIZE = 50 * 1024 * 1024
 MAX_ZIP_SIZE = 100 * 1024 * 1024
 ALLOWED_EXTENSIONS = {'.py', '.js', '.zip'}
@@ -83,7 +94,16 @@ IROTECH_DIR.mkdir(exist_ok=True)
 bot = Bot(token=TOKEN)
 dp = Dispatcher(storage=MemoryStorage())
 
-bot_scripts = {}
+@dp.update.outer_middleware()
+async def log_context_middleware(handler, event, data):
+    """Tag every log record written while handling an update with its user"""
+    user = data.get('event_from_user')
+    token = current_user_id.set(user.id if user else None)
+    try:
+        return await handler(event, data)
+    finally:
+        current_user_id.reset(token)
+
 user_subscriptions = {}
 user_files = {}
 user_favorites = {}
@@ -563,8 +583,14 @@ async def callback_advanced_search(callback: types.CallbackQuery):
 📅 <b>Recent Files</b>
    Files modified in last 7 days
 
+🏷️ <b>Symbol Search</b>
+   Find definitions, imports and call sites (.py, .js)
+
 <b>Examples:</b>
 • <code>/search function</code> - Find "function" in names/content
+• <code>/search def:main</code> - Where is <code>main</code> defined
+• <code>/search import:requests</code> - Files importing requests
+• <code>/search call:send_message</code> - Call sites
 • <code>/search import.*requests</code> - Regex search
 • <code>/search .py</code> - All Python files
 
@@ -586,7 +612,7 @@ async def callback_view_shares(callback: types.CallbackQuery):
     if not await is_admin_user(user_id, callback):
         return
     
-    shares = share_manager.get_user_shares(user_id)
+    shares = await asyncio.to_thread(share_manager.get_user_shares, user_id)
     
     if not shares:
         text = """
@@ -744,7 +770,7 @@ async def callback_statistics(callback: types.CallbackQuery):
 📁 Total Files: {user_file_count}/{limit}
 ⭐ Favorites: {user_fav_count}
 💎 Account: {'Premium ✨' if is_premium else 'Free 🆓'}
-🚀 Running: {sum(1 for k in bot_scripts if k.startswith(f"{user_id}_"))}
+🚀 Running: {process_manager.count(user_id)}
 
 ━━━━━━━━━━━━━━━━━━━━
 📈 <b>USAGE:</b>
@@ -807,6 +833,7 @@ async def callback_help_info(callback: types.CallbackQuery):
 /start - Start the bot
 /help - Show this help
 /search - Search files
+/formatall - Format all your files
 /stats - Your statistics
 /premium - Premium info
 
@@ -1086,6 +1113,26 @@ async def callback_toggle_favorite(callback: types.CallbackQuery):
         logger.error(f"Error toggling favorite: {e}")
         await callback.answer(f"❌ Error: {str(e)}", show_alert=True)
 
+def format_analysis_text(analysis):
+    if 'total_lines' not in analysis:
+        return ""
+    
+    text = f"\n📊 <b>Analysis:</b> {analysis['total_lines']} lines ({analysis['non_empty_lines']} non-empty)"
+    if 'functions' in analysis:
+        text += (f"\n🔧 <b>Code:</b> {analysis['functions']} functions, {analysis['classes']} classes, "
+                 f"{analysis['imports']} imports, {analysis['comments']} comments")
+    if analysis.get('max_complexity'):
+        text += (f"\n🧠 <b>Complexity:</b> max {analysis['max_complexity']} in <code>{analysis['most_complex']}</code>, "
+                 f"avg {analysis['avg_complexity']}")
+    if analysis.get('top_level_imports'):
+        modules = ', '.join(analysis['top_level_imports'][:8])
+        more = len(analysis['top_level_imports']) - 8
+        text += f"\n📦 <b>Imports:</b> <code>{modules}</code>" + (f" +{more} more" if more > 0 else "")
+    if analysis.get('syntax_error'):
+        text += f"\n⚠️ <b>Syntax error:</b> <code>{analysis['syntax_error'].replace('<', '&lt;').replace('>', '&gt;')}</code>"
+    
+    return text
+
 @dp.callback_query(F.data.startswith("file_info:"))
 async def callback_file_info(callback: types.CallbackQuery):
     user_id = callback.from_user.id
@@ -1115,13 +1162,9 @@ async def callback_file_info(callback: types.CallbackQuery):
         
         file_hash = hashlib.sha256(file_path.read_bytes()).hexdigest()[:16]
         
-        code_analysis = code_formatter.analyze_code(str(file_path))
+        code_analysis = await asyncio.to_thread(code_formatter.analyze_code, str(file_path))
         
-        analysis_text = ""
-        if 'total_lines' in code_analysis:
-            analysis_text = f"\n📊 <b>Analysis:</b> {code_analysis['total_lines']} lines"
-            if 'functions' in code_analysis:
-                analysis_text += f", {code_analysis['functions']} functions"
+        analysis_text = format_analysis_text(code_analysis)
         
         text = f"""
 ╔═══════════════════════╗
@@ -1245,6 +1288,13 @@ async def handle_document(message: types.Message):
             c.execute('UPDATE bot_stats SET stat_value = stat_value + 1 WHERE stat_name = ?', ('total_uploads',))
         
         bot_stats['total_uploads'] = bot_stats.get('total_uploads', 0) + 1
+        file_index.touch(user_folder, safe_filename)
+        
+        if file_ext in ('.py', '.js'):
+            try:
+                await asyncio.to_thread(symbol_index.index_file, file_path)
+            except Exception as e:
+                logger.warning(f"Symbol indexing failed for {safe_filename}: {e}")
         
         await status_msg.edit_text(
             f"✅ <b>Finalizing...</b>\n\n"
@@ -1315,7 +1365,7 @@ async def callback_run_script(callback: types.CallbackQuery):
     
     script_key = f"{user_id}_{file_name}"
     
-    if script_key in bot_scripts:
+    if process_manager.get(script_key):
         await callback.answer("⚠️ Script is already running!", show_alert=True)
         return
     
@@ -1325,14 +1375,52 @@ async def callback_run_script(callback: types.CallbackQuery):
         await callback.answer("❌ Can only run .py or .js files!", show_alert=True)
         return
     
+    # Holds the slot through the dependency install, until register() or the finally below
+    try:
+        process_manager.reserve(script_key, user_id)
+    except ProcessLimitError as e:
+        await callback.answer(f"⚠️ {str(e)}", show_alert=True)
+        return
+    
+    answered = False
+    
     try:
         user_folder = UPLOAD_BOTS_DIR / str(user_id)
+        python_executable = sys.executable
+        env_note = None
+        venv = None
+        
+        if file_ext == '.py':
+            requirements = await asyncio.to_thread(detect_requirements, file_path, user_folder)
+            if requirements:
+                if not venv_manager.is_ready(requirements):
+                    await callback.answer(f"📦 Installing {len(requirements)} package(s)...")
+                    answered = True
+                
+                env = await venv_manager.ensure_env(requirements)
+                if env['success']:
+                    python_executable = env['python']
+                    venv = env['venv']
+                    env_note = f"[SYSTEM] Using virtualenv {env['venv']} ({', '.join(requirements)})\n\n"
+                else:
+                    # The script may still run with what the host has installed
+                    logger.warning(f"Virtualenv build failed for {file_name}, falling back to host Python")
+                    await callback.message.answer(
+                        f"⚠️ <b>Dependency install failed</b>, running with the host Python instead\n\n"
+                        f"<code>{html.escape(env['output'][-1500:])}</code>",
+                        parse_mode="HTML"
+                    )
+                    env_note = f"[SYSTEM] Installing {', '.join(requirements)} failed, using host Python\n\n"
+        
         log_file_path = user_folder / f"{file_path.stem}.log"
         log_file = open(log_file_path, 'w', encoding='utf-8')
+        if env_note:
+            log_file.write(env_note)
+            log_file.flush()
         
         if file_ext == '.py':
             process = subprocess.Popen(
-                [sys.executable, str(file_path)],
+                [python_executable, str(file_path)],
                 cwd=str(user_folder),
                 stdout=log_file,
                 stderr=log_file,
@@ -1351,15 +1439,14 @@ async def callback_run_script(callback: types.CallbackQuery):
             await callback.answer("❌ Cannot run this file type!", show_alert=True)
             return
         
-        bot_scripts[script_key] = {
-            'process': process,
-            'file_name': file_name,
-            'script_owner_id': user_id,
-            'start_time': datetime.now(),
-            'user_folder': str(user_folder),
-            'type': file_ext[1:],
-            'log_file': log_file
-        }
+        process_manager.register(
+            script_key, process, 'bot', user_id, file_name,
+            timeout=SCRIPT_TIMEOUT,
+            user_folder=str(user_folder),
+            type=file_ext[1:],
+            log_file=log_file,
+            venv=venv
+        )
         
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -1369,7 +1456,10 @@ async def callback_run_script(callback: types.CallbackQuery):
         
         asyncio.create_task(monitor_script_timeout(script_key, SCRIPT_TIMEOUT))
         
-        await callback.answer(f"✅ Script started! (PID: {process.pid})", show_alert=True)
+        if answered:
+            await callback.message.answer(f"✅ Script started! (PID: {process.pid})")
+        else:
+            await callback.answer(f"✅ Script started! (PID: {process.pid})", show_alert=True)
         
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="🛑 Stop Script", callback_data=f"stop_script:{script_key}")],
@@ -1385,55 +1475,19 @@ async def callback_run_script(callback: types.CallbackQuery):
     except Exception as e:
         logger.error(f"Error running script: {e}")
         await callback.answer(f"❌ Error: {str(e)}", show_alert=True)
+    finally:
+        process_manager.release(script_key)
 
 async def monitor_script_timeout(script_key, timeout):
     await asyncio.sleep(timeout)
     
-    if script_key in bot_scripts:
+    if process_manager.get(script_key):
         logger.warning(f"Script {script_key} exceeded timeout, terminating...")
         try:
-            script_info = bot_scripts[script_key]
-            process = script_info['process']
-            log_file = script_info.get('log_file')
-            
-            if log_file and not log_file.closed:
-                log_file.write(f"\n\n[SYSTEM] Script terminated after {timeout}s timeout\n")
-                log_file.close()
-            
-            terminate_process_tree(process.pid)
-            
-            del bot_scripts[script_key]
+            await asyncio.to_thread(process_manager.stop, script_key, f"Script terminated after {timeout}s timeout")
         except Exception as e:
             logger.error(f"Error in timeout handler: {e}")
 
-def terminate_process_tree(pid):
-    try:
-        parent = psutil.Process(pid)
-        children = parent.children(recursive=True)
-        
-        for child in children:
-            try:
-                child.terminate()
-            except psutil.NoSuchProcess:
-                pass
-        
-        try:
-            parent.terminate()
-        except psutil.NoSuchProcess:
-            pass
-        
-        gone, alive = psutil.wait_procs(children + [parent], timeout=3)
-        
-        for p in alive:
-            try:
-                p.kill()
-            except psutil.NoSuchProcess:
-                pass
-    except psutil.NoSuchProcess:
-        logger.warning(f"Process {pid} already terminated")
-    except Exception as e:
-        logger.error(f"Error terminating process tree: {e}")
-
 @dp.callback_query(F.data.startswith("stop_script:"))
 async def callback_stop_script(callback: types.CallbackQuery):
     user_id = callback.from_user.id
@@ -1443,22 +1497,12 @@ async def callback_stop_script(callback: types.CallbackQuery):
     
     script_key = callback.data.split(":", 1)[1]
     
-    if script_key not in bot_scripts:
+    if not process_manager.get(script_key):
         await callback.answer("❌ Script not found or already stopped!", show_alert=True)
         return
     
     try:
-        script_info = bot_scripts[script_key]
-        process = script_info['process']
-        log_file = script_info.get('log_file')
-        
-        if log_file and not log_file.closed:
-            log_file.write("\n\n[SYSTEM] Script stopped by user\n")
-            log_file.close()
-        
-        terminate_process_tree(process.pid)
-        
-        del bot_scripts[script_key]
+        await asyncio.to_thread(process_manager.stop, script_key, "Script stopped by user")
         
         await callback.answer("✅ Script stopped successfully!", show_alert=True)
         
@@ -1571,6 +1615,13 @@ Please wait...
         
         if zip_path.exists():
             zip_path.unlink()
+        file_index.snapshot(user_folder)
+        
+        for registered_name in registered_files:
+            try:
+                await asyncio.to_thread(symbol_index.index_file, user_folder / registered_name)
+            except Exception as e:
+                logger.warning(f"Symbol indexing failed for {registered_name}: {e}")
         
         registered_text = "\n".join([f"  • <code>{f}</code>" for f in registered_files[:10]])
         if len(registered_files) > 10:
@@ -1600,6 +1651,7 @@ Please wait...
 """
         
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="✨ Format All", callback_data="format_all")],
             [InlineKeyboardButton(text="📁 My Files", callback_data="check_files"),
              InlineKeyboardButton(text="🏠 Main Menu", callback_data="back_to_main")]
         ])
@@ -1632,6 +1684,9 @@ async def callback_delete_file(callback: types.CallbackQuery):
         if file_path.exists():
             file_path.unlink()
         
+        symbol_index.remove_file(file_path)
+        file_index.remove(file_path.parent, file_name)
+        
         if user_id in user_files:
             user_files[user_id] = [f for f in user_files[user_id] if f[0] != file_name]
         
@@ -1722,7 +1777,9 @@ async def callback_admin_running_scripts(callback: types.CallbackQuery):
         await callback.answer("❌ Admin only!", show_alert=True)
         return
     
-    if not bot_scripts:
+    running = process_manager.list()
+    
+    if not running:
         text = """
 ╔═══════════════════════╗
     🚀 <b>RUNNING SCRIPTS</b> 🚀
@@ -1734,16 +1791,18 @@ async def callback_admin_running_scripts(callback: types.CallbackQuery):
     else:
         text = f"""
 ╔═══════════════════════╗
-    🚀 <b>RUNNING ({len(bot_scripts)})</b> 🚀
+    🚀 <b>RUNNING ({len(running)})</b> 🚀
 ╚═══════════════════════╝
 
 """
         buttons = []
-        for script_key, info in bot_scripts.items():
+        for script_key, info in running:
             runtime = (datetime.now() - info['start_time']).total_seconds()
-            text += f"🔸 <code>{info['file_name']}</code>\n"
+            usage = process_manager.process_usage(script_key)
+            text += f"🔸 <code>{info['file_name']}</code> ({info['source']})\n"
             text += f"   PID: {info['process'].pid} | User: {info['script_owner_id']}\n"
-            text += f"   Runtime: {int(runtime)}s\n\n"
+            text += f"   Runtime: {int(runtime)}s"
+            text += f" | RAM: {usage['memory_mb']:.0f} MB\n\n" if usage else "\n\n"
             buttons.append([InlineKeyboardButton(
                 text=f"🛑 Stop {info['file_name'][:15]}", 
                 callback_data=f"stop_script:{script_key}"
@@ -1808,7 +1867,7 @@ async def callback_admin_analytics(callback: types.CallbackQuery):
 ▶️ Script Runs: {bot_stats.get('total_runs', 0)}
 👥 Total Users: {len(active_users)}
 📁 Total Files: {sum(len(files) for files in user_files.values())}
-🚀 Running Now: {len(bot_scripts)}
+🚀 Running Now: {process_manager.count()}
 ⭐ Total Favorites: {sum(len(favs) for favs in user_favorites.values())}
 
 <b>💎 PREMIUM:</b>
@@ -1859,7 +1918,7 @@ Total: {disk.total / (1024**3):.1f} GB
 
 <b>🤖 BOT STATUS:</b>
 Status: {'🔒 Locked' if bot_locked else '✅ Running'}
-Scripts: {len(bot_scripts)} active
+Scripts: {process_manager.count()} active
 Uptime: ✅ Online
 """
     
@@ -2123,21 +2182,33 @@ async def callback_admin_view_logs(callback: types.CallbackQuery):
         await callback.answer("❌ Admin only!", show_alert=True)
         return
     
-    text = """
+    records = await asyncio.to_thread(query_logs, level='WARNING', limit=15)
+    stats = get_log_stats()
+    
+    lines = []
+    for record in reversed(records):
+        ts = record.get('ts', '')[5:19].replace('T', ' ')
+        user = f" 👤{record['user_id']}" if record.get('user_id') is not None else ''
+        message = record.get('message', '')[:200]
+        lines.append(f"<code>{ts}</code> <b>{record.get('level')}</b> {html.escape(record.get('logger', ''))}{user}\n"
+                     f"{html.escape(message)}")
+    
+    header = f"""
 ╔═══════════════════════╗
     📝 <b>SYSTEM LOGS</b> 📝
 ╚═══════════════════════╝
 
-View bot logs and activity.
-
-<b>Available Logs:</b>
-• Error logs
-• User activity
-• Script executions
-• Admin actions
+<b>Files:</b> {stats['files']} ({stats['size_mb']:.1f} MB)
+<b>Dropped:</b> {stats['dropped']}
 
-Logs are stored in the system directory.
+<b>Recent warnings &amp; errors:</b>
 """
+    body = '\n\n'.join(lines) if lines else 'No warnings or errors logged 🎉'
+    # Telegram messages are capped at 4096 characters; keep the newest entries
+    while len(header) + len(body) > 4000 and len(lines) > 1:
+        lines.pop(0)
+        body = '\n\n'.join(lines)
+    text = header + body
     
     back_keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="🔙 Admin Panel", callback_data="admin_panel")]
@@ -2532,6 +2603,7 @@ async def cmd_help(message: types.Message):
 /start - Start the bot
 /help - Show this help
 /search - Search files
+/formatall - Format all your files
 /stats - Your statistics
 /premium - Premium info
 
@@ -2571,7 +2643,7 @@ async def cmd_stats(message: types.Message):
 📦 Files Uploaded: {user_file_count}/{get_user_file_limit(user_id)}
 ⭐ Favorites: {user_fav_count}
 💎 Account: {'Premium ✨' if is_premium else 'Free 🆓'}
-🚀 Running: {sum(1 for k in bot_scripts if k.startswith(f"{user_id}_"))}
+🚀 Running: {process_manager.count(user_id)}
 
 ━━━━━━━━━━━━━━━━━━━━
 📈 <b>USAGE:</b>
@@ -2622,29 +2694,35 @@ async def cleanup_old_scripts():
         await asyncio.sleep(300)
         
         try:
-            for script_key, info in list(bot_scripts.items()):
-                runtime = (datetime.now() - info['start_time']).total_seconds()
-                
-                if runtime > SCRIPT_TIMEOUT:
-                    logger.warning(f"Terminating long-running script: {script_key}")
-                    
-                    process = info['process']
-                    log_file = info.get('log_file')
-                    
-                    if log_file and not log_file.closed:
-                        log_file.write(f"\n[SYSTEM] Script auto-terminated after {runtime:.0f}s\n")
-                        log_file.close()
-                    
-                    terminate_process_tree(process.pid)
-                    del bot_scripts[script_key]
-                    
+            result = await asyncio.to_thread(process_manager.cleanup)
+            if result['timed_out']:
+                logger.warning(f"Terminated {result['timed_out']} long-running processes")
+        
         except Exception as e:
             logger.error(f"Cleanup error: {e}")
 
+async def share_sweeper():
+    while True:
+        next_expiry = share_manager.next_expiry()
+        delay = SHARE_SWEEP_INTERVAL
+        if next_expiry is not None:
+            delay = min(delay, max(next_expiry - datetime.now().timestamp(), 1))
+        
+        await asyncio.sleep(delay)
+        
+        try:
+            await asyncio.to_thread(share_manager.flush_downloads)
+            removed = await asyncio.to_thread(share_manager.cleanup_expired)
+            if removed:
+                logger.info(f"🗑️ Removed {removed} expired share link(s)")
+        except Exception as e:
+            logger.error(f"Share sweeper error: {e}")
+
 async def web_server():
     from live_panel_complete import create_live_panel_app
     
-    main_app = web.Application()
+    # Editor saves arrive as one JSON body; leave room for escaping
+    main_app = web.Application(client_max_size=MAX_EDIT_SIZE * 2)
     
     dashboard_app = await create_web_dashboard()
     live_panel, live_panel_app = create_live_panel_app(BASE_DIR)
@@ -2658,7 +2736,7 @@ async def web_server():
             "uptime_seconds": int(uptime),
             "uptime_human": f"{int(uptime//3600)}h {int((uptime%3600)//60)}m",
             "total_users": len(active_users),
-            "active_scripts": len(bot_scripts),
+            "active_scripts": process_manager.count(),
             "total_files": sum(len(files) for files in user_files.values()),
             "bot_locked": bot_locked,
             "version": "2.0.0",
@@ -2675,6 +2753,52 @@ async def web_server():
     async def handle_health(request):
         return web.json_response({"status": "healthy", "timestamp": datetime.now().isoformat()})
     
+    async def handle_share_download(request):
+        token = request.match_info.get('token')
+        share = await asyncio.to_thread(share_manager.resolve_share_token, token)
+        
+        if not share:
+            return web.Response(text="❌ Share link expired or invalid", status=404)
+        
+        client_ip = request.remote
+        if hosting.get_config()['is_production']:
+            client_ip = forwarded_client_ip(request)
+        
+        retry_after = share_limiter.check_request(share['file_id'], client_ip)
+        if retry_after is not None:
+            return web.Response(
+                text="⏳ Too many downloads, please retry later",
+                status=429,
+                headers={'Retry-After': str(max(1, int(retry_after + 0.999)))}
+            )
+        
+        try:
+            validators = await asyncio.to_thread(share_manager.get_file_validators, share['file_id'])
+        except FileNotFoundError:
+            return web.Response(text="❌ Shared file is no longer available", status=410)
+        
+        # The content hash is the validator on every response, and conditionals are judged against it
+        etag = f'"{validators["file_hash"]}"'
+        headers = {
+            'ETag': etag,
+            'Content-Disposition': content_disposition(share['filename']),
+            'Repr-Digest': f"sha-256=:{base64.b64encode(bytes.fromhex(validators['file_hash'])).decode()}:",
+            'Cache-Control': 'private, no-cache'
+        }
+        
+        checked = check_preconditions(request, etag)
+        if checked == 304:
+            headers['Last-Modified'] = formatdate(validators['file_mtime'], usegmt=True)
+            return web.Response(status=304, headers=headers)
+        if checked == 412:
+            return web.Response(status=412, headers={'ETag': etag})
+        
+        # Counted only when the whole file is sent: partial ranges (206) and revalidations (304) don't
+        return await share_limiter.send_file(
+            checked, share['file_id'], share['file_path'], headers,
+            on_download=lambda: share_manager.record_download(share['file_id'])
+        )
+    
     async def handle_stats(request):
         stats_data = {
             "users": {
@@ -2691,7 +2815,7 @@ async def web_server():
                 }
             },
             "scripts": {
-                "running": len(bot_scripts),
+                **process_manager.get_stats(),
                 "total_runs": bot_stats.get('total_runs', 0)
             },
             "system": {
@@ -2718,6 +2842,7 @@ async def web_server():
     main_app.router.add_get('/', handle_root)
     main_app.router.add_get('/health', handle_health)
     main_app.router.add_get('/stats', handle_stats)
+    main_app.router.add_get('/share/{token}', handle_share_download)
     
     config = hosting.get_config()
     bind_address = config['bind_address']
@@ -2815,7 +2940,8 @@ async def callback_create_share(callback: types.CallbackQuery):
         await callback.answer("❌ File not found!", show_alert=True)
         return
     
-    share_data = share_manager.create_share_link(
+    share_data = await asyncio.to_thread(
+        share_manager.create_share_link,
         user_id=user_id,
         file_path=str(file_path),
         filename=file_name,
@@ -2882,7 +3008,7 @@ async def callback_format_code(callback: types.CallbackQuery):
     
     await callback.answer("⏳ Formatting code...", show_alert=False)
     
-    result = code_formatter.auto_format(str(file_path))
+    result = await code_formatter.auto_format_async(str(file_path))
     
     if result['formatted']:
         text = f"""
@@ -2917,6 +3043,86 @@ Your code has been automatically formatted with professional standards!
     
     await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
 
+def format_summary_text(summary):
+    text = f"""
+╔═══════════════════════╗
+    ✨ <b>BULK FORMAT</b> ✨
+╚═══════════════════════╝
+
+📊 <b>Files:</b> {summary['total']}
+✅ <b>Formatted:</b> {summary['formatted']}
+💤 <b>Already Clean:</b> {summary['unchanged']}
+❌ <b>Failed:</b> {summary['failed']}
+
+"""
+    
+    if summary['total'] == 0:
+        text += "<i>No .py, .js, .json, .html or .css files found</i>\n"
+    
+    for result in summary['files'][:25]:
+        if not result['success']:
+            icon = "❌"
+        elif result.get('changed') is False:
+            icon = "💤"
+        else:
+            icon = "✅"
+        text += f"{icon} <code>{html.escape(result['file_name'])}</code>\n"
+        if not result['success']:
+            # Black/Prettier errors: cut first, then escape, so no tag or entity is left half-open
+            text += f"    <i>{html.escape(result['message'][:80])}</i>\n"
+    
+    if summary['total'] > 25:
+        text += f"\n<i>... and {summary['total'] - 25} more files</i>\n"
+    
+    return text
+
+@dp.callback_query(F.data == "format_all")
+async def callback_format_all(callback: types.CallbackQuery):
+    user_id = callback.from_user.id
+    
+    if not await is_admin_user(user_id, callback):
+        return
+    
+    await callback.answer("⏳ Formatting all files...", show_alert=False)
+    
+    try:
+        summary = await code_formatter.format_directory_async(str(UPLOAD_BOTS_DIR / str(user_id)))
+        
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="📁 My Files", callback_data="check_files"),
+             InlineKeyboardButton(text="🏠 Home", callback_data="back_to_main")]
+        ])
+        
+        await callback.message.edit_text(format_summary_text(summary), reply_markup=keyboard, parse_mode="HTML")
+    
+    except Exception as e:
+        logger.error(f"Bulk format error: {e}")
+        await callback.message.answer(f"❌ Error: {str(e)}")
+
+@dp.message(Command("formatall"))
+async def cmd_format_all(message: types.Message):
+    user_id = message.from_user.id
+    
+    if user_id not in admin_ids:
+        await message.answer("🔒 <b>Admin Only Command</b>\n\n<i>💫 MADE BY DARK SHADOW 💫</i>", parse_mode="HTML")
+        return
+    
+    status_msg = await message.answer("⏳ <b>Formatting all files...</b>", parse_mode="HTML")
+    
+    try:
+        summary = await code_formatter.format_directory_async(str(UPLOAD_BOTS_DIR / str(user_id)))
+        
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="📁 My Files", callback_data="check_files"),
+             InlineKeyboardButton(text="🏠 Home", callback_data="back_to_main")]
+        ])
+        
+        await status_msg.edit_text(format_summary_text(summary), reply_markup=keyboard, parse_mode="HTML")
+    
+    except Exception as e:
+        logger.error(f"Bulk format error: {e}")
+        await status_msg.edit_text(f"❌ Error: {str(e)}")
+
 @dp.message(Command("search"))
 async def cmd_advanced_search(message: types.Message):
     user_id = message.from_user.id
@@ -2939,6 +3145,42 @@ async def cmd_advanced_search(message: types.Message):
             return
         
         searcher = create_search_instance(str(user_folder))
+        
+        symbol_query = searcher.parse_symbol_query(query)
+        if symbol_query:
+            kind, name = symbol_query
+            results = await asyncio.to_thread(searcher.search_symbols, kind, name, 10)
+            
+            if results['total_results'] == 0:
+                await message.answer(f"❌ No symbols found for: <code>{query}</code>", parse_mode="HTML")
+                return
+            
+            kind_label = {'def': '🏷️ Definitions', 'import': '📦 Imports', 'call': '📞 Call Sites'}[kind]
+            text = f"""
+╔═══════════════════════╗
+    🔍 <b>SYMBOL SEARCH</b> 🔍
+╚═══════════════════════╝
+
+🔎 <b>Query:</b> <code>{query}</code>
+📊 <b>Files:</b> {results['total_results']}
+
+<b>{kind_label}:</b>
+"""
+            for match in results['symbol_matches']:
+                text += f"  • <code>{match['file_name']}</code>\n"
+                for symbol in match['matches']:
+                    text += f"    L{symbol['line_number']}: <code>{symbol['detail'] if kind == 'import' else symbol['name']}</code>\n"
+            
+            text += "\n<i>💡 Tip: Use def:, import: or call: prefixes for symbol search!</i>"
+            
+            keyboard = InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text="📁 My Files", callback_data="check_files"),
+                 InlineKeyboardButton(text="🏠 Home", callback_data="back_to_main")]
+            ])
+            
+            await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+            return
+        
         results = searcher.smart_search(query, limit=10)
         
         if results['total_results'] == 0:
@@ -2990,7 +3232,7 @@ async def cmd_my_shares(message: types.Message):
         await message.answer("🔒 <b>Admin Only Command</b>\n\n<i>💫 MADE BY DARK SHADOW 💫</i>", parse_mode="HTML")
         return
     
-    shares = share_manager.get_user_shares(user_id)
+    shares = await asyncio.to_thread(share_manager.get_user_shares, user_id)
     
     if not shares:
         text = """
@@ -3021,10 +3263,12 @@ No active share links found.
     
     for share in shares[:10]:
         status = "🔴 Expired" if share['is_expired'] else "🟢 Active"
+        traffic = share_limiter.get_stats(share['file_id'])
         text += f"""
 📄 <b>{share['filename']}</b>
    {status} • {share['hours_left']}h left
    📥 Downloads: {share['downloads']}
+   📶 Sent: {traffic['bytes_sent'] / (1024 * 1024):.2f} MB • ⛔ Throttled: {traffic['throttled']}
    🆔 ID: <code>{share['file_id']}</code>
 
 """
@@ -3076,6 +3320,8 @@ async def main():
     asyncio.create_task(web_server())
     asyncio.create_task(schedule_auto_backup())
     asyncio.create_task(cleanup_old_scripts())
+    asyncio.create_task(share_sweeper())
+    code_formatter.warm_up()
     asyncio.create_task(keep_alive())  # Keep service alive
     
     await dp.start_polling(bot)
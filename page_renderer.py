@@ -0,0 +1,307 @@
+import gzip
+import hashlib
+import logging
+import os
+import sys
+import threading
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+from aiohttp import web
+import jinja2
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = Path(__file__).parent / 'dashboard'
+TEMPLATES_DIR = ASSETS_DIR / 'templates'
+STATIC_DIR = ASSETS_DIR / 'static'
+# sha256sum-format pins for VENDOR_ASSETS, written by `python page_renderer.py --lock`
+VENDOR_LOCK = ASSETS_DIR / 'vendor.sha256'
+VENDOR_CDN_FALLBACK = os.getenv('VENDOR_CDN_FALLBACK', 'true').lower() == 'true'
+TEMPLATE_CACHE_DIR = Path(os.getenv('TEMPLATE_CACHE_DIR', ASSETS_DIR / '.template_cache'))
+TEMPLATE_AUTO_RELOAD = os.getenv('TEMPLATE_AUTO_RELOAD', 'false').lower() == 'true'
+COMPRESS_MIN_SIZE = 512
+# Static pages and assets are compressed once at max levels; per-user pages are
+# compressed on every request, so they get cheap levels
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+DYNAMIC_GZIP_LEVEL = int(os.getenv('DYNAMIC_GZIP_LEVEL', '6'))
+DYNAMIC_BROTLI_QUALITY = int(os.getenv('DYNAMIC_BROTLI_QUALITY', '5'))
+IMMUTABLE_MAX_AGE = 31536000
+FINGERPRINT_LENGTH = 10
+CODEMIRROR_CDN = 'https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.2'
+STATIC_TYPES = {
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+    '.html': 'text/html'
+}
+VENDOR_ASSETS = {
+    'codemirror-5.65.2.min.css': f'{CODEMIRROR_CDN}/codemirror.min.css',
+    'codemirror-5.65.2-monokai.min.css': f'{CODEMIRROR_CDN}/theme/monokai.min.css',
+    'codemirror-5.65.2.min.js': f'{CODEMIRROR_CDN}/codemirror.min.js',
+    'codemirror-5.65.2-python.min.js': f'{CODEMIRROR_CDN}/mode/python/python.min.js',
+    'codemirror-5.65.2-javascript.min.js': f'{CODEMIRROR_CDN}/mode/javascript/javascript.min.js'
+}
+
+TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+jinja_env = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(str(TEMPLATES_DIR)),
+    bytecode_cache=jinja2.FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR)),
+    autoescape=jinja2.select_autoescape(['html']),
+    auto_reload=TEMPLATE_AUTO_RELOAD
+)
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def compress(body: bytes, encoding: str, dynamic: bool = False) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=DYNAMIC_BROTLI_QUALITY if dynamic else STATIC_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=DYNAMIC_GZIP_LEVEL if dynamic else STATIC_GZIP_LEVEL, mtime=0)
+
+class VendorAssetError(Exception):
+    pass
+
+def encode_variants(body: bytes) -> Dict[str, bytes]:
+    variants = {'identity': body}
+    if len(body) < COMPRESS_MIN_SIZE:
+        return variants
+    
+    for encoding in ENCODINGS:
+        variants[encoding] = compress(body, encoding)
+    return variants
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def etag_matches(request, etag: str) -> bool:
+    if_none_match = [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]
+    return etag in if_none_match or '*' in if_none_match
+
+def negotiate_encoding(request, variants) -> str:
+    accepted = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    
+    for encoding in ('br', 'gzip'):
+        if encoding in variants and (encoding in accepted or '*' in accepted):
+            return encoding
+    return 'identity'
+
+def compressed_response(request, entry: Dict, content_type: str, cache_control: str = 'no-cache'):
+    headers = {
+        'ETag': entry['etag'],
+        'Cache-Control': cache_control,
+        'Vary': 'Accept-Encoding'
+    }
+    
+    if etag_matches(request, entry['etag']):
+        return web.Response(status=304, headers=headers)
+    
+    encoding = negotiate_encoding(request, entry['variants'])
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    
+    return web.Response(
+        body=entry['variants'][encoding],
+        content_type=content_type,
+        charset='utf-8',
+        headers=headers
+    )
+
+class PageRenderer:
+    def __init__(self, env: jinja2.Environment = jinja_env, static_dir: Path = STATIC_DIR):
+        self.env = env
+        self.static_dir = static_dir
+        self.stats = {'rendered': 0, 'not_modified': 0}
+        self.static_pages = {}
+        self.assets = None
+        self.fingerprinted = {}
+        self.lock = threading.Lock()
+        self.env.globals['static_url'] = self.static_url
+    
+    def render(self, request, template_name: str, **context):
+        """Per-user page: not cached, only the negotiated encoding is built, at a cheap level"""
+        body = self.env.get_template(template_name).render(**context).encode('utf-8')
+        entry = {'etag': body_etag(body), 'variants': {'identity': body}}
+        self.stats['rendered'] += 1
+        
+        if etag_matches(request, entry['etag']):
+            self.stats['not_modified'] += 1
+        elif len(body) >= COMPRESS_MIN_SIZE:
+            encoding = negotiate_encoding(request, ENCODINGS)
+            if encoding != 'identity':
+                entry['variants'][encoding] = compress(body, encoding, dynamic=True)
+        
+        return compressed_response(request, entry, 'text/html')
+    
+    def render_static(self, request, template_name: str):
+        """Serve a template without context, rendered and compressed only once"""
+        entry = self.static_pages.get(template_name)
+        if entry is None:
+            body = self.env.get_template(template_name).render().encode('utf-8')
+            entry = {'etag': body_etag(body), 'variants': encode_variants(body)}
+            with self.lock:
+                self.static_pages[template_name] = entry
+        return compressed_response(request, entry, 'text/html')
+    
+    def _load_asset(self, path: Path) -> Dict:
+        body = path.read_bytes()
+        etag = body_etag(body)
+        variants = encode_variants(body)
+        
+        # Prebuilt siblings (e.g. app.js.br) win over what we can compress here
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            prebuilt = path.with_name(path.name + suffix)
+            if prebuilt.is_file():
+                variants[encoding] = prebuilt.read_bytes()
+        
+        stem = path.name[:-len(path.suffix)]
+        return {
+            'name': path.name,
+            'fingerprinted': f"{stem}.{etag[1:FINGERPRINT_LENGTH + 1]}{path.suffix}",
+            'etag': etag,
+            'variants': variants,
+            'content_type': STATIC_TYPES[path.suffix]
+        }
+    
+    def load_assets(self) -> Dict:
+        with self.lock:
+            if self.assets is not None:
+                return self.assets
+            
+            assets = {}
+            for path in sorted(self.static_dir.iterdir()):
+                if path.is_file() and path.suffix in STATIC_TYPES:
+                    assets[path.name] = self._load_asset(path)
+            
+            self.fingerprinted = {entry['fingerprinted']: entry for entry in assets.values()}
+            self.assets = assets
+            
+            # Loading CodeMirror from cdnjs is the default; it is only an error when that is switched off
+            missing = sorted(name for name in VENDOR_ASSETS if name not in assets)
+            if missing and not VENDOR_CDN_FALLBACK:
+                logger.error(f"VENDOR_CDN_FALLBACK is off but {self.static_dir} lacks {', '.join(missing)}: "
+                             f"the code editor will not load; vendor them with `python page_renderer.py`")
+            return assets
+    
+    def reload_assets(self) -> Dict:
+        with self.lock:
+            self.assets = None
+            self.static_pages = {}
+        return self.load_assets()
+    
+    def static_url(self, filename: str) -> str:
+        entry = self.load_assets().get(filename)
+        if entry is not None:
+            return f"/static/{entry['fingerprinted']}"
+        if filename in VENDOR_ASSETS and VENDOR_CDN_FALLBACK:
+            return VENDOR_ASSETS[filename]
+        return f"/static/{filename}"
+    
+    async def handle_static(self, request):
+        filename = request.match_info.get('filename', '')
+        assets = self.load_assets()
+        
+        entry = self.fingerprinted.get(filename)
+        if entry is not None:
+            cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            entry = assets.get(filename)
+            cache_control = 'no-cache'
+        
+        if entry is None:
+            return web.Response(text="Not found", status=404)
+        
+        return compressed_response(request, entry, entry['content_type'], cache_control)
+    
+    def get_stats(self) -> Dict:
+        assets = self.load_assets()
+        return {
+            'static_pages': len(self.static_pages),
+            'static_assets': len(assets),
+            'vendored': sorted(name for name in VENDOR_ASSETS if name in assets),
+            'vendor_missing': sorted(name for name in VENDOR_ASSETS if name not in assets),
+            'brotli': brotli is not None,
+            **self.stats
+        }
+
+def load_vendor_pins(lock_path: Path = VENDOR_LOCK) -> Dict[str, str]:
+    pins = {}
+    if lock_path.exists():
+        for line in lock_path.read_text(encoding='utf-8').splitlines():
+            digest, _, filename = line.strip().partition('  ')
+            if digest and filename:
+                pins[filename] = digest.lower()
+    return pins
+
+def _download(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return response.read()
+
+def _write_asset(target: Path, body: bytes):
+    tmp_path = target.with_name(target.name + '.tmp')
+    tmp_path.write_bytes(body)
+    os.replace(tmp_path, target)
+
+def vendor_assets(static_dir: Path = STATIC_DIR, force: bool = False, lock_path: Path = VENDOR_LOCK) -> List[str]:
+    """Download third-party assets into the static folder so the panels work offline
+    
+    Every asset must match its sha256 pin in VENDOR_LOCK; nothing unpinned or altered is written.
+    """
+    pins = load_vendor_pins(lock_path)
+    unpinned = [name for name in VENDOR_ASSETS if name not in pins]
+    if unpinned:
+        raise VendorAssetError(f"No pinned sha256 in {lock_path} for: {', '.join(unpinned)}. "
+                               f"Run `python page_renderer.py --lock` on a trusted network and commit the file")
+    
+    fetched = []
+    for filename, url in VENDOR_ASSETS.items():
+        target = static_dir / filename
+        if target.exists() and not force and hashlib.sha256(target.read_bytes()).hexdigest() == pins[filename]:
+            continue
+        
+        body = _download(url)
+        digest = hashlib.sha256(body).hexdigest()
+        if digest != pins[filename]:
+            raise VendorAssetError(f"sha256 mismatch for {filename} from {url}: got {digest}, pinned {pins[filename]}")
+        
+        _write_asset(target, body)
+        fetched.append(filename)
+    
+    return fetched
+
+def lock_vendor_assets(static_dir: Path = STATIC_DIR, lock_path: Path = VENDOR_LOCK) -> Dict[str, str]:
+    """Download every vendor asset and record its sha256 as the new pin (review the diff before committing)"""
+    pins = {}
+    for filename, url in VENDOR_ASSETS.items():
+        body = _download(url)
+        pins[filename] = hashlib.sha256(body).hexdigest()
+        _write_asset(static_dir / filename, body)
+    
+    lock_path.write_text(''.join(f"{digest}  {filename}\n" for filename, digest in pins.items()), encoding='utf-8')
+    return pins
+
+page_renderer = PageRenderer()
+
+if __name__ == '__main__':
+    try:
+        if '--lock' in sys.argv:
+            for name, digest in lock_vendor_assets().items():
+                print(f"🔒 {digest}  {name}")
+            print(f"📌 Pins written to {VENDOR_LOCK}")
+        else:
+            for name in vendor_assets(force='--force' in sys.argv):
+                print(f"✅ {name}")
+            print(f"📦 Vendored assets are in {STATIC_DIR}")
+    except (VendorAssetError, OSError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
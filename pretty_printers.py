@@ -0,0 +1,466 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+from typing import Optional, List, Tuple
+from js_tokenizer import tokenize_js
+
+INDENT = '  '
+JSON_CHUNK_SIZE = 64 * 1024
+PRETTIER_TIMEOUT = float(os.getenv('PRETTIER_TIMEOUT', '10'))
+
+JS_OPENERS = {'(': ')', '[': ']', '{': '}'}
+JS_CLOSERS = set(JS_OPENERS.values())
+
+HTML_VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr'
+}
+HTML_RAW_TAGS = ('script', 'style', 'pre', 'textarea')
+
+HTML_TOKEN_REGEX = re.compile(
+    r'<!--.*?-->'
+    rf"|<(?P<raw>{'|'.join(HTML_RAW_TAGS)})\b[^>]*>.*?</(?P=raw)\s*>"
+    r'|<!?/?(?P<name>[a-zA-Z][\w:.-]*)(?:"[^"]*"|\'[^\']*\'|[^\'">])*>',
+    re.DOTALL | re.IGNORECASE
+)
+
+JSON_TOKEN_REGEX = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\],:]|[^\s{}\[\],:"]+|\s+|"(?:[^"\\]|\\.)*\\?$', re.DOTALL)
+JSON_LITERAL_REGEX = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null')
+
+def _finish(lines: List[str]) -> str:
+    output = []
+    blank_run = 0
+    for line in lines:
+        if line.strip():
+            blank_run = 0
+            output.append(line)
+        else:
+            blank_run += 1
+            if blank_run <= 2:
+                output.append('')
+    
+    return '\n'.join(output).strip('\n') + '\n'
+
+def format_js_source(source: str) -> str:
+    source = source.replace('\r\n', '\n')
+    
+    # Brackets per line from the shared tokenizer, so ones inside strings,
+    # comments and regex literals never count
+    brackets = {}
+    verbatim = set()
+    for kind, value, line in tokenize_js(source):
+        if kind == 'punct' and (value in JS_OPENERS or value in JS_CLOSERS):
+            brackets.setdefault(line, []).append(value)
+        elif kind in ('comment', 'string') and '\n' in value:
+            # Lines that start inside a block comment or template literal are kept as-is
+            verbatim.update(range(line + 1, line + value.count('\n') + 1))
+    
+    stack = []
+    lines = []
+    
+    for number, raw_line in enumerate(source.split('\n'), 1):
+        if number in verbatim:
+            lines.append(raw_line)
+            indent = None
+        else:
+            stripped = raw_line.strip()
+            
+            leading = 0
+            while leading < len(stripped) and stripped[leading] in JS_CLOSERS:
+                leading += 1
+            
+            if leading and len(stack) >= leading:
+                indent = stack[-leading]
+            elif leading and stack:
+                indent = stack[0]
+            else:
+                indent = stack[-1] + 1 if stack else 0
+            
+            lines.append(INDENT * indent + stripped if stripped else '')
+        
+        for ch in brackets.get(number, ()):
+            if ch in JS_OPENERS:
+                stack.append(indent if indent is not None else (stack[-1] + 1 if stack else 0))
+            elif stack:
+                stack.pop()
+    
+    return _finish(lines)
+
+def _split_css(source: str) -> List[Tuple[str, str]]:
+    tokens = []
+    text = []
+    i = 0
+    paren_depth = 0
+    
+    def flush():
+        if text:
+            tokens.append(('text', ''.join(text)))
+            text.clear()
+    
+    while i < len(source):
+        ch = source[i]
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = len(source) if end == -1 else end + 2
+            flush()
+            tokens.append(('comment', source[i:end]))
+            i = end
+            continue
+        if ch in ('"', "'"):
+            j = i + 1
+            while j < len(source) and source[j] != ch:
+                j += 2 if source[j] == '\\' else 1
+            text.append(source[i:j + 1])
+            i = j + 1
+            continue
+        if ch == '(':
+            paren_depth += 1
+        elif ch == ')':
+            paren_depth = max(paren_depth - 1, 0)
+        if paren_depth == 0 and ch in '{};':
+            flush()
+            tokens.append((ch, ch))
+        else:
+            text.append(ch)
+        i += 1
+    
+    flush()
+    return tokens
+
+def _collapse_css(text: str) -> str:
+    parts = re.split(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')', text)
+    return ''.join(part if i % 2 else re.sub(r'\s+', ' ', part) for i, part in enumerate(parts)).strip()
+
+def format_css_source(source: str) -> str:
+    lines = []
+    depth = 0
+    buffer = ''
+    
+    def emit_declaration(text):
+        declaration = _collapse_css(text)
+        if not declaration:
+            return
+        if not declaration.startswith('@') and ':' in declaration:
+            prop, value = declaration.split(':', 1)
+            declaration = f"{prop.strip()}: {value.strip()}"
+        lines.append(f"{INDENT * depth}{declaration};")
+    
+    for kind, value in _split_css(source):
+        if kind == 'comment':
+            if buffer.strip():
+                buffer += value
+            else:
+                lines.append(INDENT * depth + value.strip())
+        elif kind == '{':
+            selectors = [_collapse_css(s) for s in buffer.split(',')] if not buffer.strip().startswith('@') else [_collapse_css(buffer)]
+            lines.append(f",\n{INDENT * depth}".join(INDENT * depth + s if n == 0 else s for n, s in enumerate(selectors)) + ' {')
+            depth += 1
+            buffer = ''
+        elif kind == ';':
+            emit_declaration(buffer)
+            buffer = ''
+        elif kind == '}':
+            emit_declaration(buffer)
+            buffer = ''
+            depth = max(depth - 1, 0)
+            lines.append(INDENT * depth + '}')
+            if depth == 0:
+                lines.append('')
+        else:
+            buffer += value
+    
+    if buffer.strip():
+        lines.append(INDENT * depth + _collapse_css(buffer))
+    
+    return _finish(lines)
+
+def format_html_source(source: str) -> str:
+    source = source.replace('\r\n', '\n')
+    raw_lines = source.split('\n')
+    
+    spans = []
+    for match in HTML_TOKEN_REGEX.finditer(source):
+        text = match.group()
+        start, end = match.span()
+        if text.startswith('<!--'):
+            spans.append((start, end, 'verbatim', None))
+        elif match.group('raw'):
+            open_end = source.find('>', start) + 1
+            close_start = source.rfind('</', start, end)
+            body_end = close_start
+            while body_end > open_end and source[body_end - 1] in ' \t':
+                body_end -= 1
+            spans.append((start, open_end, 'tag', None))
+            spans.append((open_end, body_end, 'verbatim', None))
+            spans.append((close_start, end, 'tag', None))
+        elif text.startswith('<!') or text.endswith('/>') or match.group('name').lower() in HTML_VOID_TAGS:
+            spans.append((start, end, 'tag', None))
+        elif text.startswith('</'):
+            spans.append((start, end, 'close', match.group('name').lower()))
+        else:
+            spans.append((start, end, 'open', match.group('name').lower()))
+    
+    def apply(stack, span):
+        _, _, kind, name = span
+        if kind == 'open':
+            stack.append(name)
+        elif kind == 'close' and name in stack:
+            while stack and stack.pop() != name:
+                pass
+    
+    stack = []
+    lines = []
+    index = 0
+    start = 0
+    
+    for raw_line in raw_lines:
+        while index < len(spans) and spans[index][1] <= start:
+            apply(stack, spans[index])
+            index += 1
+        
+        stripped = raw_line.strip()
+        
+        if index < len(spans) and spans[index][0] < start:
+            if spans[index][2] == 'verbatim':
+                lines.append(raw_line)
+            else:
+                lines.append(INDENT * (len(stack) + 1) + stripped)
+        else:
+            preview = list(stack)
+            position = start + len(raw_line) - len(raw_line.lstrip())
+            for span in spans[index:]:
+                if span[0] != position or span[2] != 'close':
+                    break
+                apply(preview, span)
+                position = span[1]
+                while position < start + len(raw_line) and source[position] in ' \t':
+                    position += 1
+            
+            lines.append(INDENT * len(preview) + stripped if stripped else '')
+        
+        start += len(raw_line) + 1
+    
+    return _finish(lines)
+
+class JsonStreamFormatter:
+    """Validating, incremental JSON pretty-printer
+    
+    Fed text in any chunking, it checks the grammar (separators and what may
+    follow what) and re-indents. Strings and numbers keep their spelling, so
+    the in-memory and streaming paths print the same bytes.
+    """
+    
+    def __init__(self, indent: int = 2):
+        self.pad = ' ' * indent
+        self.stack = []
+        self.expect = 'value'
+        self.pending_open = False
+        self.carry = ''
+        self.out = []
+    
+    def _fail(self, token: str):
+        raise ValueError(f"Unexpected {token[:20]!r}" if token else 'Unexpected end of JSON document')
+    
+    def _newline_after_open(self):
+        if self.pending_open:
+            self.out.append('\n' + self.pad * len(self.stack))
+            self.pending_open = False
+    
+    def _after_value(self):
+        self.expect = 'comma_or_close' if self.stack else 'end'
+    
+    def _token(self, token: str):
+        expect = self.expect
+        
+        if token in ('}', ']'):
+            top = self.stack[-1] if self.stack else None
+            closes_empty = self.pending_open and expect in ('key_or_close', 'value_or_close')
+            if top is None or JS_OPENERS[top] != token or not (expect == 'comma_or_close' or closes_empty):
+                self._fail(token)
+            self.stack.pop()
+            self.out.append(token if self.pending_open else '\n' + self.pad * len(self.stack) + token)
+            self.pending_open = False
+            self._after_value()
+        elif token == ',':
+            if expect != 'comma_or_close':
+                self._fail(token)
+            self.expect = 'key' if self.stack[-1] == '{' else 'value'
+            self.out.append(',\n' + self.pad * len(self.stack))
+        elif token == ':':
+            if expect != 'colon':
+                self._fail(token)
+            self.expect = 'value'
+            self.out.append(': ')
+        elif token.startswith('"'):
+            try:
+                json.loads(token)
+            except ValueError:
+                raise ValueError(f"Invalid string: {token[:20]}")
+            if expect in ('key', 'key_or_close'):
+                self.expect = 'colon'
+            elif expect in ('value', 'value_or_close'):
+                self._after_value()
+            else:
+                self._fail(token)
+            self._newline_after_open()
+            self.out.append(token)
+        elif token in ('{', '['):
+            if expect not in ('value', 'value_or_close'):
+                self._fail(token)
+            self._newline_after_open()
+            self.stack.append(token)
+            self.expect = 'key_or_close' if token == '{' else 'value_or_close'
+            self.out.append(token)
+            self.pending_open = True
+        else:
+            if not JSON_LITERAL_REGEX.fullmatch(token):
+                raise ValueError(f"Invalid literal: {token[:20]}")
+            if expect not in ('value', 'value_or_close'):
+                self._fail(token)
+            self._newline_after_open()
+            self.out.append(token)
+            self._after_value()
+    
+    def feed(self, chunk: str) -> str:
+        buffer = self.carry + chunk
+        self.carry = ''
+        
+        tokens = list(JSON_TOKEN_REGEX.finditer(buffer))
+        # The last token may continue in the next chunk
+        if chunk and tokens and tokens[-1].end() == len(buffer) and tokens[-1].group() not in '{}[],:':
+            self.carry = tokens.pop().group()
+        
+        for match in tokens:
+            token = match.group()
+            if not token.isspace():
+                self._token(token)
+            elif token.strip(' \t\n\r'):
+                raise ValueError('Invalid whitespace')
+        
+        output = ''.join(self.out)
+        self.out.clear()
+        return output
+    
+    def close(self) -> str:
+        output = self.feed('')
+        if self.expect != 'end':
+            self._fail('')
+        return output + '\n'
+
+def format_json_source(source: str, indent: int = 2) -> str:
+    formatter = JsonStreamFormatter(indent)
+    return formatter.feed(source) + formatter.close()
+
+def stream_format_json(src_path: str, dst_path: str, indent: int = 2):
+    formatter = JsonStreamFormatter(indent)
+    with open(src_path, 'r', encoding='utf-8') as src, open(dst_path, 'w', encoding='utf-8') as dst:
+        while True:
+            chunk = src.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                break
+            dst.write(formatter.feed(chunk))
+        dst.write(formatter.close())
+
+class PrettierWorker:
+    SCRIPT = r"""
+const readline = require('readline');
+let prettier;
+try { prettier = require('prettier'); } catch (e) {
+  process.stdout.write(JSON.stringify({ ready: false, error: String(e) }) + '\n');
+  process.exit(0);
+}
+process.stdout.write(JSON.stringify({ ready: true, version: prettier.version }) + '\n');
+const rl = readline.createInterface({ input: process.stdin });
+rl.on('line', async (line) => {
+  const req = JSON.parse(line);
+  try {
+    const formatted = await prettier.format(req.source, { parser: req.parser });
+    process.stdout.write(JSON.stringify({ formatted }) + '\n');
+  } catch (e) {
+    process.stdout.write(JSON.stringify({ error: String(e.message || e) }) + '\n');
+  }
+});
+"""
+    
+    def __init__(self):
+        self.process = None
+        self.available = None
+        self.version = None
+        self.lock = threading.Lock()
+    
+    def _start(self) -> bool:
+        node = shutil.which('node')
+        if not node or os.getenv('PRETTIER_DISABLED'):
+            return False
+        
+        try:
+            self.process = subprocess.Popen(
+                [node, '-e', self.SCRIPT],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8'
+            )
+            status = json.loads(self._readline() or '{}')
+        except (OSError, ValueError):
+            status = {}
+        
+        if not status.get('ready'):
+            self.stop()
+            return False
+        self.version = status.get('version')
+        return True
+    
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+    
+    def _readline(self) -> str:
+        """One reply line; a worker silent for PRETTIER_TIMEOUT is killed so the next call restarts it"""
+        stdout = self.process.stdout
+        line = []
+        reader = threading.Thread(target=lambda: line.append(stdout.readline()), daemon=True)
+        reader.start()
+        reader.join(PRETTIER_TIMEOUT)
+        if reader.is_alive():
+            self.stop()
+            raise TimeoutError(f"Prettier did not answer within {PRETTIER_TIMEOUT:g}s")
+        return line[0] if line else ''
+    
+    def get_version(self) -> Optional[str]:
+        """Prettier's version, or None when formatting falls back to the built-in printers"""
+        with self.lock:
+            if self.available is None:
+                self.available = self._start()
+            return self.version if self.available else None
+    
+    def format(self, source: str, parser: str) -> Optional[str]:
+        with self.lock:
+            if self.available is None:
+                self.available = self._start()
+            if not self.available:
+                return None
+            if self.process is None or self.process.poll() is not None:
+                if not self._start():
+                    self.available = False
+                    return None
+            
+            try:
+                self.process.stdin.write(json.dumps({'source': source, 'parser': parser}) + '\n')
+                self.process.stdin.flush()
+                reply = json.loads(self._readline() or '{}')
+            except (OSError, ValueError):
+                self.stop()
+                return None
+        
+        if 'error' in reply:
+            raise ValueError(reply['error'])
+        return reply.get('formatted')
+
+prettier_worker = PrettierWorker()
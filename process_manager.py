@@ -0,0 +1,335 @@
+import asyncio
+import logging
+import time
+import os
+import secrets
+import signal
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+import psutil
+
+logger = logging.getLogger(__name__)
+
+MAX_RUNNING_PROCESSES = int(os.getenv('MAX_RUNNING_PROCESSES', '20'))
+MAX_PROCESSES_PER_USER = int(os.getenv('MAX_PROCESSES_PER_USER', '5'))
+MAX_JOB_OUTPUT = 1024 * 1024
+JOB_RETENTION = 600
+JOB_READ_SIZE = 4096
+# Spawn kwargs that put a child in its own session, so kill_process_group reaches its grandchildren
+NEW_SESSION = {} if sys.platform == 'win32' else {'start_new_session': True}
+
+class ProcessLimitError(Exception):
+    pass
+
+def terminate_process_tree(pid):
+    try:
+        parent = psutil.Process(pid)
+        children = parent.children(recursive=True)
+        
+        for child in children:
+            try:
+                child.terminate()
+            except psutil.NoSuchProcess:
+                pass
+        
+        try:
+            parent.terminate()
+        except psutil.NoSuchProcess:
+            pass
+        
+        gone, alive = psutil.wait_procs(children + [parent], timeout=3)
+        
+        for p in alive:
+            try:
+                p.kill()
+            except psutil.NoSuchProcess:
+                pass
+    except psutil.NoSuchProcess:
+        logger.warning(f"Process {pid} already terminated")
+    except Exception as e:
+        logger.error(f"Error terminating process tree: {e}")
+
+def kill_process_group(pid: int):
+    """SIGKILL the session started for `pid` with NEW_SESSION (the process tree on Windows)"""
+    if sys.platform != 'win32':
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        return
+    
+    try:
+        parent = psutil.Process(pid)
+        procs = parent.children(recursive=True) + [parent]
+    except psutil.NoSuchProcess:
+        return
+    for proc in procs:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+def _returncode(process) -> Optional[int]:
+    if hasattr(process, 'poll'):
+        return process.poll()
+    return process.returncode
+
+class ProcessManager:
+    def __init__(self, max_total: int = MAX_RUNNING_PROCESSES, max_per_user: int = MAX_PROCESSES_PER_USER):
+        self.max_total = max_total
+        self.max_per_user = max_per_user
+        self.processes = {}
+        self.reserved = {}
+        self.lock = threading.Lock()
+        self.stats = {'started': 0, 'rejected': 0, 'timed_out': 0}
+        self.jobs = {}
+        self.listeners = []
+    
+    def _notify(self, event: str, key: str, info: Dict):
+        for listener in self.listeners:
+            try:
+                listener(event, key, info)
+            except Exception as e:
+                logger.error(f"Process listener failed: {e}")
+    
+    @staticmethod
+    def new_key(source: str) -> str:
+        return f"{source}-{secrets.token_hex(4)}"
+    
+    @staticmethod
+    def owner_id(user_id):
+        return int(user_id) if str(user_id).isdigit() else user_id
+    
+    def _count_for(self, owner_id) -> int:
+        running = sum(1 for info in self.processes.values() if info['script_owner_id'] == owner_id)
+        return running + sum(1 for owner in self.reserved.values() if owner == owner_id)
+    
+    def reserve(self, key: str, owner_id):
+        """Check the limits and hold a slot for `key` until register() or release()
+        
+        Both happen under one lock, so concurrent starts cannot all pass the check
+        while their processes are still being spawned.
+        """
+        with self.lock:
+            if key in self.processes or key in self.reserved:
+                self.stats['rejected'] += 1
+                raise ProcessLimitError("Already running")
+            self._check_limits(owner_id)
+            self.reserved[key] = owner_id
+    
+    def release(self, key: str):
+        """Drop a reservation that never got registered (no-op after register())"""
+        with self.lock:
+            self.reserved.pop(key, None)
+    
+    def _check_limits(self, owner_id):
+        if len(self.processes) + len(self.reserved) >= self.max_total:
+            self.stats['rejected'] += 1
+            raise ProcessLimitError(f"Server is busy ({self.max_total} processes running), try again later")
+        if self._count_for(owner_id) >= self.max_per_user:
+            self.stats['rejected'] += 1
+            raise ProcessLimitError(f"You already have {self.max_per_user} processes running")
+    
+    def register(self, key: str, process, source: str, owner_id, file_name: str,
+                 timeout: Optional[float] = None, **extra) -> Dict:
+        info = {
+            'process': process,
+            'file_name': file_name,
+            'script_owner_id': owner_id,
+            'start_time': datetime.now(),
+            'source': source,
+            'timeout': timeout,
+            **extra
+        }
+        
+        with self.lock:
+            self.reserved.pop(key, None)
+            self.processes[key] = info
+            self.stats['started'] += 1
+        
+        self._notify('started', key, info)
+        return info
+    
+    def unregister(self, key: str) -> Optional[Dict]:
+        with self.lock:
+            info = self.processes.pop(key, None)
+        
+        if info is not None:
+            log_file = info.get('log_file')
+            if log_file and not log_file.closed:
+                log_file.close()
+            self._notify('exited', key, info)
+        
+        return info
+    
+    def get(self, key: str) -> Optional[Dict]:
+        with self.lock:
+            return self.processes.get(key)
+    
+    def list(self, source: Optional[str] = None) -> List:
+        with self.lock:
+            return [(key, info) for key, info in self.processes.items() if source is None or info['source'] == source]
+    
+    def count(self, owner_id=None) -> int:
+        with self.lock:
+            if owner_id is None:
+                return len(self.processes)
+            return self._count_for(owner_id)
+    
+    def stop(self, key: str, reason: Optional[str] = None) -> bool:
+        info = self.get(key)
+        if info is None:
+            return False
+        
+        log_file = info.get('log_file')
+        if reason and log_file and not log_file.closed:
+            log_file.write(f"\n\n[SYSTEM] {reason}\n")
+        
+        if _returncode(info['process']) is None:
+            terminate_process_tree(info['process'].pid)
+        
+        self.unregister(key)
+        return True
+    
+    def cleanup(self) -> Dict:
+        reaped = 0
+        timed_out = 0
+        
+        for key, info in self.list():
+            if _returncode(info['process']) is not None:
+                self.unregister(key)
+                reaped += 1
+                continue
+            
+            runtime = (datetime.now() - info['start_time']).total_seconds()
+            if info['timeout'] and runtime > info['timeout']:
+                logger.warning(f"Terminating long-running process: {key}")
+                self.stop(key, f"Process auto-terminated after {runtime:.0f}s")
+                timed_out += 1
+        
+        with self.lock:
+            self.stats['timed_out'] += timed_out
+        
+        return {'reaped': reaped, 'timed_out': timed_out}
+    
+    async def start_job(self, source: str, owner_id, file_name: str, cmd: List[str], cwd: str, timeout: float) -> Dict:
+        job_id = self.new_key(source)
+        self.reserve(job_id, owner_id)
+        self._prune_jobs()
+        
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd,
+                **NEW_SESSION
+            )
+            self.register(job_id, process, source, owner_id, file_name, timeout=timeout)
+        finally:
+            self.release(job_id)
+        
+        job = {
+            'job_id': job_id,
+            'owner_id': owner_id,
+            'file_name': file_name,
+            'status': 'running',
+            'stdout': bytearray(),
+            'stderr': bytearray(),
+            'truncated': False,
+            'return_code': None,
+            'started': time.time(),
+            'finished': None
+        }
+        self.jobs[job_id] = job
+        job['task'] = asyncio.create_task(self._run_job(job, process, timeout))
+        
+        return job
+    
+    async def _run_job(self, job: Dict, process, timeout: float):
+        async def pump(stream, buffer: bytearray):
+            while True:
+                chunk = await stream.read(JOB_READ_SIZE)
+                if not chunk:
+                    return
+                room = MAX_JOB_OUTPUT - len(job['stdout']) - len(job['stderr'])
+                if room <= 0:
+                    job['truncated'] = True
+                    continue
+                buffer.extend(chunk[:room])
+        
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(pump(process.stdout, job['stdout']), pump(process.stderr, job['stderr']), process.wait()),
+                timeout=timeout
+            )
+            job['status'] = 'finished'
+        except asyncio.TimeoutError:
+            kill_process_group(process.pid)
+            await process.wait()
+            job['status'] = 'timeout'
+        except Exception as e:
+            job['stderr'].extend(str(e).encode())
+            job['status'] = 'failed'
+        finally:
+            job['return_code'] = process.returncode
+            job['finished'] = time.time()
+            self.unregister(job['job_id'])
+    
+    def get_job(self, job_id: str, owner_id=None) -> Optional[Dict]:
+        job = self.jobs.get(job_id)
+        if job is None or (owner_id is not None and job['owner_id'] != owner_id):
+            return None
+        
+        return {
+            'job_id': job_id,
+            'status': job['status'],
+            'file_name': job['file_name'],
+            'stdout': job['stdout'].decode('utf-8', errors='replace'),
+            'stderr': job['stderr'].decode('utf-8', errors='replace'),
+            'truncated': job['truncated'],
+            'return_code': job['return_code'],
+            'elapsed': (job['finished'] or time.time()) - job['started']
+        }
+    
+    def _prune_jobs(self):
+        cutoff = time.time() - JOB_RETENTION
+        for job_id in [j for j, job in self.jobs.items() if job['finished'] and job['finished'] < cutoff]:
+            del self.jobs[job_id]
+    
+    def get_stats(self) -> Dict:
+        by_source = {}
+        memory_mb = 0.0
+        
+        for key, info in self.list():
+            by_source[info['source']] = by_source.get(info['source'], 0) + 1
+            try:
+                memory_mb += psutil.Process(info['process'].pid).memory_info().rss / (1024 * 1024)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        
+        with self.lock:
+            return {
+                'running': len(self.processes),
+                'starting': len(self.reserved),
+                'by_source': by_source,
+                'memory_mb': memory_mb,
+                'max_total': self.max_total,
+                'max_per_user': self.max_per_user,
+                **self.stats
+            }
+    
+    def process_usage(self, key: str) -> Optional[Dict]:
+        info = self.get(key)
+        if info is None:
+            return None
+        
+        try:
+            proc = psutil.Process(info['process'].pid)
+            return {'memory_mb': proc.memory_info().rss / (1024 * 1024)}
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+process_manager = ProcessManager()
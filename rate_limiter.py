@@ -0,0 +1,267 @@
+import asyncio
+import mimetypes
+import os
+import time
+import threading
+from email.utils import formatdate
+from typing import Callable, Dict, Optional, Union
+from urllib.parse import quote
+from aiohttp import web
+
+SHARE_LINK_RATE = float(os.getenv('SHARE_LINK_RATE', '30'))
+SHARE_LINK_BURST = int(os.getenv('SHARE_LINK_BURST', '10'))
+SHARE_IP_RATE = float(os.getenv('SHARE_IP_RATE', '20'))
+SHARE_IP_BURST = int(os.getenv('SHARE_IP_BURST', '5'))
+SHARE_BANDWIDTH_LIMIT = int(os.getenv('SHARE_BANDWIDTH_LIMIT', str(10 * 1024 * 1024)))
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '1'))
+STREAM_CHUNK_SIZE = 64 * 1024
+MAX_TRACKED_BUCKETS = 10000
+
+def forwarded_client_ip(request, trusted_proxies: int = TRUSTED_PROXY_COUNT) -> str:
+    """Client address as seen by the outermost trusted proxy
+
+    Each proxy appends the address it received the request from, so only the
+    rightmost `trusted_proxies` entries of X-Forwarded-For can be believed;
+    anything to their left is whatever the client chose to send.
+    """
+    hops = [hop.strip() for hop in request.headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+    if trusted_proxies <= 0 or len(hops) < trusted_proxies:
+        return request.remote
+    return hops[-trusted_proxies]
+
+def content_disposition(filename: str) -> str:
+    """attachment header with an ASCII fallback and the exact name as RFC 5987 filename*"""
+    fallback = ''.join(c if 32 <= ord(c) < 127 and c not in '"\\' else '_' for c in filename) or 'download'
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+def _etag_list(value: str):
+    return [tag.strip() for tag in value.split(',') if tag.strip()]
+
+def check_preconditions(request, etag: str) -> Union[int, web.BaseRequest]:
+    """Evaluate If-Match / If-None-Match / If-Range against `etag` (RFC 9110 13.2.2)
+    
+    Returns 412 or 304, or the request with those headers settled, so the file
+    response never compares them with aiohttp's own mtime/size validator.
+    """
+    headers = request.headers.copy()
+    
+    if_match = headers.pop('If-Match', None)
+    if if_match is not None:
+        headers.pop('If-Unmodified-Since', None)
+        tags = _etag_list(if_match)
+        if '*' not in tags and etag not in tags:
+            return 412
+    
+    if_none_match = headers.pop('If-None-Match', None)
+    if if_none_match is not None:
+        headers.pop('If-Modified-Since', None)
+        tags = _etag_list(if_none_match)
+        if '*' in tags or etag in tags:
+            return 304 if request.method in ('GET', 'HEAD') else 412
+    
+    # An entity-tag If-Range: a match serves the range, anything else the full file
+    if_range = headers.get('If-Range', '').strip()
+    if if_range.startswith(('"', 'W/')):
+        headers.pop('If-Range')
+        if if_range != etag:
+            headers.pop('Range', None)
+    
+    return request.clone(headers=headers)
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def consume(self, amount: float = 1) -> bool:
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+    
+    def retry_after(self, amount: float = 1) -> float:
+        self._refill()
+        return max(0.0, (amount - self.tokens) / self.rate)
+    
+    def reserve(self, amount: float) -> float:
+        self._refill()
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.rate)
+    
+    def is_idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+class CountingFileResponse(web.FileResponse):
+    """FileResponse that reports the body bytes it sent: the range for 206, nothing for 304/416 or HEAD
+    
+    `on_download` is called when the whole file went out: a 200, or a 206 covering every byte.
+    An ETag passed in `headers` is sent as-is instead of aiohttp's mtime/size one, and
+    `request` (e.g. from check_preconditions) replaces the one aiohttp prepares it with.
+    """
+    
+    def __init__(self, path, on_sent, on_download=None, request=None, **kwargs):
+        super().__init__(path, **kwargs)
+        self.on_sent = on_sent
+        self.on_download = on_download
+        self.prepare_request = request
+        self.fixed_etag = self.headers.get('ETag')
+    
+    def _set_etag(self, value):
+        # FileResponse assigns its own validator while preparing; keep ours
+        if getattr(self, 'fixed_etag', None) is None:
+            web.StreamResponse.etag.fset(self, value)
+    
+    etag = property(web.StreamResponse.etag.fget, _set_etag)
+    
+    def _whole_file(self) -> bool:
+        if self.status == 200:
+            return True
+        # "bytes 0-<size - 1>/<size>"
+        span, _, total = self.headers.get('Content-Range', '').partition('/')
+        return total.isdigit() and span == f"bytes 0-{int(total) - 1}"
+    
+    async def prepare(self, request):
+        if self.prepare_request is not None:
+            request = self.prepare_request
+        writer = await super().prepare(request)
+        if request.method == 'GET' and self.status in (200, 206):
+            self.on_sent(self.content_length or 0)
+            if self.on_download is not None and self._whole_file():
+                self.on_download()
+        return writer
+
+class ShareTrafficLimiter:
+    def __init__(self):
+        self.link_buckets = {}
+        self.ip_buckets = {}
+        self.bandwidth = TokenBucket(SHARE_BANDWIDTH_LIMIT, SHARE_BANDWIDTH_LIMIT) if SHARE_BANDWIDTH_LIMIT > 0 else None
+        self.stats = {}
+        self.lock = threading.Lock()
+    
+    def _bucket(self, buckets: Dict, key, rate_per_minute: float, burst: int) -> Optional[TokenBucket]:
+        # A rate of 0 (or less) means that limit is switched off
+        if rate_per_minute <= 0:
+            return None
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= MAX_TRACKED_BUCKETS:
+                for idle_key in [k for k, b in buckets.items() if b.is_idle()]:
+                    del buckets[idle_key]
+            bucket = TokenBucket(rate_per_minute / 60, max(1, burst))
+            buckets[key] = bucket
+        return bucket
+    
+    def _stats(self, file_id: str) -> Dict:
+        return self.stats.setdefault(file_id, {'requests': 0, 'throttled': 0, 'bytes_sent': 0})
+    
+    def check_request(self, file_id: str, client_ip: str) -> Optional[float]:
+        with self.lock:
+            stats = self._stats(file_id)
+            link_bucket = self._bucket(self.link_buckets, file_id, SHARE_LINK_RATE, SHARE_LINK_BURST)
+            ip_bucket = self._bucket(self.ip_buckets, client_ip, SHARE_IP_RATE, SHARE_IP_BURST)
+            
+            buckets = [b for b in (link_bucket, ip_bucket) if b is not None]
+            
+            retry_after = max((b.retry_after() for b in buckets), default=0)
+            if retry_after > 0:
+                stats['throttled'] += 1
+                return retry_after
+            
+            for bucket in buckets:
+                bucket.consume()
+            stats['requests'] += 1
+            return None
+    
+    def record_bytes(self, file_id: str, amount: int):
+        with self.lock:
+            self._stats(file_id)['bytes_sent'] += amount
+    
+    def get_stats(self, file_id: str) -> Dict:
+        with self.lock:
+            return dict(self.stats.get(file_id, {'requests': 0, 'throttled': 0, 'bytes_sent': 0}))
+    
+    def forget(self, file_id: str):
+        """Drop the counters and bucket of a revoked or expired link"""
+        with self.lock:
+            self.stats.pop(file_id, None)
+            self.link_buckets.pop(file_id, None)
+    
+    async def send_file(self, request, file_id: str, file_path: str, headers: Dict,
+                        on_download: Optional[Callable[[], None]] = None):
+        """Send the file; `on_download` fires only when a GET sent the whole file (not partial ranges, 304/416 or HEAD)"""
+        if self.bandwidth is None:
+            return CountingFileResponse(file_path, lambda sent: self.record_bytes(file_id, sent),
+                                        on_download=on_download, request=request, headers=headers)
+        
+        return await self.stream_throttled(request, file_id, file_path, headers, on_download)
+    
+    async def stream_throttled(self, request, file_id: str, file_path: str, headers: Dict,
+                               on_download: Optional[Callable[[], None]] = None):
+        st = os.stat(file_path)
+        size = st.st_size
+        start, stop = 0, size
+        status = 200
+        
+        if 'Range' in request.headers and 'If-Range' not in request.headers:
+            try:
+                requested = request.http_range
+            except ValueError:
+                requested = None
+            
+            if requested is not None:
+                start = requested.start or 0
+                if start < 0:
+                    start = max(size + start, 0)
+                stop = size if requested.stop is None else min(requested.stop, size)
+            
+            if requested is None or start >= stop:
+                return web.Response(status=416, headers={'Content-Range': f'bytes */{size}'})
+            status = 206
+        
+        response = web.StreamResponse(status=status, headers=headers)
+        response.content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        response.content_length = stop - start
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.headers['Last-Modified'] = formatdate(st.st_mtime, usegmt=True)
+        if status == 206:
+            response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+        
+        await response.prepare(request)
+        
+        if request.method == 'HEAD':
+            return response
+        
+        loop = asyncio.get_running_loop()
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            remaining = stop - start
+            
+            while remaining > 0:
+                chunk = await loop.run_in_executor(None, f.read, min(STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                
+                with self.lock:
+                    wait = self.bandwidth.reserve(len(chunk))
+                if wait:
+                    await asyncio.sleep(wait)
+                
+                await response.write(chunk)
+                remaining -= len(chunk)
+                self.record_bytes(file_id, len(chunk))
+        
+        await response.write_eof()
+        if start == 0 and stop == size and remaining <= 0 and on_download is not None:
+            on_download()
+        return response
+
+share_limiter = ShareTrafficLimiter()
@@ -0,0 +1,107 @@
+import asyncio
+import codecs
+import json
+from typing import List
+from aiohttp import web, WSMsgType
+from process_manager import process_manager, ProcessLimitError, NEW_SESSION, kill_process_group
+
+STREAM_CHUNK_SIZE = 4096
+MAX_BUFFERED_BYTES = 256 * 1024
+
+async def stream_process(request, source: str, owner_id, file_name: str, cmd: List[str], cwd: str, timeout: float):
+    process_id = process_manager.new_key(source)
+    try:
+        process_manager.reserve(process_id, owner_id)
+    except ProcessLimitError as e:
+        return web.json_response({'success': False, 'error': str(e)}, status=429)
+    
+    try:
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        
+        try:
+            # Own session, so stop/timeout can kill everything the script spawned
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd,
+                **NEW_SESSION
+            )
+        except OSError as e:
+            await ws.send_json({'type': 'error', 'error': str(e)})
+            await ws.close()
+            return ws
+        
+        process_manager.register(process_id, process, source, owner_id, file_name, timeout=timeout)
+    finally:
+        process_manager.release(process_id)
+    
+    queue = asyncio.Queue(maxsize=MAX_BUFFERED_BYTES // STREAM_CHUNK_SIZE)
+    
+    await ws.send_json({'type': 'started', 'process_id': process_id, 'pid': process.pid})
+    
+    async def pump(stream, name):
+        while True:
+            chunk = await stream.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                return
+            await queue.put((name, chunk))
+    
+    async def forward():
+        decoders = {name: codecs.getincrementaldecoder('utf-8')('replace') for name in ('stdout', 'stderr')}
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            
+            name, chunk = item
+            if ws.closed:
+                continue
+            try:
+                await ws.send_json({'type': name, 'data': decoders[name].decode(chunk)})
+            except (ConnectionResetError, RuntimeError):
+                pass
+    
+    async def control():
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            try:
+                action = json.loads(msg.data).get('action')
+            except (ValueError, AttributeError):
+                continue
+            if action == 'stop':
+                return
+    
+    async def run():
+        await asyncio.gather(pump(process.stdout, 'stdout'), pump(process.stderr, 'stderr'))
+        return await process.wait()
+    
+    forwarder = asyncio.create_task(forward())
+    controller = asyncio.create_task(control())
+    runner = asyncio.create_task(run())
+    
+    reason = 'exited'
+    try:
+        done, _ = await asyncio.wait({runner, controller}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        
+        if runner not in done:
+            reason = 'stopped' if controller in done else 'timeout'
+            # Also when the child already exited but a grandchild still holds the pipes
+            kill_process_group(process.pid)
+        
+        returncode = await runner
+    finally:
+        if process.returncode is None:
+            kill_process_group(process.pid)
+        process_manager.unregister(process_id)
+        await queue.put(None)
+        await forwarder
+        controller.cancel()
+    
+    if not ws.closed:
+        await ws.send_json({'type': 'exit', 'returncode': returncode, 'reason': reason, 'timeout': timeout})
+        await ws.close()
+    
+    return ws
@@ -0,0 +1,287 @@
+import ast
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+from js_tokenizer import JS_KEYWORDS, tokenize_js as js_tokens
+
+INDEXED_EXTENSIONS = {'.py', '.js'}
+SYMBOL_KINDS = ('def', 'import', 'call')
+
+def tokenize_js(source: str) -> List[Tuple[str, str, int]]:
+    """Significant tokens only, with `=>` as 'arrow' and string quotes stripped"""
+    tokens = []
+    for kind, value, line in js_tokens(source):
+        if kind == 'op':
+            kind = 'arrow' if value == '=>' else 'punct'
+        elif kind == 'string':
+            value = value[1:-1]
+        elif kind not in ('name', 'punct'):
+            continue
+        tokens.append((kind, value, line))
+    return tokens
+
+def _dotted_name(node) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        parent = _dotted_name(node.value)
+        return f"{parent}.{node.attr}" if parent else node.attr
+    return None
+
+class _PythonSymbolVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.symbols = []
+        self.scope = []
+    
+    def _visit_definition(self, node, detail):
+        qualname = '.'.join(self.scope + [node.name])
+        self.symbols.append({'kind': 'def', 'name': qualname, 'line': node.lineno, 'detail': detail})
+        
+        self.scope.append(node.name)
+        self.generic_visit(node)
+        self.scope.pop()
+    
+    def visit_FunctionDef(self, node):
+        self._visit_definition(node, 'def')
+    
+    def visit_AsyncFunctionDef(self, node):
+        self._visit_definition(node, 'async def')
+    
+    def visit_ClassDef(self, node):
+        self._visit_definition(node, 'class')
+    
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.symbols.append({'kind': 'import', 'name': alias.name, 'line': node.lineno, 'detail': f"import {alias.name}"})
+    
+    def visit_ImportFrom(self, node):
+        module = '.' * node.level + (node.module or '')
+        names = ', '.join(alias.name for alias in node.names)
+        self.symbols.append({'kind': 'import', 'name': module, 'line': node.lineno, 'detail': f"from {module} import {names}"})
+    
+    def visit_Call(self, node):
+        name = _dotted_name(node.func)
+        if name:
+            self.symbols.append({'kind': 'call', 'name': name, 'line': node.lineno, 'detail': f"{name}()"})
+        self.generic_visit(node)
+
+def extract_python_symbols(source: str) -> List[Dict]:
+    visitor = _PythonSymbolVisitor()
+    visitor.visit(ast.parse(source))
+    return visitor.symbols
+
+def _skip_parens(tokens, index) -> int:
+    depth = 0
+    while index < len(tokens):
+        value = tokens[index][1]
+        if tokens[index][0] == 'punct':
+            if value == '(':
+                depth += 1
+            elif value == ')':
+                depth -= 1
+                if depth == 0:
+                    return index + 1
+        index += 1
+    return index
+
+def extract_js_symbols(source: str) -> List[Dict]:
+    tokens = tokenize_js(source)
+    symbols = []
+    
+    def token(i):
+        return tokens[i] if 0 <= i < len(tokens) else ('', '', 0)
+    
+    for i, (kind, value, line) in enumerate(tokens):
+        if kind != 'name':
+            continue
+        
+        prev_kind, prev_value, _ = token(i - 1)
+        next_kind, next_value, _ = token(i + 1)
+        
+        if value in ('function', 'class') and prev_value != '.':
+            if next_value == '*':
+                next_kind, next_value, _ = token(i + 2)
+            if next_kind == 'name':
+                symbols.append({'kind': 'def', 'name': next_value, 'line': line, 'detail': value})
+        
+        elif value in ('const', 'let', 'var') and next_kind == 'name' and token(i + 2)[1] == '=':
+            rhs_kind, rhs_value, _ = token(i + 3)
+            is_function = rhs_value in ('function', 'class', 'async')
+            if rhs_kind == 'name' and token(i + 4)[0] == 'arrow':
+                is_function = True
+            elif rhs_value == '(':
+                is_function = token(_skip_parens(tokens, i + 3))[0] == 'arrow'
+            if is_function:
+                symbols.append({'kind': 'def', 'name': next_value, 'line': line, 'detail': value})
+        
+        elif value == 'import' and prev_value != '.':
+            if next_value == '(' and token(i + 2)[0] == 'string':
+                symbols.append({'kind': 'import', 'name': token(i + 2)[1], 'line': line, 'detail': 'import()'})
+                continue
+            for j in range(i + 1, min(i + 64, len(tokens))):
+                if tokens[j][1] == ';' or (tokens[j][0] == 'name' and tokens[j][1] in ('import', 'export')):
+                    break
+                if tokens[j][0] == 'string':
+                    symbols.append({'kind': 'import', 'name': tokens[j][1], 'line': line, 'detail': 'import'})
+                    break
+        
+        elif value == 'require' and next_value == '(' and token(i + 2)[0] == 'string':
+            symbols.append({'kind': 'import', 'name': token(i + 2)[1], 'line': line, 'detail': 'require()'})
+        
+        elif next_value == '(' and value not in JS_KEYWORDS and prev_value not in ('function', 'class'):
+            name = value
+            j = i - 1
+            while token(j)[1] == '.' and token(j - 1)[0] == 'name':
+                name = f"{token(j - 1)[1]}.{name}"
+                j -= 2
+            
+            after = token(_skip_parens(tokens, i + 1))
+            if after[1] == '{' and prev_value != '.':
+                symbols.append({'kind': 'def', 'name': value, 'line': line, 'detail': 'method'})
+            else:
+                symbols.append({'kind': 'call', 'name': name, 'line': line, 'detail': f"{name}()"})
+    
+    return symbols
+
+def _lookup_keys(kind: str, name: str) -> List[str]:
+    name = name.lower()
+    if kind == 'import':
+        parts = name.replace('/', '.').lstrip('.').split('.')
+        return list({name} | {'.'.join(parts[:n]) for n in range(1, len(parts) + 1)})
+    return list({name, name.rsplit('.', 1)[-1]})
+
+class SymbolIndex:
+    def __init__(self):
+        self.files = {}
+        self.lookup = {}
+        self.lock = threading.Lock()
+    
+    def extract_symbols(self, file_path: Path) -> Dict:
+        content = file_path.read_text(encoding='utf-8', errors='ignore')
+        
+        try:
+            if file_path.suffix.lower() == '.py':
+                symbols = extract_python_symbols(content)
+            else:
+                symbols = extract_js_symbols(content)
+            error = None
+        except SyntaxError as e:
+            symbols = []
+            error = f"SyntaxError: {e.msg} (line {e.lineno})"
+        
+        return {'symbols': symbols, 'error': error}
+    
+    def index_file(self, file_path) -> Dict:
+        file_path = Path(file_path)
+        
+        if file_path.suffix.lower() not in INDEXED_EXTENSIONS or not file_path.is_file():
+            self.remove_file(file_path)
+            return {'symbols': [], 'error': None}
+        
+        st = file_path.stat()
+        entry = self.extract_symbols(file_path)
+        entry['mtime'] = st.st_mtime
+        entry['size'] = st.st_size
+        
+        with self.lock:
+            self._drop(str(file_path))
+            self.files[str(file_path)] = entry
+            for symbol in entry['symbols']:
+                for key in _lookup_keys(symbol['kind'], symbol['name']):
+                    self.lookup.setdefault((symbol['kind'], key), set()).add(str(file_path))
+        
+        return entry
+    
+    def remove_file(self, file_path):
+        with self.lock:
+            self._drop(str(file_path))
+    
+    def _drop(self, path: str):
+        entry = self.files.pop(path, None)
+        if not entry:
+            return
+        
+        for symbol in entry['symbols']:
+            for key in _lookup_keys(symbol['kind'], symbol['name']):
+                paths = self.lookup.get((symbol['kind'], key))
+                if paths:
+                    paths.discard(path)
+                    if not paths:
+                        del self.lookup[(symbol['kind'], key)]
+    
+    def refresh_directory(self, base_dir) -> int:
+        """Re-index files under `base_dir` whose mtime or size changed, drop vanished ones
+        
+        Files are compared one by one (scandir gives the stat cheaply): scripts,
+        pip and the formatter rewrite files in place without touching folder mtimes.
+        """
+        refreshed = 0
+        base_dir = Path(base_dir)
+        found = {}
+        pending = [str(base_dir)]
+        
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as entries:
+                    for item in entries:
+                        if item.is_dir(follow_symlinks=False):
+                            pending.append(item.path)
+                        elif os.path.splitext(item.name)[1].lower() in INDEXED_EXTENSIONS and item.is_file():
+                            st = item.stat()
+                            found[item.path] = (st.st_mtime, st.st_size)
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                continue
+        
+        with self.lock:
+            known = {path: (entry['mtime'], entry['size'])
+                     for path, entry in self.files.items() if Path(path).is_relative_to(base_dir)}
+        
+        for path, signature in found.items():
+            if known.get(path) != signature:
+                self.index_file(path)
+                refreshed += 1
+        
+        with self.lock:
+            for path in known.keys() - found.keys():
+                self._drop(path)
+        
+        return refreshed
+    
+    def query(self, base_dir, kind: str, name: str, limit: int = 20) -> List[Dict]:
+        if kind not in SYMBOL_KINDS:
+            raise ValueError(f"Unknown symbol kind: {kind}")
+        
+        base_dir = Path(base_dir)
+        self.refresh_directory(base_dir)
+        
+        key = name.lower()
+        results = []
+        
+        with self.lock:
+            paths = sorted(self.lookup.get((kind, key), ()))
+            
+            for path in paths:
+                file_path = Path(path)
+                if not file_path.is_relative_to(base_dir):
+                    continue
+                
+                matches = [
+                    {'line_number': s['line'], 'name': s['name'], 'detail': s['detail']}
+                    for s in self.files[path]['symbols']
+                    if s['kind'] == kind and key in _lookup_keys(kind, s['name'])
+                ]
+                
+                results.append({
+                    'file_name': file_path.name,
+                    'file_path': str(file_path.relative_to(base_dir)),
+                    'match_count': len(matches),
+                    'matches': matches[:5]
+                })
+                
+                if len(results) >= limit:
+                    break
+        
+        return results
+
+symbol_index = SymbolIndex()
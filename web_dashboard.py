@@ -4,35 +4,43 @@ Features: File Manager, Code Editor, Deploy Panel, Analytics
 """
 
 import asyncio
+import atexit
 import os
 import secrets
 import hashlib
 import json
 import sqlite3
-import subprocess
 import sys
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
+from typing import Optional
 from datetime import datetime, timedelta
 from aiohttp import web
-import aiohttp_jinja2
-import jinja2
 import jwt
 import base64
+from process_manager import process_manager, ProcessLimitError
+from activity_log import ActivityLogger
+from page_renderer import page_renderer
+from chunked_upload import upload_manager, UploadError
+from file_io import read_text, save_text, FileIOError
 
 DASHBOARD_DIR = Path(__file__).parent / 'dashboard'
-TEMPLATES_DIR = DASHBOARD_DIR / 'templates'
-STATIC_DIR = DASHBOARD_DIR / 'static'
 USERS_DIR = DASHBOARD_DIR / 'users'
+EXECUTION_TIMEOUT = 30
+TOKEN_CACHE_TTL = 300
+TOKEN_CACHE_SIZE = 1024
 
 DASHBOARD_DIR.mkdir(exist_ok=True)
-TEMPLATES_DIR.mkdir(exist_ok=True)
-STATIC_DIR.mkdir(exist_ok=True)
 USERS_DIR.mkdir(exist_ok=True)
 
 SECRET_KEY = secrets.token_urlsafe(32)
 
 user_sessions = {}
 user_credentials = {}
+token_cache = OrderedDict()
+token_cache_lock = threading.Lock()
 
 def init_dashboard_db():
     conn = sqlite3.connect(DASHBOARD_DIR / 'dashboard.db')
@@ -67,11 +75,29 @@ def init_dashboard_db():
                   timestamp TEXT,
                   FOREIGN KEY(user_id) REFERENCES dashboard_users(user_id))''')
     
+    c.execute('CREATE INDEX IF NOT EXISTS idx_dashboard_users_token ON dashboard_users (access_token)')
+    
     conn.commit()
     conn.close()
 
 init_dashboard_db()
 
+activity_logger = ActivityLogger(DASHBOARD_DIR / 'dashboard.db')
+activity_logger.init_db()
+atexit.register(activity_logger.flush)
+
+def cache_token(token, user_data):
+    with token_cache_lock:
+        token_cache[token] = (time.monotonic() + TOKEN_CACHE_TTL, user_data)
+        token_cache.move_to_end(token)
+        while len(token_cache) > TOKEN_CACHE_SIZE:
+            token_cache.popitem(last=False)
+
+def invalidate_user_tokens(username):
+    with token_cache_lock:
+        for token in [t for t, (_, data) in token_cache.items() if data[1] == username]:
+            del token_cache[token]
+
 def create_user_panel(telegram_id, telegram_username):
     username = f"user_{telegram_id}"
     password = secrets.token_urlsafe(16)
@@ -96,6 +122,9 @@ def create_user_panel(telegram_id, telegram_username):
     conn.commit()
     conn.close()
     
+    invalidate_user_tokens(username)
+    cache_token(access_token, (user_id, username))
+    
     user_credentials[telegram_id] = {
         'username': username,
         'password': password,
@@ -105,27 +134,39 @@ def create_user_panel(telegram_id, telegram_username):
     
     return user_credentials[telegram_id]
 
+def user_file(username, filename) -> Optional[Path]:
+    """Path of a file in the user's uploads folder, or None if it would land outside it"""
+    uploads = (USERS_DIR / username / 'uploads').resolve()
+    filepath = (uploads / filename).resolve()
+    if filepath == uploads or not filepath.is_relative_to(uploads):
+        return None
+    return filepath
+
 def verify_token(token):
+    with token_cache_lock:
+        cached = token_cache.get(token)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                token_cache.move_to_end(token)
+                return cached[1]
+            del token_cache[token]
+    
     conn = sqlite3.connect(DASHBOARD_DIR / 'dashboard.db')
     c = conn.cursor()
     c.execute('SELECT user_id, username FROM dashboard_users WHERE access_token = ? AND is_active = 1', (token,))
     result = c.fetchone()
     conn.close()
+    
+    if result is not None:
+        cache_token(token, result)
     return result
 
 def log_activity(user_id, action, details, ip_address):
-    conn = sqlite3.connect(DASHBOARD_DIR / 'dashboard.db')
-    c = conn.cursor()
-    c.execute('''INSERT INTO activity_logs (user_id, action, details, ip_address, timestamp)
-                 VALUES (?, ?, ?, ?, ?)''',
-              (user_id, action, details, ip_address, datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
+    activity_logger.log(user_id, action, details, ip_address)
 
 async def create_web_dashboard():
     app = web.Application(client_max_size=100*1024*1024)
-    
-    aiohttp_jinja2.setup(app, loader=jinja2.FileSystemLoader(str(TEMPLATES_DIR)))
+    activity_logger.start()
     
     async def handle_panel_access(request):
         token = request.match_info.get('token')
@@ -154,272 +195,9 @@ async def create_web_dashboard():
                         'modified': datetime.fromtimestamp(file.stat().st_mtime).isoformat()
                     })
         
-        dashboard_html = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Hosting Panel - {username}</title>
-    <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            color: #fff;
-        }}
-        .container {{
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        .header {{
-            background: rgba(255, 255, 255, 0.1);
-            backdrop-filter: blur(10px);
-            padding: 20px;
-            border-radius: 15px;
-            margin-bottom: 20px;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }}
-        .header h1 {{
-            font-size: 2em;
-            font-weight: 700;
-        }}
-        .stats {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 20px;
-            margin-bottom: 20px;
-        }}
-        .stat-card {{
-            background: rgba(255, 255, 255, 0.15);
-            backdrop-filter: blur(10px);
-            padding: 25px;
-            border-radius: 15px;
-            border: 1px solid rgba(255, 255, 255, 0.2);
-        }}
-        .stat-card h3 {{
-            font-size: 0.9em;
-            opacity: 0.8;
-            margin-bottom: 10px;
-        }}
-        .stat-card .value {{
-            font-size: 2.5em;
-            font-weight: 700;
-        }}
-        .main-panel {{
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 20px;
-        }}
-        .panel-section {{
-            background: rgba(255, 255, 255, 0.15);
-            backdrop-filter: blur(10px);
-            padding: 30px;
-            border-radius: 15px;
-            border: 1px solid rgba(255, 255, 255, 0.2);
-        }}
-        .panel-section h2 {{
-            margin-bottom: 20px;
-            font-size: 1.5em;
-        }}
-        .file-list {{
-            max-height: 400px;
-            overflow-y: auto;
-        }}
-        .file-item {{
-            background: rgba(255, 255, 255, 0.1);
-            padding: 15px;
-            margin-bottom: 10px;
-            border-radius: 10px;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }}
-        .upload-zone {{
-            border: 2px dashed rgba(255, 255, 255, 0.4);
-            padding: 50px;
-            text-align: center;
-            border-radius: 10px;
-            cursor: pointer;
-            transition: all 0.3s;
-        }}
-        .upload-zone:hover {{
-            background: rgba(255, 255, 255, 0.1);
-            border-color: rgba(255, 255, 255, 0.8);
-        }}
-        .btn {{
-            background: rgba(255, 255, 255, 0.2);
-            border: 1px solid rgba(255, 255, 255, 0.3);
-            padding: 10px 20px;
-            border-radius: 8px;
-            color: white;
-            cursor: pointer;
-            transition: all 0.3s;
-            text-decoration: none;
-            display: inline-block;
-        }}
-        .btn:hover {{
-            background: rgba(255, 255, 255, 0.3);
-            transform: translateY(-2px);
-        }}
-        .btn-primary {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        }}
-        input[type="file"] {{
-            display: none;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🚀 Hosting Panel</h1>
-            <div>
-                <span style="opacity: 0.8;">Welcome, <strong>{username}</strong></span>
-            </div>
-        </div>
-        
-        <div class="stats">
-            <div class="stat-card">
-                <h3>📁 Total Files</h3>
-                <div class="value">{len(files)}</div>
-            </div>
-            <div class="stat-card">
-                <h3>💾 Storage Used</h3>
-                <div class="value">{sum(f['size'] for f in files) / (1024*1024):.1f} MB</div>
-            </div>
-            <div class="stat-card">
-                <h3>🚀 Deployments</h3>
-                <div class="value">0</div>
-            </div>
-            <div class="stat-card">
-                <h3>⚡ Status</h3>
-                <div class="value" style="font-size: 1.5em;">🟢 Active</div>
-            </div>
-        </div>
-        
-        <div class="main-panel">
-            <div class="panel-section">
-                <h2>📤 Upload Files</h2>
-                <div class="upload-zone" onclick="document.getElementById('fileInput').click()">
-                    <p style="font-size: 3em; margin-bottom: 10px;">📁</p>
-                    <p style="font-size: 1.2em;">Click to upload files</p>
-                    <p style="opacity: 0.7; margin-top: 10px;">or drag and drop here</p>
-                </div>
-                <input type="file" id="fileInput" multiple onchange="uploadFiles(this.files)">
-                
-                <div style="margin-top: 20px;">
-                    <button class="btn btn-primary" onclick="createProject()">➕ New Project</button>
-                    <button class="btn" onclick="showExecutor()">▶️ Run Code</button>
-                </div>
-            </div>
-            
-            <div class="panel-section">
-                <h2>📂 Your Files</h2>
-                <div class="file-list">
-                    {''.join([f'''
-                    <div class="file-item">
-                        <div>
-                            <strong>{f['name']}</strong>
-                            <div style="opacity: 0.7; font-size: 0.9em;">
-                                {f['size'] / 1024:.1f} KB • {f['modified'][:10]}
-                            </div>
-                        </div>
-                        <div>
-                            <button class="btn" onclick="runFile('{f['name']}')">▶️ Run</button>
-                            <button class="btn" onclick="editFile('{f['name']}')">✏️ Edit</button>
-                            <button class="btn" onclick="deleteFile('{f['name']}')">🗑️ Delete</button>
-                        </div>
-                    </div>
-                    ''' for f in files]) if files else '<p style="text-align: center; opacity: 0.7;">No files yet</p>'}
-                </div>
-            </div>
-        </div>
-    </div>
-    
-    <script>
-        async function uploadFiles(files) {{
-            const formData = new FormData();
-            for (let file of files) {{
-                formData.append('files', file);
-            }}
-            
-            const response = await fetch('/api/upload/{token}', {{
-                method: 'POST',
-                body: formData
-            }});
-            
-            if (response.ok) {{
-                alert('✅ Files uploaded successfully!');
-                location.reload();
-            }} else {{
-                alert('❌ Upload failed!');
-            }}
-        }}
-        
-        function editFile(filename) {{
-            window.open('/editor/{token}/' + filename, '_blank');
-        }}
-        
-        function deleteFile(filename) {{
-            if (confirm('Delete ' + filename + '?')) {{
-                fetch('/api/delete/{token}/' + filename, {{ method: 'DELETE' }})
-                    .then(() => location.reload());
-            }}
-        }}
-        
-        function createProject() {{
-            const name = prompt('Project name:');
-            if (name) {{
-                alert('Project "' + name + '" created!');
-            }}
-        }}
-        
-        function deployProject() {{
-            alert('🚀 Deploy feature coming soon!');
-        }}
-        
-        async function runFile(filename) {{
-            const response = await fetch('/api/execute/{token}/' + filename, {{ method: 'POST' }});
-            const result = await response.json();
-            
-            if (result.success) {{
-                alert('✅ Execution Output:\\n\\n' + result.output);
-            }} else {{
-                alert('❌ Execution Error:\\n\\n' + result.error);
-            }}
-        }}
-        
-        function showExecutor() {{
-            window.open('/executor/{token}', '_blank');
-        }}
-        
-        // Drag and drop
-        const dropZone = document.querySelector('.upload-zone');
-        dropZone.addEventListener('dragover', (e) => {{
-            e.preventDefault();
-            dropZone.style.background = 'rgba(255, 255, 255, 0.2)';
-        }});
-        dropZone.addEventListener('dragleave', () => {{
-            dropZone.style.background = '';
-        }});
-        dropZone.addEventListener('drop', (e) => {{
-            e.preventDefault();
-            dropZone.style.background = '';
-            uploadFiles(e.dataTransfer.files);
-        }});
-    </script>
-</body>
-</html>
-        """
-        
         log_activity(user_id, 'panel_access', 'Accessed hosting panel', request.remote)
         
-        return web.Response(text=dashboard_html, content_type='text/html')
+        return page_renderer.render(request, 'dashboard.html', username=username, token=token, files=files)
     
     async def handle_file_upload(request):
         token = request.match_info.get('token')
@@ -439,7 +217,9 @@ async def create_web_dashboard():
                 filename = field.filename
                 size = 0
                 
-                filepath = user_folder / filename
+                filepath = user_file(username, filename)
+                if filepath is None:
+                    continue
                 with open(filepath, 'wb') as f:
                     while True:
                         chunk = await field.read_chunk()
@@ -454,6 +234,49 @@ async def create_web_dashboard():
         
         return web.json_response({'success': True, 'files': uploaded_files})
     
+    async def handle_chunked_upload(request):
+        """init / status / PUT chunk N / complete / abort for resumable uploads"""
+        token = request.match_info.get('token')
+        user_data = verify_token(token)
+        
+        if not user_data:
+            return web.json_response({'error': 'Unauthorized'}, status=403)
+        
+        user_id, username = user_data
+        user_folder = USERS_DIR / username / 'uploads'
+        owner = f"dashboard:{username}"
+        upload_id = request.match_info.get('upload_id')
+        index = request.match_info.get('index')
+        
+        try:
+            if upload_id is None:
+                data = await request.json()
+                result = await upload_manager.create(
+                    owner, user_folder, data.get('filename'), data.get('size'),
+                    data.get('chunk_size'), data.get('key')
+                )
+            elif request.method == 'PUT':
+                if not index.isdigit():
+                    raise UploadError('Invalid chunk index')
+                result = await upload_manager.write_chunk(
+                    upload_id, owner, int(index), request.content, request.headers.get('X-Chunk-Checksum')
+                )
+            elif request.method == 'POST':
+                result = await upload_manager.complete(upload_id, owner)
+                log_activity(user_id, 'file_upload', f"Uploaded {result['filename']} ({result['size']} bytes)", request.remote)
+            elif request.method == 'DELETE':
+                upload_manager.abort(upload_id, owner)
+                result = {}
+            else:
+                result = upload_manager.status(upload_id, owner)
+            
+            return web.json_response({'success': True, **result})
+        
+        except UploadError as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=e.status)
+        except ValueError:
+            return web.json_response({'success': False, 'error': 'Invalid JSON body'}, status=400)
+    
     async def handle_file_delete(request):
         token = request.match_info.get('token')
         filename = request.match_info.get('filename')
@@ -463,7 +286,9 @@ async def create_web_dashboard():
             return web.json_response({'error': 'Unauthorized'}, status=403)
         
         user_id, username = user_data
-        filepath = USERS_DIR / username / 'uploads' / filename
+        filepath = user_file(username, filename)
+        if filepath is None:
+            return web.json_response({'success': False, 'error': 'File not found'}, status=404)
         
         if filepath.exists():
             filepath.unlink()
@@ -479,46 +304,72 @@ async def create_web_dashboard():
             return web.json_response({'error': 'Unauthorized'}, status=403)
         
         user_id, username = user_data
-        filepath = USERS_DIR / username / 'uploads' / filename
+        filepath = user_file(username, filename)
+        if filepath is None:
+            return web.json_response({'success': False, 'error': 'File not found'}, status=404)
         
         if not filepath.exists():
             return web.json_response({'success': False, 'error': 'File not found'}, status=404)
         
+        if filename.endswith('.py'):
+            cmd = [sys.executable, str(filepath)]
+        elif filename.endswith('.js'):
+            cmd = ['node', str(filepath)]
+        else:
+            return web.json_response({'success': False, 'error': 'Unsupported file type. Only .py and .js files can be executed.'})
+        
         try:
-            if filename.endswith('.py'):
-                result = subprocess.run(
-                    [sys.executable, str(filepath)],
-                    capture_output=True,
-                    text=True,
-                    timeout=30,
-                    cwd=str(filepath.parent)
-                )
-            elif filename.endswith('.js'):
-                result = subprocess.run(
-                    ['node', str(filepath)],
-                    capture_output=True,
-                    text=True,
-                    timeout=30,
-                    cwd=str(filepath.parent)
-                )
-            else:
-                return web.json_response({'success': False, 'error': 'Unsupported file type. Only .py and .js files can be executed.'})
-            
-            output = result.stdout if result.returncode == 0 else result.stderr
-            
-            log_activity(user_id, 'code_execution', f'Executed {filename}', request.remote)
-            
-            return web.json_response({
-                'success': result.returncode == 0,
-                'output': output,
-                'error': result.stderr if result.returncode != 0 else None,
-                'return_code': result.returncode
-            })
-            
-        except subprocess.TimeoutExpired:
-            return web.json_response({'success': False, 'error': 'Execution timeout (30 seconds)'})
+            job = await process_manager.start_job(
+                'dashboard', f"dashboard:{user_id}", filename, cmd, str(filepath.parent), EXECUTION_TIMEOUT
+            )
+        except ProcessLimitError as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=429)
         except Exception as e:
             return web.json_response({'success': False, 'error': str(e)})
+        
+        log_activity(user_id, 'code_execution', f'Executed {filename}', request.remote)
+        
+        return web.json_response({
+            'success': True,
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'status_url': f"/api/execute-status/{token}/{job['job_id']}"
+        }, status=202)
+    
+    async def handle_execution_status(request):
+        token = request.match_info.get('token')
+        job_id = request.match_info.get('job_id')
+        user_data = verify_token(token)
+        
+        if not user_data:
+            return web.json_response({'error': 'Unauthorized'}, status=403)
+        
+        user_id, username = user_data
+        job = process_manager.get_job(job_id, owner_id=f"dashboard:{user_id}")
+        
+        if job is None:
+            return web.json_response({'success': False, 'error': 'Job not found'}, status=404)
+        
+        done = job['status'] != 'running'
+        success = job['status'] == 'finished' and job['return_code'] == 0
+        error = None
+        if job['status'] == 'timeout':
+            error = f'Execution timeout ({EXECUTION_TIMEOUT} seconds)'
+        elif done and not success:
+            error = job['stderr'] or f"Exited with code {job['return_code']}"
+        
+        return web.json_response({
+            'success': success,
+            'done': done,
+            'status': job['status'],
+            'output': job['stdout'] if success or not done else job['stderr'],
+            'stdout': job['stdout'],
+            'stderr': job['stderr'],
+            'error': error,
+            'truncated': job['truncated'],
+            'return_code': job['return_code'],
+            'elapsed': round(job['elapsed'], 2)
+        })
     
     async def handle_code_executor_page(request):
         token = request.match_info.get('token')
@@ -527,169 +378,7 @@ async def create_web_dashboard():
         if not user_data:
             return web.Response(text="Unauthorized", status=403)
         
-        executor_html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Code Executor</title>
-    <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 20px;
-            color: #fff;
-        }}
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-        }}
-        .header {{
-            background: rgba(255, 255, 255, 0.1);
-            backdrop-filter: blur(10px);
-            padding: 20px;
-            border-radius: 15px;
-            margin-bottom: 20px;
-            text-align: center;
-        }}
-        .executor-panel {{
-            background: rgba(255, 255, 255, 0.15);
-            backdrop-filter: blur(10px);
-            padding: 30px;
-            border-radius: 15px;
-            border: 1px solid rgba(255, 255, 255, 0.2);
-        }}
-        select, textarea, button {{
-            width: 100%;
-            padding: 15px;
-            margin: 10px 0;
-            border-radius: 10px;
-            border: 1px solid rgba(255, 255, 255, 0.3);
-            background: rgba(255, 255, 255, 0.1);
-            color: white;
-            font-size: 16px;
-        }}
-        textarea {{
-            height: 300px;
-            font-family: 'Courier New', monospace;
-            resize: vertical;
-        }}
-        button {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            cursor: pointer;
-            font-weight: bold;
-            transition: all 0.3s;
-        }}
-        button:hover {{
-            transform: translateY(-2px);
-            box-shadow: 0 5px 20px rgba(0,0,0,0.3);
-        }}
-        .output {{
-            background: #1e1e1e;
-            color: #0f0;
-            padding: 20px;
-            border-radius: 10px;
-            font-family: 'Courier New', monospace;
-            min-height: 150px;
-            white-space: pre-wrap;
-            margin-top: 20px;
-        }}
-        .error {{ color: #ff6b6b; }}
-        .success {{ color: #51cf66; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>▶️ Code Executor</h1>
-            <p style="opacity: 0.8; margin-top: 10px;">Write and run Python/JavaScript code instantly</p>
-        </div>
-        
-        <div class="executor-panel">
-            <h2>📝 Write Code</h2>
-            <select id="language">
-                <option value="python">Python (.py)</option>
-                <option value="javascript">JavaScript (.js)</option>
-            </select>
-            
-            <textarea id="code" placeholder="Write your code here...">print("Hello, World!")</textarea>
-            
-            <button onclick="executeCode()">▶️ Run Code</button>
-            
-            <h3 style="margin-top: 20px;">📊 Output:</h3>
-            <div id="output" class="output">Ready to execute...</div>
-        </div>
-    </div>
-    
-    <script>
-        document.getElementById('language').addEventListener('change', (e) => {{
-            const code = document.getElementById('code');
-            if (e.target.value === 'python') {{
-                code.value = 'print("Hello, World!")';
-            }} else {{
-                code.value = 'console.log("Hello, World!");';
-            }}
-        }});
-        
-        async function executeCode() {{
-            const code = document.getElementById('code').value;
-            const language = document.getElementById('language').value;
-            const output = document.getElementById('output');
-            
-            output.textContent = '⏳ Executing...';
-            output.className = 'output';
-            
-            try {{
-                const ext = language === 'python' ? 'py' : 'js';
-                const filename = `temp_${{Date.now()}}.${{ext}}`;
-                
-                // Save file first
-                const saveResponse = await fetch('/api/save/{token}/' + filename, {{
-                    method: 'POST',
-                    headers: {{'Content-Type': 'application/json'}},
-                    body: JSON.stringify({{content: code}})
-                }});
-                
-                if (!saveResponse.ok) {{
-                    throw new Error('Failed to save code');
-                }}
-                
-                // Execute
-                const execResponse = await fetch('/api/execute/{token}/' + filename, {{
-                    method: 'POST'
-                }});
-                
-                const result = await execResponse.json();
-                
-                if (result.success) {{
-                    output.textContent = '✅ Success:\\n\\n' + (result.output || '(No output)');
-                    output.className = 'output success';
-                }} else {{
-                    output.textContent = '❌ Error:\\n\\n' + (result.error || 'Unknown error');
-                    output.className = 'output error';
-                }}
-            }} catch (error) {{
-                output.textContent = '❌ Error:\\n\\n' + error.message;
-                output.className = 'output error';
-            }}
-        }}
-        
-        // Ctrl+Enter to run
-        document.getElementById('code').addEventListener('keydown', (e) => {{
-            if ((e.ctrlKey || e.metaKey) && e.key === 'Enter') {{
-                e.preventDefault();
-                executeCode();
-            }}
-        }});
-    </script>
-</body>
-</html>
-        """
-        
-        return web.Response(text=executor_html, content_type='text/html')
-        
-        return web.json_response({'error': 'File not found'}, status=404)
+        return page_renderer.render(request, 'executor.html', token=token)
     
     async def handle_code_editor(request):
         token = request.match_info.get('token')
@@ -700,73 +389,41 @@ async def create_web_dashboard():
             return web.Response(text="Unauthorized", status=403)
         
         user_id, username = user_data
-        filepath = USERS_DIR / username / 'uploads' / filename
+        filepath = user_file(username, filename)
+        if filepath is None:
+            return web.Response(text="File not found", status=404)
         
-        content = ""
-        if filepath.exists():
-            content = filepath.read_text(encoding='utf-8')
-        
-        editor_html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Code Editor - {filename}</title>
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.2/codemirror.min.css">
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.2/theme/monokai.min.css">
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.2/codemirror.min.js"></script>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.2/mode/python/python.min.js"></script>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.2/mode/javascript/javascript.min.js"></script>
-    <style>
-        body {{ margin: 0; padding: 0; font-family: Arial, sans-serif; }}
-        .toolbar {{ background: #2c3e50; color: white; padding: 10px; display: flex; justify-content: space-between; }}
-        .btn {{ background: #3498db; color: white; border: none; padding: 10px 20px; cursor: pointer; border-radius: 5px; }}
-        .btn:hover {{ background: #2980b9; }}
-        .CodeMirror {{ height: calc(100vh - 50px); }}
-    </style>
-</head>
-<body>
-    <div class="toolbar">
-        <span>✏️ Editing: <strong>{filename}</strong></span>
-        <button class="btn" onclick="saveFile()">💾 Save</button>
-    </div>
-    <textarea id="code">{content}</textarea>
+        # Only the first window is inlined; editor.js pages in the rest on scroll
+        try:
+            result = await read_text(filepath)
+        except FileIOError as e:
+            if e.status != 404:
+                return web.Response(text=str(e), status=e.status)
+            result = {'content': '', 'next_offset': 0, 'eof': True}
+        
+        return page_renderer.render(request, 'editor.html', token=token, filename=filename, content=result['content'],
+                                    next_offset=result['next_offset'], eof=result['eof'])
     
-    <script>
-        const editor = CodeMirror.fromTextArea(document.getElementById('code'), {{
-            mode: '{('python' if filename.endswith('.py') else 'javascript')}',
-            theme: 'monokai',
-            lineNumbers: true,
-            autoCloseBrackets: true,
-            matchBrackets: true
-        }});
-        
-        async function saveFile() {{
-            const content = editor.getValue();
-            const response = await fetch('/api/save/{token}/{filename}', {{
-                method: 'POST',
-                headers: {{'Content-Type': 'application/json'}},
-                body: JSON.stringify({{content}})
-            }});
-            
-            if (response.ok) {{
-                alert('✅ File saved!');
-            }} else {{
-                alert('❌ Save failed!');
-            }}
-        }}
-        
-        document.addEventListener('keydown', (e) => {{
-            if ((e.ctrlKey || e.metaKey) && e.key === 's') {{
-                e.preventDefault();
-                saveFile();
-            }}
-        }});
-    </script>
-</body>
-</html>
-        """
-        
-        return web.Response(text=editor_html, content_type='text/html')
+    async def handle_file_read(request):
+        token = request.match_info.get('token')
+        filename = request.match_info.get('filename')
+        user_data = verify_token(token)
+        
+        if not user_data:
+            return web.json_response({'error': 'Unauthorized'}, status=403)
+        
+        user_id, username = user_data
+        filepath = user_file(username, filename)
+        if filepath is None:
+            return web.json_response({'success': False, 'error': 'File not found'}, status=404)
+        offset = request.query.get('offset', '0')
+        
+        try:
+            result = await read_text(filepath, int(offset) if offset.isdigit() else 0)
+        except FileIOError as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=e.status)
+        
+        return web.json_response({'success': True, **result})
     
     async def handle_file_save(request):
         token = request.match_info.get('token')
@@ -777,22 +434,35 @@ async def create_web_dashboard():
             return web.json_response({'error': 'Unauthorized'}, status=403)
         
         user_id, username = user_data
-        filepath = USERS_DIR / username / 'uploads' / filename
+        filepath = user_file(username, filename)
+        if filepath is None:
+            return web.json_response({'success': False, 'error': 'File not found'}, status=404)
         
         data = await request.json()
         content = data.get('content', '')
         
-        filepath.write_text(content, encoding='utf-8')
+        try:
+            await save_text(filepath, content)
+        except FileIOError as e:
+            return web.json_response({'success': False, 'error': str(e)}, status=e.status)
         log_activity(user_id, 'file_edit', f'Edited {filename}', request.remote)
         
         return web.json_response({'success': True})
     
     app.router.add_get('/panel/{token}', handle_panel_access)
     app.router.add_post('/api/upload/{token}', handle_file_upload)
+    app.router.add_post('/api/upload/{token}/init', handle_chunked_upload)
+    app.router.add_get('/api/upload/{token}/{upload_id}', handle_chunked_upload)
+    app.router.add_delete('/api/upload/{token}/{upload_id}', handle_chunked_upload)
+    app.router.add_put('/api/upload/{token}/{upload_id}/{index}', handle_chunked_upload)
+    app.router.add_post('/api/upload/{token}/{upload_id}/complete', handle_chunked_upload)
     app.router.add_delete('/api/delete/{token}/{filename}', handle_file_delete)
     app.router.add_get('/editor/{token}/{filename}', handle_code_editor)
+    app.router.add_get('/api/read/{token}/{filename}', handle_file_read)
     app.router.add_post('/api/save/{token}/{filename}', handle_file_save)
     app.router.add_post('/api/execute/{token}/{filename}', handle_code_execution)
+    app.router.add_get('/api/execute-status/{token}/{job_id}', handle_execution_status)
     app.router.add_get('/executor/{token}', handle_code_executor_page)
+    app.router.add_get('/static/{filename}', page_renderer.handle_static)
     
     return app
@@ -21,12 +21,18 @@ from pathlib import Path
 from datetime import datetime
 from aiohttp import web
 import aiohttp
+from dependency_manager import pip_installer
+from run_stream import stream_process
+from process_manager import process_manager, ProcessLimitError
+from log_tail import read_log
+from app_logging import LOG_FILE
+
+RUN_TIMEOUT = 300
 
 class WebPanel:
     def __init__(self, base_dir):
         self.base_dir = Path(base_dir)
         self.upload_dir = self.base_dir / 'upload_bots'
-        self.running_processes = {}
     
     async def handle_install_deps(self, request):
         """Install dependencies from requirements.txt"""
@@ -40,22 +46,7 @@ class WebPanel:
                     'error': 'requirements.txt not found'
                 })
             
-            # Run pip install in background
-            process = await asyncio.create_subprocess_exec(
-                sys.executable, '-m', 'pip', 'install', '-r', str(requirements_file),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            output = stdout.decode() + stderr.decode()
-            
-            return web.json_response({
-                'success': process.returncode == 0,
-                'output': output,
-                'message': '✅ Dependencies installed!' if process.returncode == 0 else '❌ Installation failed'
-            })
+            return await pip_installer.stream_response(request, requirements_file)
         
         except Exception as e:
             return web.json_response({
@@ -154,15 +145,15 @@ class WebPanel:
             })
     
     async def handle_run_code(self, request):
-        """Run Python/JS code with live output"""
+        """Run Python/JS code and return its output once it exits"""
         try:
             data = await request.json()
             user_id = data.get('user_id')
-            filename = data.get('filename')
+            filename = data.get('filename') or ''
             
-            file_path = self.upload_dir / str(user_id) / filename
+            file_path = (self.upload_dir / str(user_id) / filename).resolve()
             
-            if not file_path.exists():
+            if not filename or not file_path.is_relative_to(self.upload_dir.resolve()) or not file_path.is_file():
                 return web.json_response({
                     'success': False,
                     'error': 'File not found'
@@ -180,43 +171,35 @@ class WebPanel:
                     'error': 'Unsupported file type'
                 })
             
-            # Start process
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=str(file_path.parent)
-            )
-            
-            # Store process for later kill
-            process_id = f"{user_id}_{filename}"
-            self.running_processes[process_id] = process
-            
-            # Read output with timeout
+            # A job runs in its own session with capped output, and a timeout kills its whole group
             try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=30.0
+                job = await process_manager.start_job(
+                    'web_panel', process_manager.owner_id(user_id), filename, cmd, str(file_path.parent), 30
                 )
-                
-                output = stdout.decode('utf-8', errors='ignore')
-                error = stderr.decode('utf-8', errors='ignore')
-                
+            except ProcessLimitError as e:
                 return web.json_response({
-                    'success': process.returncode == 0,
-                    'output': output,
-                    'error': error,
-                    'return_code': process.returncode,
-                    'process_id': process_id
-                })
+                    'success': False,
+                    'error': str(e)
+                }, status=429)
             
-            except asyncio.TimeoutError:
-                process.kill()
+            # A client that goes away leaves the job to finish under its own timeout
+            await asyncio.shield(job['task'])
+            result = process_manager.get_job(job['job_id'])
+            
+            if result['status'] == 'timeout':
                 return web.json_response({
                     'success': False,
                     'error': 'Process timeout (30s)',
                     'output': 'Execution timeout - process terminated'
                 })
+            
+            return web.json_response({
+                'success': result['return_code'] == 0,
+                'output': result['stdout'],
+                'error': result['stderr'],
+                'return_code': result['return_code'],
+                'process_id': job['job_id']
+            })
         
         except Exception as e:
             return web.json_response({
@@ -224,16 +207,42 @@ class WebPanel:
                 'error': str(e)
             })
     
+    async def handle_run_stream(self, request):
+        """Run code file and stream its output over a WebSocket"""
+        user_id = request.query.get('user_id')
+        filename = request.query.get('filename', '')
+        
+        file_path = (self.upload_dir / str(user_id) / filename).resolve()
+        
+        if not filename or not file_path.is_relative_to(self.upload_dir.resolve()) or not file_path.is_file():
+            return web.json_response({
+                'success': False,
+                'error': 'File not found'
+            }, status=404)
+        
+        ext = file_path.suffix.lower()
+        
+        if ext == '.py':
+            cmd = [sys.executable, '-u', str(file_path)]
+        elif ext == '.js':
+            cmd = ['node', str(file_path)]
+        else:
+            return web.json_response({
+                'success': False,
+                'error': 'Only .py and .js files supported'
+            }, status=400)
+        
+        return await stream_process(request, 'web_panel', process_manager.owner_id(user_id), filename, cmd, str(file_path.parent), RUN_TIMEOUT)
+    
     async def handle_stop_process(self, request):
         """Stop running process"""
         try:
             data = await request.json()
             process_id = data.get('process_id')
             
-            if process_id in self.running_processes:
-                process = self.running_processes[process_id]
-                process.kill()
-                del self.running_processes[process_id]
+            info = process_manager.get(process_id)
+            if info and info['source'] == 'web_panel':
+                await asyncio.to_thread(process_manager.stop, process_id)
                 
                 return web.json_response({
                     'success': True,
@@ -254,7 +263,7 @@ class WebPanel:
     async def handle_view_logs(self, request):
         """View bot logs"""
         try:
-            log_file = self.base_dir / 'logs' / 'bot.log'
+            log_file = LOG_FILE
             
             if not log_file.exists():
                 return web.json_response({
@@ -262,14 +271,16 @@ class WebPanel:
                     'logs': 'No logs yet'
                 })
             
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                # Read last 100 lines
-                lines = f.readlines()
-                recent_logs = ''.join(lines[-100:])
+            query = dict(request.query)
+            query.setdefault('lines', '100')
+            result = await asyncio.to_thread(read_log, log_file, query)
             
             return web.json_response({
                 'success': True,
-                'logs': recent_logs
+                'logs': '\n'.join(result['lines']),
+                'count': len(result['lines']),
+                'offset': result['offset'],
+                'reset': result['reset']
             })
         
         except Exception as e:
@@ -602,11 +613,13 @@ UPDATE_CHANNEL=https://t.me/DARK22v"></textarea>
     
     <script>
         let currentProcessId = null;
+        let runSocket = null;
         
         // Load requirements.txt on page load
         window.onload = function() {
             loadRequirements();
             loadEnv();
+            viewLogs();
         };
         
         async function loadRequirements() {
@@ -641,6 +654,34 @@ UPDATE_CHANNEL=https://t.me/DARK22v"></textarea>
             }
         }
         
+        async function readInstallStream(response, onLine) {
+            if (!(response.headers.get('Content-Type') || '').includes('ndjson')) {
+                return await response.json();
+            }
+            
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let result = { success: false, message: '❌ Installation interrupted' };
+            
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                
+                const lines = buffer.split('\\n');
+                buffer = lines.pop();
+                for (const line of lines) {
+                    if (!line) continue;
+                    const event = JSON.parse(line);
+                    if (event.done) result = event;
+                    else onLine(event.line);
+                }
+            }
+            
+            return result;
+        }
+        
         async function installDeps() {
             const spinner = document.getElementById('depSpinner');
             const output = document.getElementById('depOutput');
@@ -652,11 +693,15 @@ UPDATE_CHANNEL=https://t.me/DARK22v"></textarea>
             
             try {
                 const response = await fetch('/api/install-deps/0');
-                const data = await response.json();
+                output.textContent = '';
+                output.style.display = 'block';
+                
+                const data = await readInstallStream(response, line => {
+                    output.textContent += line + '\\n';
+                    output.scrollTop = output.scrollHeight;
+                });
                 
                 spinner.style.display = 'none';
-                output.style.display = 'block';
-                output.textContent = data.output || '';
                 
                 if (data.success) {
                     status.innerHTML = '<div class="status success">✅ ' + data.message + '</div>';
@@ -746,6 +791,32 @@ UPDATE_CHANNEL=https://t.me/DARK22v"></textarea>
             }
         }
         
+        function streamRun(filename, userId, output, onExit) {
+            const scheme = location.protocol === 'https:' ? 'wss://' : 'ws://';
+            const params = new URLSearchParams({ filename, user_id: userId });
+            const socket = new WebSocket(scheme + location.host + '/api/run-stream?' + params);
+            let exited = false;
+            
+            socket.onmessage = (event) => {
+                const msg = JSON.parse(event.data);
+                if (msg.type === 'stdout' || msg.type === 'stderr') {
+                    output.textContent += msg.data;
+                    output.scrollTop = output.scrollHeight;
+                } else if (msg.type === 'exit') {
+                    exited = true;
+                    onExit(msg);
+                } else if (msg.type === 'error') {
+                    exited = true;
+                    onExit({ returncode: -1, reason: 'error', error: msg.error });
+                }
+            };
+            socket.onclose = () => {
+                if (!exited) onExit({ returncode: -1, reason: 'disconnected' });
+            };
+            
+            return socket;
+        }
+        
         async function runCode() {
             const filename = document.getElementById('fileToRun').value;
             const userId = document.getElementById('userId').value;
@@ -758,32 +829,28 @@ UPDATE_CHANNEL=https://t.me/DARK22v"></textarea>
             }
             
             status.innerHTML = '<div class="status">⏳ Running code...</div>';
-            output.textContent = '⏳ Executing...\\n';
-            
-            try {
-                const response = await fetch('/api/run-code', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ filename, user_id: userId })
-                });
-                const data = await response.json();
-                
-                currentProcessId = data.process_id;
-                
-                if (data.success) {
+            output.textContent = '';
+            
+            runSocket = streamRun(filename, userId, output, (result) => {
+                runSocket = null;
+                if (result.reason === 'timeout') {
+                    status.innerHTML = '<div class="status error">❌ Process timeout (' + result.timeout + 's)</div>';
+                } else if (result.reason === 'stopped') {
+                    status.innerHTML = '<div class="status success">✅ Process stopped</div>';
+                } else if (result.returncode === 0) {
                     status.innerHTML = '<div class="status success">✅ Execution completed</div>';
-                    output.textContent = '=== OUTPUT ===\\n' + (data.output || '(no output)');
                 } else {
-                    status.innerHTML = '<div class="status error">❌ Execution failed</div>';
-                    output.textContent = '=== ERROR ===\\n' + (data.error || data.output || 'Unknown error');
+                    status.innerHTML = '<div class="status error">❌ Execution failed' + (result.error ? ': ' + result.error : '') + '</div>';
                 }
-            } catch (error) {
-                status.innerHTML = '<div class="status error">❌ Error: ' + error.message + '</div>';
-                output.textContent = '❌ ' + error.message;
-            }
+            });
         }
         
         async function stopCode() {
+            if (runSocket && runSocket.readyState === WebSocket.OPEN) {
+                runSocket.send(JSON.stringify({ action: 'stop' }));
+                return;
+            }
+            
             if (!currentProcessId) {
                 document.getElementById('runStatus').innerHTML = '<div class="status error">❌ No running process</div>';
                 return;
@@ -842,9 +909,12 @@ UPDATE_CHANNEL=https://t.me/DARK22v"></textarea>
             }
         }
         
+        let logsOffset = null;
+        
         async function viewLogs() {
             const output = document.getElementById('logsOutput');
             output.textContent = '⏳ Loading logs...';
+            logsOffset = null;
             
             try {
                 const response = await fetch('/api/view-logs');
@@ -852,6 +922,7 @@ UPDATE_CHANNEL=https://t.me/DARK22v"></textarea>
                 
                 if (data.success) {
                     output.textContent = data.logs || 'No logs available';
+                    logsOffset = data.offset ?? 0;
                 } else {
                     output.textContent = '❌ ' + (data.error || 'Error loading logs');
                 }
@@ -860,8 +931,30 @@ UPDATE_CHANNEL=https://t.me/DARK22v"></textarea>
             }
         }
         
-        // Auto-refresh logs every 5 seconds
-        setInterval(viewLogs, 5000);
+        // Only fetch lines appended since the last read
+        async function followLogs() {
+            if (logsOffset === null || document.hidden) return;
+            
+            try {
+                const response = await fetch('/api/view-logs?since=' + logsOffset);
+                const data = await response.json();
+                if (!data.success || data.offset === undefined) return;
+                
+                const output = document.getElementById('logsOutput');
+                if (data.reset) {
+                    output.textContent = data.logs;
+                } else if (data.logs) {
+                    const lines = (output.textContent + '\\n' + data.logs).split('\\n');
+                    output.textContent = lines.slice(-500).join('\\n');
+                }
+                logsOffset = data.offset;
+            } catch (error) {
+                console.error('Log follow error:', error);
+            }
+        }
+        
+        // Follow new log lines every 5 seconds
+        setInterval(followLogs, 5000);
     </script>
 </body>
 </html>
@@ -879,6 +972,7 @@ def create_web_panel_app(base_dir):
     app.router.add_post('/api/upload-env', panel.handle_upload_env)
     app.router.add_post('/api/read-file', panel.handle_read_file)
     app.router.add_post('/api/run-code', panel.handle_run_code)
+    app.router.add_get('/api/run-stream', panel.handle_run_stream)
     app.router.add_post('/api/stop-process', panel.handle_stop_process)
     app.router.add_get('/api/view-logs', panel.handle_view_logs)
     app.router.add_post('/api/terminal', panel.handle_terminal_command)